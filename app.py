@@ -1,15 +1,47 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_from_directory
+from flask import (Flask, Response, abort, render_template, request, redirect, url_for, flash, jsonify,
+                   send_from_directory, g, has_request_context, session)
 from flask_login import LoginManager, UserMixin, login_user, login_required, current_user, logout_user
 from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
 import psycopg2
 from psycopg2.extras import DictCursor
+import sqlite3
 from werkzeug.security import generate_password_hash, check_password_hash
 import json
 from functools import wraps
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import time
+import logging
+from array import array
 from werkzeug.middleware.proxy_fix import ProxyFix
+from app.utils.bootstrap import CONFIDENCE, INTERVALS_SCHEMA, bootstrap_ratings
+from app.utils.assets import (COMPRESSIBLE_TYPES, IMMUTABLE, MIN_COMPRESS_BYTES, AssetBundle, build, compress,
+                              preferred_encoding)
+from app.utils.db_pool import ConnectionPool
+from app.utils.events import (CHANNEL as EVENTS_CHANNEL, HEARTBEAT_SECONDS, MAX_PAYLOAD_BYTES,
+                              EventBroker, format_event, game_delta)
+from app.utils.head_to_head import DENSE_MAX_PLAYERS
+from app.utils.jobs import OUTBOX_SCHEMA, JobQueue, enqueue
+from app.utils.league import EPOCH, League, from_micros, to_micros
+from app.utils import league_image
+from app.utils.leagues import (DEFAULT_LEAGUE_ID, DEFAULT_LEAGUE_NAME, DEFAULT_LEAGUE_SLUG, GAMES_SCHEMA, LEAGUES_SCHEMA,
+                               SLUG_PATTERN, create_league, create_partitions, migrate_to_leagues)
+from app.utils.penalties import PENALTIES_SCHEMA, PENALTY_START, WEEK, week_penalties, week_start, weeks_to_close
+from app.utils.replicas import ReplicaRouter
+from app.utils.projections import PROJECTIONS_SCHEMA, league_inputs, simulate_season
+from app.utils.player_search import (DEFAULT_LIMIT as SEARCH_LIMIT, MAX_LIMIT as MAX_SEARCH_LIMIT,
+                                     MAX_QUERY_LENGTH, PlayerIndex, create_search_index, fold, search_players)
+from app.utils.series import downsample
+from app.utils.snapshot import publish, write_atomic
+from app.utils.rollups import (PERIODS as ROLLUP_PERIODS, ROLLUP_SCHEMA, changed_since, parse_period_start,
+                                period_rollups, shift as shift_period)
+from app.utils.schedule import (DEFAULT_WEEKS, MAX_WEEKS, SCHEDULE_SCHEMA, pending_fixtures,
+                                 season_schedule)
+from app.utils.swiss import BYE_POINTS, TOURNAMENT_SCHEMA, SwissPlayer, pair_round, ranking, round_standings
+from app.utils.rating_engines import ENGINES, RATING_ENGINE, get_engine, rated_games, rated_penalties
 
 # Cargar variables de entorno desde .env en desarrollo
 load_dotenv()
@@ -22,8 +54,19 @@ login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
-# Database setup
+logger = logging.getLogger(__name__)
+
+# Database setup. Con SQLITE_PATH (un archivo, o :memory:) la liga usa una
+# base SQLite en el mismo proceso en vez de Postgres (ver app/database/sqlite.py)
+SQLITE_PATH = os.environ.get('SQLITE_PATH')
+# Errores de base de datos de cualquiera de los dos motores
+DatabaseError = (psycopg2.Error, sqlite3.Error)
+
 def get_db():
+    if SQLITE_PATH:
+        # Importaciones diferidas: el arranque con Postgres no carga app.database
+        from app.database import sqlite as sqlite_storage
+        return sqlite_storage.connect(SQLITE_PATH)
     connection = psycopg2.connect(
         os.environ.get('POSTGRES_URL'),
         sslmode='require'
@@ -31,48 +74,129 @@ def get_db():
     connection.cursor_factory = DictCursor
     return connection
 
+# Réplica de lectura opcional de Postgres (puede ser el mismo primario para probar)
+REPLICA_URL = os.environ.get('POSTGRES_REPLICA_URL')
+
+def get_replica_db():
+    connection = psycopg2.connect(REPLICA_URL, sslmode='require')
+    connection.cursor_factory = DictCursor
+    return connection
+
+# Conexiones reutilizables para las lecturas (las escrituras siguen usando get_db)
+db_pool = ConnectionPool(get_db, int(os.environ.get('DB_POOL_SIZE', '5')))
+replica_pool = (ConnectionPool(get_replica_db, int(os.environ.get('DB_POOL_SIZE', '5')))
+                if REPLICA_URL and not SQLITE_PATH else None)
+replica_router = ReplicaRouter(db_pool, replica_pool)
+# Hilos (o greenlets, con workers de gevent) para ejecutar consultas en paralelo
+query_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='db-query')
+
+def read_pool():
+    """Pool de las lecturas de la petición: la réplica, salvo justo después de que la sesión escribió"""
+    wrote_at = session.get('wrote_at') if has_request_context() else None
+    return replica_router.pool(wrote_at)
+
+def read_db(pool=None):
+    """Conexión de solo lectura del pool: `with read_db() as conn:`"""
+    return (pool or read_pool()).connection()
+
+def mark_write():
+    """Llamar después del commit: las lecturas de la sesión van al primario por un tiempo (read-your-writes)"""
+    session['wrote_at'] = time.time()
+
+def create_tables(cur):
+    """Ligas, jugadores, usuarios y generaciones; los jugadores son únicos dentro de su liga"""
+    cur.execute(LEAGUES_SCHEMA)
+    cur.execute(f'''
+        CREATE TABLE IF NOT EXISTS players (
+            id SERIAL PRIMARY KEY,
+            league_id INTEGER NOT NULL DEFAULT {DEFAULT_LEAGUE_ID} REFERENCES leagues (id),
+            name TEXT NOT NULL,
+            initial_rating INTEGER NOT NULL,
+            CONSTRAINT players_league_name_key UNIQUE (league_id, name)
+        )
+    ''')
+    
+    cur.execute(f'''
+        CREATE TABLE IF NOT EXISTS users (
+            id SERIAL PRIMARY KEY,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            is_admin BOOLEAN NOT NULL DEFAULT FALSE,
+            league_id INTEGER NOT NULL DEFAULT {DEFAULT_LEAGUE_ID},
+            player_name TEXT,
+            CONSTRAINT users_player_fkey FOREIGN KEY (league_id, player_name) REFERENCES players (league_id, name)
+        )
+    ''')
+    
+    # Generación de cada liga: aumenta con cada escritura para invalidar sus cachés
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS league_meta (
+            id INTEGER PRIMARY KEY,
+            generation BIGINT NOT NULL DEFAULT 0
+        )
+    ''')
+    cur.execute('INSERT INTO league_meta (id) SELECT id FROM leagues ON CONFLICT (id) DO NOTHING')
+
+def create_games_table(cur, sqlite=bool(SQLITE_PATH)):
+    """Partidas particionadas por liga en Postgres; una sola tabla en SQLite"""
+    if sqlite:
+        from app.database import sqlite as sqlite_storage
+        cur.execute(sqlite_storage.GAMES_SCHEMA)
+    else:
+        cur.execute(GAMES_SCHEMA)
+        create_partitions(cur)
+
+def create_schema(cur, sqlite=bool(SQLITE_PATH)):
+    """Crea o actualiza todas las tablas"""
+    # Crear tablas si no existen
+    create_tables(cur)
+    
+    # Bases anteriores a las ligas múltiples: sus datos pasan a la liga por
+    # defecto (una base SQLite siempre se crea con las ligas)
+    if not sqlite:
+        migrate_to_leagues(cur)
+    create_games_table(cur, sqlite)
+    
+    # Generación en que se agregó cada fila y la del último reinicio (ver /api/changes)
+    cur.execute(CHANGES_SCHEMA)
+    
+    # Trabajos derivados pendientes (ver job_queue)
+    cur.execute(OUTBOX_SCHEMA)
+    
+    # Nombre normalizado e índices para /api/players/search
+    create_search_index(cur)
+    
+    # Intervalos de confianza de los ratings (ver rating_intervals_job)
+    cur.execute(INTERVALS_SCHEMA)
+    
+    # Proyección de la temporada por generación (ver projections_job)
+    cur.execute(PROJECTIONS_SCHEMA)
+    
+    # Semanas cerradas y sus penalizaciones (ver close_weeks)
+    cur.execute(PENALTIES_SCHEMA)
+    
+    # Torneos suizos (ver app/utils/swiss.py)
+    cur.execute(TOURNAMENT_SCHEMA)
+    
+    # Calendario de la temporada y semanas sin disponibilidad (ver /schedule)
+    cur.execute(SCHEDULE_SCHEMA)
+    
+    # Resúmenes por semana y por mes (ver update_rollups)
+    cur.execute(ROLLUP_SCHEMA)
+
 def init_db():
     conn = get_db()
     cur = conn.cursor()
     
     try:
-        # Crear tablas si no existen
-        cur.execute('''
-            CREATE TABLE IF NOT EXISTS players (
-                id SERIAL PRIMARY KEY,
-                name TEXT UNIQUE NOT NULL,
-                initial_rating INTEGER NOT NULL
-            )
-        ''')
-        
-        cur.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id SERIAL PRIMARY KEY,
-                username TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                is_admin BOOLEAN NOT NULL DEFAULT FALSE,
-                player_name TEXT REFERENCES players(name)
-            )
-        ''')
-        
-        cur.execute('''
-            CREATE TABLE IF NOT EXISTS games (
-                id SERIAL PRIMARY KEY,
-                white TEXT NOT NULL REFERENCES players(name),
-                black TEXT NOT NULL REFERENCES players(name),
-                result REAL NOT NULL,
-                date TIMESTAMP NOT NULL,
-                added_by INTEGER REFERENCES users(id),
-                has_lettuce_factor BOOLEAN NOT NULL DEFAULT FALSE
-            )
-        ''')
+        create_schema(cur)
         
         # Sincronizar jugadores entre start.json y la base de datos
         with open('start.json', 'r', encoding='utf-8') as f:
             start_data = json.load(f)
             
-        # Obtener jugadores actuales en la base de datos
-        cur.execute('SELECT name, initial_rating FROM players')
+        # Obtener jugadores actuales en la base de datos (start.json es de la liga por defecto)
+        cur.execute('SELECT name, initial_rating FROM players WHERE league_id = %s', (DEFAULT_LEAGUE_ID,))
         db_players = {row['name']: row['initial_rating'] for row in cur.fetchall()}
         
         # Insertar o actualizar jugadores desde start.json
@@ -80,14 +204,14 @@ def init_db():
             if player['name'] not in db_players:
                 # Insertar nuevo jugador
                 cur.execute(
-                    'INSERT INTO players (name, initial_rating) VALUES (%s, %s)',
-                    (player['name'], player['rating'])
+                    'INSERT INTO players (name, initial_rating, search_name) VALUES (%s, %s, %s)',
+                    (player['name'], player['rating'], fold(player['name']))
                 )
             elif db_players[player['name']] != player['rating']:
                 # Actualizar rating si es diferente
                 cur.execute(
-                    'UPDATE players SET initial_rating = %s WHERE name = %s',
-                    (player['rating'], player['name'])
+                    'UPDATE players SET initial_rating = %s WHERE league_id = %s AND name = %s',
+                    (player['rating'], DEFAULT_LEAGUE_ID, player['name'])
                 )
         
         # Crear admin si no existe
@@ -113,232 +237,411 @@ def init_db():
         conn.close()
 
 class User(UserMixin):
-    def __init__(self, id, username, is_admin, player_name=None):
+    def __init__(self, id, username, is_admin, player_name=None, league_id=DEFAULT_LEAGUE_ID):
         self.id = id
         self.username = username
         self.is_admin = is_admin
         self.player_name = player_name
+        self.league_id = league_id
+    
+    def player_in(self, league_id):
+        """Jugador del usuario en la liga dada (None si juega en otra)"""
+        return self.player_name if self.league_id == league_id else None
 
 @login_manager.user_loader
 def load_user(user_id):
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute('SELECT id, username, is_admin, COALESCE(player_name, NULL) as player_name FROM users WHERE id = %s', (user_id,))
-    user = cur.fetchone()
-    cur.close()
-    conn.close()
+    with read_db() as conn:
+        cur = conn.cursor()
+        cur.execute('SELECT id, username, is_admin, COALESCE(player_name, NULL) as player_name, league_id FROM users WHERE id = %s', (user_id,))
+        user = cur.fetchone()
+        cur.close()
     if user:
-        return User(user['id'], user['username'], user['is_admin'], user['player_name'])
+        return User(user['id'], user['username'], user['is_admin'], user['player_name'], user['league_id'])
     return None
 
-def load_league_data():
-    """Función única para cargar todos los datos necesarios"""
-    conn = get_db()
-    cur = conn.cursor()
-    
-    # Definir la fecha de inicio de las penalizaciones (2025/01/13)
-    start_date = datetime(2025, 1, 13)
-    
-    try:
-        # Asegurarse de que todos los jugadores en la base de datos estén en start.json
-        cur.execute('SELECT name, initial_rating FROM players')
-        db_players = {row['name']: row['initial_rating'] for row in cur.fetchall()}
-        
-        with open('start.json', 'r', encoding='utf-8') as f:
-            start_data = json.load(f)
-            
-        # Verificar si hay jugadores en la base de datos que no están en start.json
-        start_players = {p['name']: p['rating'] for p in start_data['players']}
-        for name, rating in db_players.items():
-            if name not in start_players:
-                # Agregar jugador faltante a start.json
-                start_data['players'].append({
-                    'name': name,
-                    'rating': rating
-                })
-                
-        # Guardar cambios en start.json si hubo modificaciones
-        if len(start_players) != len(db_players):
-            with open('start.json', 'w', encoding='utf-8') as f:
-                json.dump(start_data, f, indent=4, ensure_ascii=False)
-        
-        # Una sola consulta para juegos con ratings históricos
+# Columnas para /api/changes: las filas anteriores quedan con generación 0
+CHANGES_SCHEMA = '''
+    ALTER TABLE games ADD COLUMN IF NOT EXISTS generation BIGINT NOT NULL DEFAULT 0;
+    ALTER TABLE players ADD COLUMN IF NOT EXISTS generation BIGINT NOT NULL DEFAULT 0;
+    ALTER TABLE league_meta ADD COLUMN IF NOT EXISTS reset_generation BIGINT NOT NULL DEFAULT 0;
+'''
+
+def fetch_players(league_id, pool=None, through=None):
+    """Jugadores de la liga (con `through`, solo los agregados hasta esa generación)"""
+    with read_db(pool) as conn:
+        cur = conn.cursor()
+        cur.execute('SELECT id, name, initial_rating, generation FROM players '
+                    'WHERE league_id = %s AND (%s IS NULL OR generation <= %s)', (league_id, through, through))
+        rows = cur.fetchall()
+        cur.close()
+    return rows
+
+def fetch_games(league_id, pool=None, through=None):
+    """Partidas de la liga en orden cronológico (con `through`, solo las guardadas hasta esa generación)"""
+    with read_db(pool) as conn:
+        # Cursor de tuplas: más liviano que DictCursor para todo el historial.
+        # El filtro por liga solo lee la partición de esa liga
+        cur = conn.cursor(cursor_factory=psycopg2.extensions.cursor)
         cur.execute('''
-            WITH weekly_counts AS (
-                SELECT player, COUNT(*) as games_this_week
-                FROM (
-                    SELECT white as player FROM games 
-                    WHERE date >= %s
-                      AND date >= NOW() - INTERVAL '7 days'
-                    UNION ALL
-                    SELECT black FROM games 
-                    WHERE date >= %s
-                      AND date >= NOW() - INTERVAL '7 days'
-                ) w
-                GROUP BY player
-            )
-            SELECT 
-                g.white, g.black, g.result, g.date,
-                g.has_lettuce_factor,
-                CASE 
-                    WHEN NOW() >= %s THEN COALESCE(w1.games_this_week, 0)
-                    ELSE 3
-                END as white_weekly_games,
-                CASE 
-                    WHEN NOW() >= %s THEN COALESCE(w2.games_this_week, 0)
-                    ELSE 3
-                END as black_weekly_games
-            FROM games g
-            LEFT JOIN weekly_counts w1 ON g.white = w1.player
-            LEFT JOIN weekly_counts w2 ON g.black = w2.player
-            ORDER BY g.date DESC
-        ''', (start_date, start_date, start_date, start_date))
-        games = [dict(row) for row in cur.fetchall()]
-        
-        # Una consulta para todos los jugadores y sus conteos
+            SELECT white, black, result, date, has_lettuce_factor, generation
+            FROM games
+            WHERE league_id = %s AND (%s IS NULL OR generation <= %s)
+            ORDER BY date
+        ''', (league_id, through, through))
+        rows = cur.fetchall()
+        cur.close()
+    return rows
+
+def fetch_penalties(league_id, pool=None):
+    """Penalizaciones de las semanas cerradas y el inicio de la última semana cerrada"""
+    with read_db(pool) as conn:
+        cur = conn.cursor(cursor_factory=psycopg2.extensions.cursor)
         cur.execute('''
-            SELECT 
-                p.id,
-                p.name,
-                CASE 
-                    WHEN NOW() >= %s THEN COALESCE(w.games_this_week, 0)
-                    ELSE 3
-                END as games_this_week
-            FROM players p
-            LEFT JOIN (
-                SELECT player, COUNT(*) as games_this_week
-                FROM (
-                    SELECT white as player FROM games 
-                    WHERE date >= %s
-                      AND date >= NOW() - INTERVAL '7 days'
-                    UNION ALL
-                    SELECT black FROM games 
-                    WHERE date >= %s
-                      AND date >= NOW() - INTERVAL '7 days'
-                ) w
-                GROUP BY player
-            ) w ON p.name = w.player
-        ''', (start_date, start_date, start_date))
-        players = [dict(row) for row in cur.fetchall()]
-        
-    except Exception as e:
-        games = []
-        players = []
-        
-    finally:
+            SELECT player_name, week_start, points FROM penalties
+            WHERE league_id = %s
+            ORDER BY week_start, player_name
+        ''', (league_id,))
+        rows = cur.fetchall()
+        closed_through = last_closed_week(cur, league_id)
         cur.close()
-        conn.close()
-    
-    return games, players
+    return rows, closed_through
 
-def get_weeks_stats():
-    conn = get_db()
-    cur = conn.cursor()
-    
-    # Obtener la fecha actual y el inicio de la semana
-    now = datetime.now()
-    week_start = now - timedelta(days=now.weekday())
-    week_start = week_start.replace(hour=0, minute=0, second=0, microsecond=0)
-    
-    # Contar juegos por jugador en la última semana
+def last_closed_week(cur, league_id):
+    # Sin MAX(): así SQLite conserva el tipo de la columna
     cur.execute('''
-        SELECT p.name, COUNT(g.id) as games_this_week
-        FROM players p
-        LEFT JOIN (
-            SELECT white as player, id, date FROM games
-            WHERE date >= %s
-            UNION ALL
-            SELECT black as player, id, date FROM games
-            WHERE date >= %s
-        ) g ON p.name = g.player
-        GROUP BY p.name
-    ''', (week_start, week_start))
-    
-    weekly_games = {row['name']: row['games_this_week'] for row in cur.fetchall()}
-    
-    cur.close()
-    conn.close()
-    return weekly_games
-
-def calculate_ratings_with_changes():
-    conn = get_db()
-    cur = conn.cursor()
-    
-    # Obtener ratings iniciales desde start.json
+        SELECT week_start FROM week_closures WHERE league_id = %s
+        ORDER BY week_start DESC LIMIT 1
+    ''', (league_id,))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+def sync_start_json(db_players):
+    """Ratings iniciales de la liga por defecto (start.json), agregando los jugadores que solo están en la base de datos"""
     with open('start.json', 'r', encoding='utf-8') as f:
         start_data = json.load(f)
-        initial_ratings = {p['name']: p['rating'] for p in start_data['players']}
-    
-    # Obtener todos los juegos ordenados por fecha
-    cur.execute('SELECT white, black, result, date FROM games ORDER BY date')
-    games = [dict(row) for row in cur.fetchall()]
-    
-    # Empezar desde los ratings iniciales
-    current_ratings = initial_ratings.copy()
-    elo_changes = []
-    
-    # Procesar juegos en orden cronológico y guardar ratings históricos
-    historical_ratings = []
-    for game in games:
-        white_rating = current_ratings[game['white']]
-        black_rating = current_ratings[game['black']]
-        result = game['result']
         
-        # Guardar ratings antes del juego
-        historical_ratings.append({
-            'white_rating': white_rating,
-            'black_rating': black_rating
-        })
+    # Verificar si hay jugadores en la base de datos que no están en start.json
+    start_players = {p['name']: p['rating'] for p in start_data['players']}
+    for name, rating in db_players.items():
+        if name not in start_players:
+            # Agregar jugador faltante a start.json
+            start_data['players'].append({
+                'name': name,
+                'rating': rating
+            })
+            
+    # Guardar cambios en start.json si hubo modificaciones
+    if len(start_players) != len(db_players):
+        with open('start.json', 'w', encoding='utf-8') as f:
+            json.dump(start_data, f, indent=4, ensure_ascii=False)
+    
+    return {p['name']: p['rating'] for p in start_data['players']}
+
+def load_league_data(league_id, pool=None, generation=None):
+    """
+    Función única para cargar todos los datos necesarios de una liga. Con
+    `generation`, solo los jugadores y partidas guardados hasta ella, para
+    que catch_up_league agregue después exactamente los siguientes.
+    """
+    try:
+        # Jugadores y partidas se consultan en paralelo, cada uno en su
+        # conexión (del mismo pool: fuera de la petición no hay sesión)
+        pool = pool or read_pool()
+        players_query = query_executor.submit(fetch_players, league_id, pool, generation)
+        games_query = query_executor.submit(fetch_games, league_id, pool, generation)
+        penalties_query = query_executor.submit(fetch_penalties, league_id, pool)
+        db_rows = players_query.result()
         
-        new_white, new_black = getElo(white_rating, black_rating, 50, result)
+        db_players = {row['name']: row['initial_rating'] for row in db_rows}
+        if league_id == DEFAULT_LEAGUE_ID:
+            initial_ratings = sync_start_json(db_players)
+        else:
+            # Las otras ligas toman los ratings iniciales solo de la base de datos
+            initial_ratings = db_players
         
-        white_change = new_white - white_rating
-        black_change = new_black - black_rating
+        league = League(initial_ratings)
+        league.league_id = league_id
+        for row in db_rows:
+            league.set_player_id(row['name'], row['id'], row['generation'])
         
-        current_ratings[game['white']] = new_white
-        current_ratings[game['black']] = new_black
+        # Cargar las partidas directamente en la liga columnar, en orden
+        # cronológico, con la penalización de cada semana cerrada al terminar la semana
+        penalties, league.closed_through = penalties_query.result()
+        penalty = 0
+        for white, black, result, date, has_lettuce_factor, generation in games_query.result():
+            while penalty < len(penalties) and penalties[penalty][1] + WEEK <= date:
+                name, start, points = penalties[penalty]
+                league.add_penalty(name, start + WEEK, points)
+                penalty += 1
+            league.add_game(white, black, result, date, has_lettuce_factor, generation)
+        for name, start, points in penalties[penalty:]:
+            league.add_penalty(name, start + WEEK, points)
         
-        elo_changes.append({
-            'white_change': white_change,
-            'black_change': black_change
-        })
+    except Exception as e:
+        logger.error(f"Error cargando datos de la liga: {str(e)}")
+        league = None
     
-    # Aplicar penalizaciones semanales al final
-    now = datetime.now()
-    week_start = now - timedelta(days=now.weekday())
-    week_start = week_start.replace(hour=0, minute=0, second=0, microsecond=0)
+    return league
+
+def get_generation(cur, league_id):
+    cur.execute('SELECT generation FROM league_meta WHERE id = %s', (league_id,))
+    row = cur.fetchone()
+    return row['generation'] if row else 0
+
+def bump_generation(cur, league_id, delta=None):
+    """
+    Marca un cambio en la liga y lo publica en /events (llamar dentro de la
+    transacción de escritura: el evento solo se entrega si hay commit).
+    `delta(generation)` arma el evento; por defecto se pide recargar.
+    """
+    cur.execute('UPDATE league_meta SET generation = generation + 1 WHERE id = %s RETURNING generation', (league_id,))
+    generation = cur.fetchone()[0]
+    reload_payload = json.dumps({'type': 'reload', 'generation': generation, 'league': league_id})
+    payload = json.dumps({**delta(generation), 'league': league_id}) if delta else reload_payload
+    if len(payload.encode('utf-8')) > MAX_PAYLOAD_BYTES:
+        payload = reload_payload
+    cur.execute('SELECT pg_notify(%s, %s)', (EVENTS_CHANNEL, payload))
+    return generation
+
+def get_league(league_id=None, pool=None):
+    """
+    Liga en memoria (por defecto, la de la petición), recalculada solo
+    cuando cambia su generación: las escrituras de una liga no invalidan
+    las demás. La generación y los datos se leen del mismo pool (`pool`,
+    o el de la petición); con `db_pool` se lee del primario.
+    """
+    league_id = league_id or current_league_id()
+    pool = pool or read_pool()
+    with read_db(pool) as conn:
+        cur = conn.cursor()
+        generation = get_generation(cur, league_id)
+        cur.close()
     
-    weekly_games = get_weeks_stats()
-    for player, games_count in weekly_games.items():
-        if games_count < 3:
-            # Penalización más suave: -10 puntos por juego faltante
-            missing_games = 3 - games_count
-            penalty = -10 * missing_games
-            current_ratings[player] += penalty
+    # Las generaciones solo aumentan: una réplica atrasada no reemplaza una
+    # liga más nueva ya cargada desde el primario
+    cached = league_cache.get(league_id)
+    if cached is not None and cached.generation >= generation:
+        return cached
     
-    cur.close()
-    conn.close()
+    # Partidas nuevas posteriores a todo lo calculado: se agregan a una copia
+    # de la liga en memoria (O(partidas nuevas)) en vez de recalcular el
+    # historial. La liga en caché no se modifica nunca: las lecturas en curso
+    # la siguen viendo entera y la copia la reemplaza al terminar
+    league = None
+    if cached is not None and cached.generation is not None:
+        with league_update_lock:
+            # Otra petición pudo ponerla al día mientras se esperaba el lock
+            latest = league_cache.get(league_id, cached)
+            if latest.generation >= generation:
+                league = latest
+            else:
+                candidate = latest.copy()
+                if catch_up_league(candidate, generation, pool):
+                    league = candidate
     
-    return current_ratings, elo_changes, historical_ratings
+    if league is None and (LEAGUE_IMAGE_DIR or LEAGUE_IMAGE_BUNDLE):
+        league = load_league_image(league_id, generation, pool)
+    if league is None:
+        league = load_league_data(league_id, pool, generation)
+        if league is None:
+            league = League({})
+            league.league_id = league_id
+            return league
+        league.generation = generation
+    league_cache[league_id] = league
+    saved = image_generations.get(league_id)
+    if LEAGUE_IMAGE_DIR and (saved is None or league.generation > saved):
+        image_generations[league_id] = league.generation
+        query_executor.submit(save_league_image, league)
+    schedule_week_closing(league)
+    return league
 
-def GetProbability(rating1, rating2):
-    return 1 / (1 + 10 ** ((rating2 - rating1) / 400))
+def league_image_path(league_id, directory=None):
+    return os.path.join(directory or LEAGUE_IMAGE_DIR, f'league-{league_id}.img')
 
-def getElo(ratingOfPlayer1, ratingOfPlayer2, K, result):
-    # Calcular probabilidad de victoria para el jugador 1
-    expected = GetProbability(ratingOfPlayer1, ratingOfPlayer2)
-    
-    # El resultado actual (1 = victoria, 0.5 = empate, 0 = derrota)
-    actual = result
-    
-    # Calcular el cambio de ELO
-    change = K * (actual - expected)
+def newest_league_image(league_id):
+    """Ruta de la imagen más nueva de la liga entre LEAGUE_IMAGE_DIR y LEAGUE_IMAGE_BUNDLE"""
+    paths = [league_image_path(league_id, directory) for directory in (LEAGUE_IMAGE_DIR, LEAGUE_IMAGE_BUNDLE) if directory]
+    generations = [(league_image.image_generation(path), path) for path in paths]
+    generations = [(generation, path) for generation, path in generations if generation is not None]
+    return max(generations)[1] if generations else None
+
+def save_league_image(league):
+    """Guarda la imagen binaria de la liga (en segundo plano, sin fallar la petición)"""
+    try:
+        # Las ligas de league_cache no cambian (ver get_league)
+        league_image.write(league_image_path(league.league_id), league)
+    except Exception as e:
+        logger.error(f"Error guardando la imagen de la liga: {str(e)}")
+
+def load_league_image(league_id, generation, pool):
+    """
+    Liga desde su imagen binaria, puesta al día con las partidas y jugadores
+    agregados después de la generación de la imagen. None si no hay imagen o
+    si no se puede poner al día (un cierre de semana o un reinicio después de
+    la imagen, o partidas anteriores a la última de la imagen): entonces se
+    recalcula todo el historial.
+    """
+    path = newest_league_image(league_id)
+    league = league_image.read(path) if path else None
+    if league is None or league.league_id != league_id:
+        return None
+    image_generations[league_id] = league.generation
+    # Una imagen más nueva que la generación leída (réplica atrasada) sirve igual
+    if league.generation >= generation:
+        return league
+    return league if catch_up_league(league, generation, pool) else None
+
+def catch_up_league(league, generation, pool):
+    """
+    Pone al día la liga hasta `generation` con los jugadores y partidas
+    agregados después de su generación; la liga no puede estar en
+    league_cache (ver get_league). Devuelve False sin tocarla si no se
+    puede (un cierre de semana o un reinicio después, o partidas anteriores
+    a la última ya calculada, que cambiarían los ratings siguientes): entonces
+    hay que recalcular todo el historial.
+    """
+    try:
+        with read_db(pool) as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT reset_generation FROM league_meta WHERE id = %s', (league.league_id,))
+            row = cur.fetchone()
+            if row is None or row['reset_generation'] > league.generation:
+                cur.close()
+                return False
+            # Hasta `generation`: lo escrito después se agrega en la próxima puesta al día
+            cur.execute('''
+                SELECT id, name, initial_rating, generation FROM players
+                WHERE league_id = %s AND generation > %s AND generation <= %s
+                ORDER BY generation, id
+            ''', (league.league_id, league.generation, generation))
+            players = cur.fetchall()
+            cur.execute('''
+                SELECT white, black, result, date, has_lettuce_factor, generation FROM games
+                WHERE league_id = %s AND generation > %s AND generation <= %s
+                ORDER BY date
+            ''', (league.league_id, league.generation, generation))
+            games = cur.fetchall()
+            cur.close()
+    except DatabaseError as e:
+        logger.error(f"Error poniendo al día la liga: {str(e)}")
+        return False
     
-    # Aplicar el cambio (redondeado a entero)
-    newRatingOfPlayer1 = int(round(ratingOfPlayer1 + change))
-    newRatingOfPlayer2 = int(round(ratingOfPlayer2 - change))
+    # Solo partidas posteriores a todo lo ya calculado; si no, cambiarían los ratings siguientes
+    last = max(league.played_at[-1] if len(league) else 0,
+               league.penalty_at[-1] if len(league.penalty_at) else 0)
+    if games and to_micros(games[0]['date']) < last:
+        return False
+    for row in players:
+        if row['name'] not in league.index:
+            league.add_player(row['name'], row['initial_rating'])
+        league.set_player_id(row['name'], row['id'], row['generation'])
+    for row in games:
+        league.add_game(row['white'], row['black'], row['result'], row['date'],
+                        row['has_lettuce_factor'], row['generation'])
+    league.generation = generation
+    return True
+
+def warm_start():
+    """
+    Arranque en frío (serverless.py): abre una conexión del pool en
+    segundo plano, inicia el despachador de trabajos y carga las imágenes
+    de las ligas en league_cache, para que la primera petición no espere el
+    TLS ni recalcule el historial
+    """
+    query_executor.submit(db_pool.prewarm, 1)
+    job_queue.start()
+    league_ids = set()
+    for directory in (LEAGUE_IMAGE_DIR, LEAGUE_IMAGE_BUNDLE):
+        if directory and os.path.isdir(directory):
+            league_ids.update(int(filename[len('league-'):-len('.img')]) for filename in os.listdir(directory)
+                              if filename.startswith('league-') and filename.endswith('.img'))
+    for league_id in league_ids:
+        league = league_image.read(newest_league_image(league_id))
+        if league is not None and league.generation is not None:
+            league_cache[league.league_id] = league
+            image_generations[league.league_id] = league.generation
+
+def engine_ratings(league, name):
+    """Ratings de otro sistema (p. ej. glicko2), calculados una vez por generación de la liga"""
+    result = league.engine_ratings.get(name)
+    if result is None:
+        # Las instancias se conservan entre generaciones: algunos sistemas
+        # (bradley_terry) parten de su solución anterior
+        key = (league.league_id, name)
+        engine = rating_engines.get(key)
+        if engine is None:
+            engine = rating_engines[key] = get_engine(name)
+        result = engine.rate(league, datetime.now())
+        league.engine_ratings[name] = result
+    return result
+
+def weekly_games(league, now=None):
+    """Partidas de cada jugador en la semana en curso (de lunes a `now`, por defecto ahora)"""
+    now = now or datetime.now()
+    if now < PENALTY_START:
+        return array('i', [3]) * len(league.names)
+    return league.games_between(week_start(now), now)
+
+def schedule_week_closing(league, now=None):
+    """Encola el cierre de las semanas terminadas que la liga aún no tiene cerradas"""
+    weeks = weeks_to_close(league.closed_through, now or datetime.now())
+    if not weeks:
+        return
+    key = f"close_weeks:{league.league_id}:{weeks[-1].strftime('%Y-%m-%d')}"
+    if key in week_closing_submitted:
+        return
+    week_closing_submitted.add(key)
+    try:
+        job_queue.submit('close_weeks', key, {'league': league.league_id})
+    except Exception as e:
+        week_closing_submitted.discard(key)
+        logger.error(f"Error encolando el cierre de semanas: {str(e)}")
+
+def close_weeks(league_id, now=None):
+    """
+    Cierra cada semana terminada una sola vez: cuenta las partidas de la
+    semana de cada jugador y guarda la penalización por partida faltante.
+    Las penalizaciones quedan en el libro de ratings al recargar la liga.
+    Devuelve las semanas cerradas.
+    """
+    now = now or datetime.now()
+    # Las penalizaciones se calculan con las partidas del primario
+    league = get_league(league_id, db_pool)
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        # Un solo cierre de la liga a la vez entre procesos
+        cur.execute('SELECT generation FROM league_meta WHERE id = %s FOR UPDATE', (league_id,))
+        closed_through = last_closed_week(cur, league_id)
+        weeks = weeks_to_close(closed_through, now)
+        if not weeks:
+            conn.rollback()
+            return []
+        
+        for start in weeks:
+            cur.execute('INSERT INTO week_closures (league_id, week_start) VALUES (%s, %s)', (league_id, start))
+            for player, missing, points in week_penalties(league, start):
+                cur.execute(
+                    'INSERT INTO penalties (league_id, week_start, player_name, missing_games, points) VALUES (%s, %s, %s, %s, %s)',
+                    (league_id, start, league.names[player], missing, points)
+                )
+        
+        generation = bump_generation(cur, league_id)
+        # Las penalizaciones cambian los ratings de las partidas posteriores:
+        # los clientes deben descargar la liga completa (ver /api/changes)
+        cur.execute('UPDATE league_meta SET reset_generation = %s WHERE id = %s', (generation, league_id))
+        enqueue_derived_jobs(cur, league_id, generation)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
     
-    return newRatingOfPlayer1, newRatingOfPlayer2
+    job_queue.wake()
+    return weeks
 
 def format_name(full_name):
     parts = full_name.split()
@@ -348,11 +651,166 @@ def format_name(full_name):
 
 # Diccionario para almacenar los intentos de login por IP
 login_attempts = {}
+# Ligas procesadas en memoria (con su generación), por id de liga. No se
+# modifican: las partidas nuevas se agregan a una copia que las reemplaza,
+# de a una puesta al día a la vez
+league_cache = {}
+league_update_lock = threading.Lock()
+# Ligas disponibles (slug -> datos), releídas cada LEAGUES_CACHE_SECONDS
+league_directory_cache = {}
+LEAGUES_CACHE_SECONDS = 60
+# Instancias de los sistemas de rating, por liga y nombre
+rating_engines = {}
+# Cierres de semana ya encolados por este proceso
+week_closing_submitted = set()
+# Imágenes binarias de las ligas (ver app/utils/league_image.py): se leen al
+# arrancar o cuando la liga no está en memoria, y se reescriben en segundo
+# plano cuando la liga avanza de generación
+LEAGUE_IMAGE_DIR = os.environ.get('LEAGUE_IMAGE_DIR')
+# Imágenes de solo lectura incluidas en el despliegue (se usa la más nueva de ambas)
+LEAGUE_IMAGE_BUNDLE = os.environ.get('LEAGUE_IMAGE_BUNDLE')
+# Generación de la última imagen leída o escrita, por liga
+image_generations = {}
+# Índice de búsqueda de jugadores en memoria, por generación de la liga
+player_index_cache = {}
+# Conexiones abiertas a /events de este proceso
+event_broker = EventBroker(get_db)
+
+# Trabajos derivados de las escrituras, en segundo plano (ver enqueue_derived_jobs)
+job_queue = JobQueue(get_db, workers=int(os.environ.get('JOB_WORKERS', '2')))
+
+# CSS y JS propios, minificados y con el hash en el nombre (python app.py build-assets)
+asset_bundle = AssetBundle(os.path.dirname(os.path.abspath(__file__)))
+
+# Instantánea estática para visitantes anónimos (ver publish_snapshot): si
+# SNAPSHOT_DIR está definido se vuelve a publicar después de cada escritura
+SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR')
+SNAPSHOT_PAGES = {
+    'index.html': '/',
+    'crosstable.html': '/crosstable',
+    'api/standings.json': '/api/standings',
+    'api/ratings.json': '/api/ratings',
+    'api/head-to-head.json': '/api/head-to-head',
+}
+
+# Partidas del historial que se renderizan en la página principal
+INITIAL_GAMES = 50
+
+# Límites de las series de rating
+MAX_HISTORY_POINTS = 5000
+MAX_OVERLAY_PLAYERS = 20
+
+# Jugadores por página de la tabla cruzada (la tabla es cuadrada: cada página
+# cruza un bloque de jugadores consecutivos del ranking entre sí)
+CROSSTABLE_PAGE_SIZE = 30
+
+# Proyecciones de temporada: la de los parámetros por defecto se calcula una
+# vez por generación (ver projections_job); otros parámetros son solo para
+# administradores y se guardan por generación y parámetros
+projection_cache = {}
+stored_projection_cache = {}
+DEFAULT_SIMULATIONS = 20000
+MAX_SIMULATIONS = 100000
+DEFAULT_PROJECTION_WEEKS = 4
+MAX_PROJECTION_WEEKS = 26
+MAX_CACHED_PROJECTIONS = 32
+
+# Intervalos de confianza por bootstrap: remuestreos por generación y cada
+# cuántos segundos se vuelve a consultar mientras el trabajo no termina
+BOOTSTRAP_SAMPLES = int(os.environ.get('BOOTSTRAP_SAMPLES', '2000'))
+INTERVALS_RECHECK_SECONDS = 5
+interval_cache = {}
+# Partidas programadas de la semana en curso aún sin jugar, por liga (valen
+# para una generación: generar el calendario o jugar una partida la cambia)
+pending_fixture_cache = {}
 # Diccionario para almacenar las últimas acciones por usuario
 user_actions = {}
 # Rate limiting para sugerencias de partidas
 suggestion_timestamps = {}
 
+def league_directory(refresh=False):
+    """Ligas por slug (id, slug, name, season)"""
+    cached = league_directory_cache.get('leagues')
+    if not refresh and cached is not None and time.time() - cached[0] < LEAGUES_CACHE_SECONDS:
+        return cached[1]
+    try:
+        with read_db() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT id, slug, name, season FROM leagues ORDER BY id')
+            leagues = {row['slug']: dict(row) for row in cur.fetchall()}
+            cur.close()
+    except DatabaseError as e:
+        logger.error(f"Error leyendo las ligas: {str(e)}")
+        if cached is not None:
+            return cached[1]
+        leagues = {}
+    if not leagues:
+        leagues = {DEFAULT_LEAGUE_SLUG: {'id': DEFAULT_LEAGUE_ID, 'slug': DEFAULT_LEAGUE_SLUG,
+                                         'name': DEFAULT_LEAGUE_NAME, 'season': None}}
+    league_directory_cache['leagues'] = (time.time(), leagues)
+    return leagues
+
+def current_league_id():
+    """Liga de la petición en curso (ver select_league); fuera de una petición, la liga por defecto"""
+    if has_request_context() and 'league' in g:
+        return g.league['id']
+    return DEFAULT_LEAGUE_ID
+
+@app.before_request
+def start_job_queue():
+    """
+    El despachador de trabajos corre en todo proceso que atiende peticiones,
+    no solo en los que escriben: un worker reiniciado o una instancia que
+    solo lee también retoma los trabajos pendientes del outbox
+    """
+    job_queue.start()
+
+@app.before_request
+def select_league():
+    """
+    La liga se elige con ?league=<slug> y queda guardada en la sesión para
+    las páginas siguientes; sin elección, la liga por defecto
+    """
+    if request.endpoint in ('static', 'asset', 'favicon', 'service_worker'):
+        return None
+    leagues = league_directory()
+    slug = request.args.get('league')
+    if slug is not None:
+        if slug not in leagues:
+            return jsonify({'error': 'Liga no encontrada'}), 404
+        session['league'] = slug
+    league = leagues.get(slug or session.get('league'))
+    if league is None:
+        league = next((l for l in leagues.values() if l['id'] == DEFAULT_LEAGUE_ID), next(iter(leagues.values())))
+    g.league = league
+    return None
+
+@app.context_processor
+def inject_asset_url():
+    return {'asset_url': lambda name: url_for('asset', filename=asset_bundle.filename(name))}
+
+@app.after_request
+def compress_response(response):
+    """Comprime las respuestas HTML y JSON (br o gzip, según acepte el cliente)"""
+    if (response.direct_passthrough or response.is_streamed or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES or response.status_code < 200 or response.status_code == 204):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = preferred_encoding(request.headers.get('Accept-Encoding'))
+    data = response.get_data()
+    if encoding is None or len(data) < MIN_COMPRESS_BYTES:
+        return response
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+@app.context_processor
+def inject_league():
+    return {
+        'current_league': g.get('league'),
+        'leagues': list(league_directory().values())
+    }
+
 def rate_limit(max_requests=5, window=60):
     """
     Decorador para limitar peticiones por IP
@@ -381,125 +839,144 @@ def rate_limit(max_requests=5, window=60):
 
 @app.route('/')
 def index():
-    games, players_data = load_league_data()
-    
-    # Calcular ratings (en memoria)
-    with open('start.json', 'r', encoding='utf-8') as f:
-        start_data = json.load(f)
-        current_ratings = {p['name']: p['rating'] for p in start_data['players']}
-    
-    # Ordenar juegos por fecha (más antiguo primero)
-    games.sort(key=lambda x: x['date'])
-    
-    # Procesar juegos y calcular cambios
-    processed_games = []
-    historical_ratings = current_ratings.copy()
-    player_stats = {}  # Diccionario para mantener estadísticas de jugadores
-    
-    for game in games:
-        # Inicializar estadísticas si no existen
-        if game['white'] not in player_stats:
-            player_stats[game['white']] = {'white_games': 0, 'white_wins': 0, 'white_draws': 0,
-                                        'black_games': 0, 'black_wins': 0, 'black_draws': 0}
-        if game['black'] not in player_stats:
-            player_stats[game['black']] = {'white_games': 0, 'white_wins': 0, 'white_draws': 0,
-                                        'black_games': 0, 'black_wins': 0, 'black_draws': 0}
-        
-        # Actualizar estadísticas
-        player_stats[game['white']]['white_games'] += 1
-        player_stats[game['black']]['black_games'] += 1
-        
-        if game['result'] == 1:  # Victoria blancas
-            player_stats[game['white']]['white_wins'] += 1
-        elif game['result'] == 0:  # Victoria negras
-            player_stats[game['black']]['black_wins'] += 1
-        else:  # Empate
-            player_stats[game['white']]['white_draws'] += 1
-            player_stats[game['black']]['black_draws'] += 1
-        
-        # Verificar que ambos jugadores existan en current_ratings
-        if game['white'] not in historical_ratings or game['black'] not in historical_ratings:
-            continue
-            
-        white_rating = historical_ratings[game['white']]
-        black_rating = historical_ratings[game['black']]
-        
-        new_white, new_black = getElo(white_rating, black_rating, 50, game['result'])
-        white_change = new_white - white_rating
-        black_change = new_black - black_rating
-        
-        processed_games.append({
-            **game,
-            'white_display': format_name(game['white']),
-            'black_display': format_name(game['black']),
-            'white_rating': white_rating,  # Rating antes del juego
-            'black_rating': black_rating,  # Rating antes del juego
-            'white_change': white_change,
-            'black_change': black_change,
-            'date': game['date'].strftime('%Y-%m-%d %H:%M:%S')
-        })
-        
-        # Actualizar ratings históricos para el siguiente juego
-        historical_ratings[game['white']] = new_white
-        historical_ratings[game['black']] = new_black
-    
-    # Revertir el orden para mostrar los más recientes primero
-    processed_games.reverse() 
+    league = get_league()
+    games_this_week = weekly_games(league)
+    glicko = engine_ratings(league, 'glicko2')
+    primary = engine_ratings(league, RATING_ENGINE)['rating']
     
     # Preparar datos de jugadores usando los ratings finales (históricos)
     players = []
-    for p in players_data:
-        # Verificar que el jugador exista en historical_ratings
-        if p['name'] not in historical_ratings:
+    for player, player_id in enumerate(league.player_ids):
+        # Solo jugadores registrados y con rating inicial
+        if player_id < 0 or not league.rated[player]:
             continue
-            
-        # Calcular winrates
-        stats = player_stats.get(p['name'], {'white_games': 0, 'white_wins': 0, 'white_draws': 0,
-                                          'black_games': 0, 'black_wins': 0, 'black_draws': 0})
         
-        white_winrate = 0 if stats['white_games'] == 0 else \
-            round((stats['white_wins']) / stats['white_games'] * 100, 1)
-        
-        black_winrate = 0 if stats['black_games'] == 0 else \
-            round((stats['black_wins']) / stats['black_games'] * 100, 1)
+        white_winrate, black_winrate = league.winrates(player)
         
         players.append({
-            'id': p['id'],
-            'name': p['name'],
-            'display_name': format_name(p['name']),
-            'rating': historical_ratings[p['name']],
-            'games_this_week': p['games_this_week'],
+            'id': player_id,
+            'name': league.names[player],
+            'display_name': league.display_names[player],
+            'rating': league.ratings[player],
+            'games_this_week': games_this_week[player],
             'white_winrate': white_winrate,
             'black_winrate': black_winrate,
-            'white_games': stats['white_games'],
-            'black_games': stats['black_games'],
-            'warning': p['games_this_week'] < 3
+            'white_games': league.white_games[player],
+            'black_games': league.black_games[player],
+            'glicko_rating': int(round(glicko['rating'][player])),
+            'glicko_deviation': int(round(glicko['deviation'][player])),
+            'glicko_volatility': round(float(glicko['volatility'][player]), 4),
+            'sort_rating': float(primary[player]),
+            'warning': games_this_week[player] < 3
         })
     
-    players.sort(key=lambda x: x['rating'], reverse=True)
+    # Ordenar según el sistema de rating configurado (ELO por defecto)
+    players.sort(key=lambda x: x['sort_rating'], reverse=True)
+    
+    # Incertidumbre del ranking, si el trabajo de bootstrap ya la calculó
+    intervals = rating_intervals(league)
+    if intervals is not None:
+        by_id = {row['id']: row for row in intervals['players']}
+        for rank, player in enumerate(players):
+            row = by_id.get(player['id'])
+            if row is None or len(row['rank_probabilities']) != len(players):
+                continue
+            player['rating_lower'] = row['lower']
+            player['rating_upper'] = row['upper']
+            # Las posiciones del bootstrap son por ELO
+            if RATING_ENGINE == 'elo':
+                player['rank_probability'] = row['rank_probabilities'][rank]
+                player['podium_probability'] = sum(row['rank_probabilities'][:3])
     
     # Obtener el player_id del usuario actual si está logueado
     current_player_id = None
     if current_user.is_authenticated and current_user.player_name:
-        conn = get_db()
-        cur = conn.cursor()
-        cur.execute('SELECT id FROM players WHERE name = %s', (current_user.player_name,))
-        result = cur.fetchone()
-        if result:
-            current_player_id = result['id']
-        cur.close()
-        conn.close()
+        player = league.index.get(current_user.player_name)
+        if player is not None and league.player_ids[player] >= 0:
+            current_player_id = league.player_ids[player]
+    
+    # Solo las últimas partidas: el resto lo completa el caché del navegador (ver /api/changes)
+    history_complete = request.args.get('history') == 'all'
+    games = list(league.game_rows() if history_complete else islice(league.game_rows(), INITIAL_GAMES + 1))
+    if len(games) > INITIAL_GAMES and not history_complete:
+        games = games[:INITIAL_GAMES]
+    else:
+        history_complete = True
     
     return render_template('index.html',
                          players=players,
-                         games=processed_games,
+                         games=games,
+                         pending_games=pending_this_week(league),
+                         history_complete=history_complete,
+                         generation=league.generation,
                          is_admin=current_user.is_admin if not current_user.is_anonymous else False,
                          current_player_id=current_player_id)
 
+@app.route('/events')
+def events():
+    """
+    Stream de eventos (text/event-stream) con los cambios de la liga. Cada
+    evento lleva la generación como id; si el cliente se reconecta con un
+    Last-Event-ID anterior a la generación actual, se le pide recargar.
+    """
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    if last_event_id is None:
+        last_event_id = request.args.get('since', type=int)
+    
+    league_id = current_league_id()
+    with read_db() as conn:
+        cur = conn.cursor()
+        generation = get_generation(cur, league_id)
+        cur.close()
+    
+    subscription = event_broker.subscribe(league_id)
+    
+    def stream():
+        try:
+            yield 'retry: 5000\n\n'
+            if last_event_id is not None and last_event_id < generation:
+                yield format_event(generation, 'reload', json.dumps({'type': 'reload', 'generation': generation}))
+            while True:
+                pending = subscription.drain(HEARTBEAT_SECONDS)
+                if subscription.overflowed:
+                    yield format_event('', 'reload', json.dumps({'type': 'reload'}))
+                    return
+                if not pending:
+                    # Comentario para que proxies y navegador no cierren la conexión
+                    yield ': ping\n\n'
+                    continue
+                for event_id, name, data in pending:
+                    yield format_event(event_id, name, data)
+        finally:
+            event_broker.unsubscribe(subscription)
+    
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def insert_game(cur, league, white_name, black_name, result, played_at, added_by, has_lettuce_factor=False):
+    """Guarda una partida de la liga con su generación, su evento y sus trabajos derivados; devuelve la generación"""
+    delta = None
+    if RATING_ENGINE == 'elo':
+        # La clasificación en vivo solo se puede parchar cuando se ordena por ELO
+        def delta(generation):
+            return game_delta(league, generation, white_name, black_name, result, played_at,
+                              has_lettuce_factor, weekly_games(league, played_at))
+    generation = bump_generation(cur, league.league_id, delta)
+    
+    cur.execute(
+        'INSERT INTO games (league_id, white, black, result, date, added_by, has_lettuce_factor, generation) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)',
+        (league.league_id, white_name, black_name, result, played_at, added_by, has_lettuce_factor, generation)
+    )
+    enqueue_derived_jobs(cur, league.league_id, generation)
+    return generation
+
 @app.route('/add_game', methods=['POST'])
 @login_required
 def add_game():
-    if not current_user.is_admin and not current_user.player_name:
+    league_id = current_league_id()
+    if not current_user.is_admin and not current_user.player_in(league_id):
         flash('No tienes permiso para agregar partidas')
         return redirect(url_for('index'))
         
@@ -527,7 +1004,7 @@ def add_game():
     cur = conn.cursor()
     
     # Obtener nombres de jugadores por ID
-    cur.execute('SELECT id, name FROM players WHERE id IN (%s, %s)', (white_id, black_id))
+    cur.execute('SELECT id, name FROM players WHERE league_id = %s AND id IN (%s, %s)', (league_id, white_id, black_id))
     players = {str(row['id']): row['name'] for row in cur.fetchall()}
     
     if len(players) != 2:
@@ -539,7 +1016,7 @@ def add_game():
         
     # Verificar que el usuario sea parte del juego si no es admin
     if not current_user.is_admin:
-        if current_user.player_name not in [white_name, black_name]:
+        if current_user.player_in(league_id) not in [white_name, black_name]:
             flash('Solo puedes agregar partidas en las que hayas participado')
             return redirect(url_for('index'))
         
@@ -558,22 +1035,23 @@ def add_game():
         cur.execute('''
             SELECT COUNT(*) as recent_matches
             FROM games 
-            WHERE (white = %s AND black = %s OR white = %s AND black = %s)
+            WHERE league_id = %s
+            AND (white = %s AND black = %s OR white = %s AND black = %s)
             AND date >= NOW() - INTERVAL '7 days'
-        ''', (white_name, black_name, black_name, white_name))
+        ''', (league_id, white_name, black_name, black_name, white_name))
         
         recent_matches = cur.fetchone()['recent_matches']
         if recent_matches > 0:
             return jsonify({'error': 'Estos jugadores ya se han enfrentado recientemente'}), 400
         
-        cur.execute(
-            'INSERT INTO games (white, black, result, date, added_by, has_lettuce_factor) VALUES (%s, %s, %s, %s, %s, %s)',
-            (white_name, black_name, result, datetime.now(), current_user.id, has_lettuce_factor)
-        )
+        league = get_league(league_id, db_pool)
+        insert_game(cur, league, white_name, black_name, result, datetime.now(), current_user.id, has_lettuce_factor)
         
         conn.commit()
         cur.close()
         conn.close()
+        mark_write()
+        job_queue.wake()
         
         return redirect(url_for('index'))
         
@@ -632,14 +1110,14 @@ def login():
             # Buscar usuario
             cur.execute('''
                 SELECT id, username, password_hash, is_admin, 
-                       COALESCE(player_name, NULL) as player_name 
+                       COALESCE(player_name, NULL) as player_name, league_id
                 FROM users 
                 WHERE username = %s
             ''', (username,))
             user = cur.fetchone()
             
             if user and check_password_hash(user['password_hash'], password):
-                user_obj = User(user['id'], user['username'], user['is_admin'], user['player_name'])
+                user_obj = User(user['id'], user['username'], user['is_admin'], user['player_name'], user['league_id'])
                 login_user(user_obj)
                 
                 # Resetear intentos fallidos
@@ -656,7 +1134,7 @@ def login():
             app.logger.warning(f"Login fallido para usuario: {username}")
             flash('Usuario o contraseña incorrectos')
             
-        except psycopg2.Error as e:
+        except DatabaseError as e:
             app.logger.error(f"Error de base de datos en login: {str(e)}")
             flash('Error al conectar con la base de datos. Por favor intenta más tarde.')
         except Exception as e:
@@ -680,93 +1158,1399 @@ def logout():
     return redirect(url_for('index'))
 
 def get_player_game_counts():
-    conn = get_db()
-    cur = conn.cursor()
-    
-    # Contar juegos por jugador
-    cur.execute('''
-        SELECT p.name, COUNT(g.id) as games
-        FROM players p
-        LEFT JOIN (
-            SELECT white as player, id FROM games
-            UNION ALL
-            SELECT black as player, id FROM games
-        ) g ON p.name = g.player
-        GROUP BY p.name
-    ''')
-    player_counts = {row['name']: row['games'] for row in cur.fetchall()}
-    
-    # Contar juegos entre pares de jugadores
-    cur.execute('''
-        SELECT 
-            LEAST(white, black) as p1,
-            GREATEST(white, black) as p2,
-            COUNT(*) as games
-        FROM games
-        GROUP BY LEAST(white, black), GREATEST(white, black)
-    ''')
-    pair_counts = {(row['p1'], row['p2']): row['games'] for row in cur.fetchall()}
-    
-    cur.close()
-    conn.close()
+    """Partidas por jugador y por par de jugadores (LEAST, GREATEST), desde la matriz de enfrentamientos"""
+    league = get_league()
+    player_counts = {
+        league.names[player]: league.white_games[player] + league.black_games[player]
+        for player, player_id in enumerate(league.player_ids)
+        if player_id >= 0
+    }
+    pair_counts = {}
+    for a, b, games, _, _ in league.head_to_head.entries():
+        names = sorted((league.names[a], league.names[b]))
+        pair_counts[(names[0], names[1])] = games
     return player_counts, pair_counts
 
 @app.route('/favicon.ico')
 def favicon():
     return send_from_directory('static', 'favicon.ico')
 
-def get_players():
-    """Obtener lista de jugadores para el formulario de registro"""
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute('SELECT name FROM players ORDER BY name')
-    players = [{'name': row['name'], 'display_name': format_name(row['name'])} for row in cur.fetchall()]
-    cur.close()
-    conn.close()
-    return players
+@app.route('/static/assets/<filename>')
+def asset(filename):
+    """CSS y JS publicados (ver app/utils/assets.py): precomprimidos y con caché permanente"""
+    found = asset_bundle.variant(filename, request.headers.get('Accept-Encoding'))
+    if found is None:
+        return jsonify({'error': 'Archivo no encontrado'}), 404
+    data, encoding = found
+    mimetype = 'text/css' if filename.endswith('.css') else 'application/javascript'
+    response = Response(data, mimetype=mimetype)
+    response.headers['Cache-Control'] = IMMUTABLE
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
 
-@app.route('/register', methods=['GET', 'POST'])
-def register():
-    if request.method == 'POST':
-        username = request.form.get('username')
-        password = request.form.get('password')
-        player_name = request.form.get('player_name')
-        
-        if not all([username, password, player_name]):  # Ahora player_name es requerido
-            flash('Usuario, contraseña y jugador son requeridos')
-            return render_template('register.html', players=get_players())
-            
-        conn = get_db()
-        cur = conn.cursor()
-        
-        try:
-            # Verificar si el usuario ya existe
-            cur.execute('SELECT id FROM users WHERE username = %s', (username,))
-            if cur.fetchone():
-                flash('El nombre de usuario ya está en uso')
-                return render_template('register.html', players=get_players())
-            
-            # Verificar si el jugador existe
-            cur.execute('SELECT name FROM players WHERE name = %s', (player_name,))
-            if not cur.fetchone():
-                flash('El jugador no existe en la liga')
-                return render_template('register.html', players=get_players())
-            
-            # Crear el usuario
-            cur.execute(
-                'INSERT INTO users (username, password_hash, player_name) VALUES (%s, %s, %s)',
-                (username, generate_password_hash(password), player_name)
-            )
-            
-            conn.commit()
-            app.logger.info(f"Usuario creado exitosamente: {username} asociado a jugador: {player_name}")
-            flash('Usuario creado exitosamente')
-            return redirect(url_for('login'))
-            
-        except Exception as e:
-            app.logger.error(f"Error en registro: {str(e)}")
+@app.route('/sw.js')
+def service_worker():
+    # Servido desde la raíz para que su alcance cubra todo el sitio
+    response = send_from_directory('static', 'sw.js', mimetype='application/javascript')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def parse_date_arg(name, end_of_day=False):
+    """Lee un parámetro de fecha ISO (YYYY-MM-DD o YYYY-MM-DD HH:MM:SS); lanza ValueError si es inválido"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    date = datetime.fromisoformat(value)
+    # Una fecha sin hora como límite superior incluye el día completo
+    if end_of_day and len(value) == 10:
+        date += timedelta(days=1) - timedelta(microseconds=1)
+    return date
+
+def history_args():
+    """Parámetros comunes de las series de rating: from, to, points y mode"""
+    start = parse_date_arg('from')
+    end = parse_date_arg('to', end_of_day=True)
+    points = request.args.get('points', type=int)
+    if points is not None and not 2 <= points <= MAX_HISTORY_POINTS:
+        raise ValueError('points fuera de rango')
+    mode = request.args.get('mode', 'lttb')
+    if mode not in ('lttb', 'daily'):
+        raise ValueError('mode inválido')
+    return start, end, points, mode
+
+def player_summary(league, player):
+    return {
+        'id': league.player_ids[player],
+        'name': league.names[player],
+        'display_name': league.display_names[player],
+        'initial_rating': league.initial_ratings[player],
+        'rating': league.ratings[player]
+    }
+
+@app.route('/api/players/<int:player_id>/rating-history')
+def player_rating_history(player_id):
+    try:
+        start, end, points, mode = history_args()
+    except ValueError:
+        return jsonify({'error': 'Parámetros inválidos'}), 400
+    
+    league = get_league()
+    player = league.by_id.get(player_id)
+    if player is None or not league.rated[player]:
+        return jsonify({'error': 'Jugador no encontrado'}), 404
+    
+    dates, ratings = league.rating_history(player, start, end)
+    return jsonify({
+        **player_summary(league, player),
+        'total': len(dates),
+        'points': downsample(dates, ratings, points, mode)
+    })
+
+def player_stats_summary(league, player):
+    """Estadísticas de rendimiento del jugador, con la mejor victoria y las últimas partidas detalladas"""
+    stats = league.player_stats.summary(player)
+    game = stats.pop('best_win_game')
+    stats['best_win'] = None if game is None else {
+        'opponent': league.names[league.black[game] if league.white[game] == player else league.white[game]],
+        'opponent_rating': stats['best_win_rating'],
+        'date': from_micros(league.played_at[game]).strftime('%Y-%m-%d'),
+    }
+    stats['recent_games'] = [{
+        'opponent': league.names[league.black[game] if league.white[game] == player else league.white[game]],
+        'opponent_rating': opponent_rating,
+        'color': 'white' if league.white[game] == player else 'black',
+        'score': points / 2,
+        'rating_change': change,
+        'date': from_micros(league.played_at[game]).strftime('%Y-%m-%d'),
+    } for points, opponent_rating, change, game in reversed(league.player_stats.form(player))]
+    return stats
+
+@app.route('/api/players/<int:player_id>/stats')
+def player_stats(player_id):
+    """Rendimiento, puntaje esperado, mejor victoria, rachas y forma reciente (se mantienen al agregar cada partida)"""
+    league = get_league()
+    player = league.by_id.get(player_id)
+    if player is None or not league.rated[player]:
+        return jsonify({'error': 'Jugador no encontrado'}), 404
+    return jsonify({**player_summary(league, player), 'stats': player_stats_summary(league, player)})
+
+@app.route('/players/<int:player_id>')
+def player_profile(player_id):
+    league = get_league()
+    player = league.by_id.get(player_id)
+    if player is None or not league.rated[player]:
+        abort(404)
+    white_winrate, black_winrate = league.winrates(player)
+    return render_template('player.html',
+                         player=player_summary(league, player),
+                         stats=player_stats_summary(league, player),
+                         white_winrate=white_winrate,
+                         black_winrate=black_winrate)
+
+@app.route('/api/rating-history')
+def rating_history_overlay():
+    """Series de varios jugadores para superponerlas en un mismo gráfico (?players=1,2,3)"""
+    try:
+        start, end, points, mode = history_args()
+        player_ids = [int(value) for value in request.args.get('players', '').split(',') if value]
+    except ValueError:
+        return jsonify({'error': 'Parámetros inválidos'}), 400
+    
+    if not player_ids or len(player_ids) > MAX_OVERLAY_PLAYERS:
+        return jsonify({'error': f'Indica entre 1 y {MAX_OVERLAY_PLAYERS} jugadores'}), 400
+    
+    league = get_league()
+    players = [league.by_id.get(player_id) for player_id in player_ids]
+    if any(player is None or not league.rated[player] for player in players):
+        return jsonify({'error': 'Jugador no encontrado'}), 404
+    
+    series = league.rating_history_overlay(players, start, end)
+    return jsonify({'players': [
+        {
+            **player_summary(league, player),
+            'total': len(series[player][0]),
+            'points': downsample(series[player][0], series[player][1], points, mode)
+        }
+        for player in dict.fromkeys(players)
+    ]})
+
+@app.route('/api/standings')
+def standings():
+    """Clasificación de la liga en un instante dado (?at=YYYY-MM-DD HH:MM:SS, por defecto ahora)"""
+    try:
+        at = parse_date_arg('at', end_of_day=True) or datetime.now()
+    except ValueError:
+        return jsonify({'error': 'Fecha inválida'}), 400
+    
+    league = get_league()
+    ratings, games, played = league.state_at(at)
+    games_in_week = weekly_games(league, at)
+    
+    rows = [
+        {
+            'id': player_id,
+            'name': league.names[player],
+            'display_name': league.display_names[player],
+            'rating': ratings[player],
+            'games': games[player],
+            'games_this_week': games_in_week[player],
+            'warning': games_in_week[player] < 3
+        }
+        for player, player_id in enumerate(league.player_ids)
+        if player_id >= 0 and league.rated[player]
+    ]
+    rows.sort(key=lambda x: x['rating'], reverse=True)
+    for rank, row in enumerate(rows, start=1):
+        row['rank'] = rank
+    
+    return jsonify({
+        'at': at.strftime('%Y-%m-%d %H:%M:%S'),
+        'generation': league.generation,
+        'games_played': played,
+        'standings': rows
+    })
+
+def build_projection(league, simulations=DEFAULT_SIMULATIONS, weeks=DEFAULT_PROJECTION_WEEKS, seed=None):
+    """Proyección de fin de temporada de la liga por Monte Carlo, o None si no hay suficientes jugadores"""
+    players = [player for player, player_id in enumerate(league.player_ids)
+               if player_id >= 0 and league.rated[player]]
+    if len(players) < 2:
+        return None
+    
+    ratings, activity, draw_rate = league_inputs(league, players)
+    result = simulate_season(ratings, activity, draw_rate, k=league.k, weeks=weeks,
+                             simulations=simulations, seed=seed)
+    
+    rows = []
+    for i, player in enumerate(players):
+        rows.append({
+            'id': league.player_ids[player],
+            'name': league.names[player],
+            'display_name': league.display_names[player],
+            'rating': league.ratings[player],
+            'games_per_week': round(float(activity[i]), 2),
+            'expected_rating': round(float(result['expected_rating'][i]), 1),
+            'rating_std': round(float(result['rating_std'][i]), 1),
+            'expected_rank': round(float(result['expected_rank'][i]), 2),
+            'title_probability': round(float(result['title_probability'][i]), 4),
+            'podium_probability': round(float(result['podium_probability'][i]), 4),
+            'last_place_probability': round(float(result['last_place_probability'][i]), 4),
+            'expected_penalty': round(float(result['expected_penalty'][i]), 1),
+            'expected_penalized_weeks': round(float(result['expected_penalized_weeks'][i]), 2)
+        })
+    rows.sort(key=lambda x: x['expected_rank'])
+    
+    return {
+        'generation': league.generation,
+        'simulations': simulations,
+        'weeks': weeks,
+        'seed': seed,
+        'draw_rate': round(draw_rate, 4),
+        'players': rows
+    }
+
+@app.route('/api/projections')
+def projections():
+    """
+    Proyección de fin de temporada por Monte Carlo, calculada en segundo
+    plano para cada generación. Los administradores pueden pedir otros
+    parámetros (?simulations=&weeks=&seed=), que se simulan en la petición.
+    """
+    custom = any(name in request.args for name in ('simulations', 'weeks', 'seed'))
+    if not custom:
+        league = get_league()
+        payload = season_projection(league)
+        if payload is None:
+            return jsonify({'error': 'La proyección aún no está calculada'}), 404
+        return jsonify({**payload, 'stale': payload['generation'] != league.generation})
+    
+    if not (current_user.is_authenticated and current_user.is_admin):
+        return jsonify({'error': 'Solo administradores pueden elegir los parámetros de la proyección'}), 403
+    simulations = request.args.get('simulations', DEFAULT_SIMULATIONS, type=int)
+    weeks = request.args.get('weeks', DEFAULT_PROJECTION_WEEKS, type=int)
+    seed = request.args.get('seed', type=int)
+    if not 1 <= simulations <= MAX_SIMULATIONS or not 1 <= weeks <= MAX_PROJECTION_WEEKS:
+        return jsonify({'error': 'Parámetros inválidos'}), 400
+    
+    league = get_league()
+    key = (league.league_id, league.generation, simulations, weeks, seed)
+    payload = projection_cache.get(key)
+    if payload is not None:
+        return jsonify(payload)
+    
+    payload = build_projection(league, simulations, weeks, seed)
+    if payload is None:
+        return jsonify({'error': 'No hay suficientes jugadores'}), 400
+    
+    # Solo se conservan proyecciones de la generación actual de cada liga
+    for old_key in [k for k in projection_cache if k[0] == league.league_id and k[1] != league.generation]:
+        del projection_cache[old_key]
+    if len(projection_cache) >= MAX_CACHED_PROJECTIONS:
+        del projection_cache[next(iter(projection_cache))]
+    projection_cache[key] = payload
+    return jsonify(payload)
+
+def change_player(league, player):
+    return {
+        **player_summary(league, player),
+        'white_games': league.white_games[player],
+        'white_wins': league.white_wins[player],
+        'white_draws': league.white_draws[player],
+        'black_games': league.black_games[player],
+        'black_wins': league.black_wins[player],
+        'black_draws': league.black_draws[player]
+    }
+
+def change_game(league, game):
+    return {
+        'white': league.names[league.white[game]],
+        'black': league.names[league.black[game]],
+        'result': league.result[game] / 2,
+        'date': from_micros(league.played_at[game]).strftime('%Y-%m-%d %H:%M:%S'),
+        'has_lettuce_factor': bool(league.lettuce[game]),
+        'white_rating': league.white_rating[game],
+        'black_rating': league.black_rating[game],
+        'white_change': league.white_change[game],
+        'black_change': league.black_change[game],
+        'generation': league.game_generation[game]
+    }
+
+@app.route('/api/changes')
+def changes():
+    """
+    Cambios de la liga después de una generación (?since=): partidas nuevas y
+    el estado actual de los jugadores afectados. Sin `since`, o si hubo un
+    reinicio después, devuelve la liga completa (full = true).
+    """
+    since = request.args.get('since', 0, type=int)
+    if since < 0:
+        return jsonify({'error': 'Parámetros inválidos'}), 400
+    
+    league = get_league()
+    with read_db() as conn:
+        cur = conn.cursor()
+        cur.execute('SELECT reset_generation FROM league_meta WHERE id = %s', (league.league_id,))
+        row = cur.fetchone()
+        cur.close()
+    reset_generation = row['reset_generation'] if row else 0
+    
+    if league.generation is not None and since >= league.generation:
+        # Nada nuevo (o este proceso aún no ve la generación del cliente)
+        return jsonify({'generation': since, 'full': False, 'players': [], 'games': []})
+    
+    full = since == 0 or since < reset_generation
+    if full:
+        games = [game for game in range(len(league)) if league.is_rated(game)]
+        players = [player for player, player_id in enumerate(league.player_ids)
+                   if player_id >= 0 and league.rated[player]]
+    else:
+        games = [game for game in league.games_since(since) if league.is_rated(game)]
+        touched = {league.white[game] for game in games} | {league.black[game] for game in games}
+        players = [player for player, player_id in enumerate(league.player_ids)
+                   if player_id >= 0 and league.rated[player]
+                   and (player in touched or league.player_generation[player] > since)]
+    
+    return jsonify({
+        'generation': league.generation,
+        'full': full,
+        'players': [change_player(league, player) for player in players],
+        'games': [change_game(league, game) for game in games]
+    })
+
+@app.route('/api/ratings')
+def ratings_by_engine():
+    """Ratings actuales según un sistema de rating (?engine=elo|glicko2|bradley_terry)"""
+    name = request.args.get('engine', RATING_ENGINE)
+    if name not in ENGINES:
+        return jsonify({'error': 'Sistema de rating desconocido'}), 400
+
+    league = get_league()
+    result = engine_ratings(league, name)
+
+    rows = []
+    for player, player_id in enumerate(league.player_ids):
+        if player_id < 0 or not league.rated[player]:
+            continue
+        row = {
+            'id': player_id,
+            'name': league.names[player],
+            'display_name': league.display_names[player],
+            'rating': round(float(result['rating'][player]), 1)
+        }
+        if 'deviation' in result:
+            row['deviation'] = round(float(result['deviation'][player]), 1)
+        rows.append(row)
+    rows.sort(key=lambda x: x['rating'], reverse=True)
+
+    payload = {
+        'engine': name,
+        'generation': league.generation,
+        'players': rows
+    }
+    if 'draw_parameter' in result:
+        payload['draw_parameter'] = round(float(result['draw_parameter']), 4)
+    return jsonify(payload)
+
+def ranked_players(league):
+    """Jugadores registrados con rating, de mayor a menor ELO"""
+    players = [player for player, player_id in enumerate(league.player_ids)
+               if player_id >= 0 and league.rated[player]]
+    players.sort(key=lambda player: league.ratings[player], reverse=True)
+    return players
+
+def pair_summary(league, a, b, games, points, last):
+    return {
+        'a': league.player_ids[a],
+        'b': league.player_ids[b],
+        'games': games,
+        'score_a': points / 2,
+        'score_b': games - points / 2,
+        'last_played': from_micros(last).strftime('%Y-%m-%d %H:%M:%S') if games else None
+    }
+
+@app.route('/api/head-to-head')
+def head_to_head():
+    """Enfrentamientos directos: un par (?a=&b=), todos los pares o la matriz completa (?format=matrix)"""
+    league = get_league()
+    h2h = league.head_to_head
+    a_id = request.args.get('a', type=int)
+    b_id = request.args.get('b', type=int)
+    
+    if a_id is not None or b_id is not None:
+        a = league.by_id.get(a_id)
+        b = league.by_id.get(b_id)
+        if a is None or b is None:
+            return jsonify({'error': 'Jugador no encontrado'}), 404
+        if a == b:
+            return jsonify({'error': 'Parámetros inválidos'}), 400
+        return jsonify({
+            'generation': league.generation,
+            'players': [player_summary(league, a), player_summary(league, b)],
+            **pair_summary(league, a, b, *h2h.pair(a, b))
+        })
+    
+    players = ranked_players(league)
+    payload = {
+        'generation': league.generation,
+        'players': [player_summary(league, player) for player in players]
+    }
+    
+    if request.args.get('format') == 'matrix':
+        if len(players) > DENSE_MAX_PLAYERS:
+            return jsonify({'error': f'La matriz completa solo está disponible hasta {DENSE_MAX_PLAYERS} jugadores'}), 400
+        games, points, _ = h2h.matrix(players)
+        # Filas y columnas en el orden de `players`; score es el puntaje de la fila
+        payload['games'] = games.tolist()
+        payload['score'] = (points / 2).tolist()
+        return jsonify(payload)
+    
+    payload['pairs'] = [pair_summary(league, *entry) for entry in h2h.entries(players)]
+    return jsonify(payload)
+
+@app.route('/crosstable')
+def crosstable():
+    """Tabla cruzada por bloques de CROSSTABLE_PAGE_SIZE jugadores del ranking (?page=)"""
+    league = get_league()
+    ranked = ranked_players(league)
+    pages = max(1, -(-len(ranked) // CROSSTABLE_PAGE_SIZE))
+    page = min(max(request.args.get('page', 1, type=int), 1), pages)
+    offset = (page - 1) * CROSSTABLE_PAGE_SIZE
+    players = ranked[offset:offset + CROSSTABLE_PAGE_SIZE]
+    games, points, last_played = league.head_to_head.matrix(players)
+    stats = league.player_stats
+    
+    rows = []
+    for i, player in enumerate(players):
+        cells = []
+        for j in range(len(players)):
+            count = int(games[i, j])
+            cells.append({
+                'games': count,
+                'score': points[i, j] / 2,
+                'last_played': from_micros(int(last_played[i, j])).strftime('%Y-%m-%d') if count else None,
+                'self': i == j
+            })
+        rows.append({
+            'display_name': league.display_names[player],
+            'rating': league.ratings[player],
+            # Totales contra todos los rivales, no solo los de la página
+            'score': stats.points[player] / 2,
+            'games': stats.games[player],
+            'cells': cells
+        })
+    
+    return render_template('crosstable.html', rows=rows, offset=offset, page=page, pages=pages)
+
+def load_tournament(cur, tournament_id, league_id, lock=False):
+    """Torneo de la liga (FOR UPDATE con `lock`: un solo pareo o resultado a la vez), o None"""
+    cur.execute('SELECT id, name, rounds, created_at FROM tournaments WHERE id = %s AND league_id = %s'
+                + (' FOR UPDATE' if lock else ''), (tournament_id, league_id))
+    return cur.fetchone()
+
+def tournament_rounds(cur, tournament_id):
+    """Pareos de cada ronda, en orden: [[(tablero, blancas, negras, resultado)]]"""
+    cur.execute('''
+        SELECT round, board, white, black, result FROM tournament_pairings
+        WHERE tournament_id = %s ORDER BY round, board
+    ''', (tournament_id,))
+    rounds = []
+    for row in cur.fetchall():
+        while len(rounds) < row['round']:
+            rounds.append([])
+        rounds[row['round'] - 1].append((row['board'], row['white'], row['black'], row['result']))
+    return rounds
+
+def tournament_seeds(cur, tournament_id):
+    """nombre -> (siembra, rating al inscribirse)"""
+    cur.execute('SELECT player_name, seed, rating FROM tournament_players WHERE tournament_id = %s', (tournament_id,))
+    return {row['player_name']: (row['seed'], row['rating']) for row in cur.fetchall()}
+
+def tournament_standings(cur, tournament_id, round_number):
+    """Clasificación guardada al cerrar la ronda: nombre -> (puntos, buchholz, sonneborn_berger)"""
+    cur.execute('''
+        SELECT player_name, points, buchholz, sonneborn_berger FROM tournament_standings
+        WHERE tournament_id = %s AND round = %s
+    ''', (tournament_id, round_number))
+    return {row['player_name']: (row['points'], row['buchholz'], row['sonneborn_berger']) for row in cur.fetchall()}
+
+def swiss_players(seeds, rounds, standings):
+    """Estado de cada inscrito para parear la ronda siguiente"""
+    players = {name: SwissPlayer(name, rating, standings.get(name, (0.0,))[0]) for name, (_, rating) in seeds.items()}
+    for pairings in rounds:
+        for _, white, black, _ in pairings:
+            if black is None:
+                players[white].had_bye = True
+                continue
+            players[white].colors += 'W'
+            players[black].colors += 'B'
+            players[white].opponents.add(black)
+            players[black].opponents.add(white)
+    return list(players.values())
+
+def close_round(cur, tournament_id, seeds, rounds):
+    """Guarda la clasificación de la última ronda (con todos sus resultados) a partir de la anterior"""
+    round_number = len(rounds)
+    previous = tournament_standings(cur, tournament_id, round_number - 1) if round_number > 1 else {}
+    previous = {name: previous.get(name, (0.0, 0.0, 0.0)) for name in seeds}
+    history = {}
+    for pairings in rounds[:-1]:
+        for _, white, black, result in pairings:
+            if black is not None:
+                history.setdefault(white, []).append((black, result))
+                history.setdefault(black, []).append((white, 1 - result))
+    results = [(white, black, result) for _, white, black, result in rounds[-1]]
+    standings = round_standings(previous, history, results)
+    cur.executemany('''
+        INSERT INTO tournament_standings (tournament_id, round, player_name, points, buchholz, sonneborn_berger)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    ''', [(tournament_id, round_number, name, *values) for name, values in standings.items()])
+
+def tournament_summary(cur, tournament):
+    """Rondas y clasificación (de la última ronda cerrada) de un torneo"""
+    seeds = tournament_seeds(cur, tournament['id'])
+    rounds = tournament_rounds(cur, tournament['id'])
+    closed = len(rounds) if rounds and all(result is not None for *_, result in rounds[-1]) else len(rounds) - 1
+    standings = tournament_standings(cur, tournament['id'], closed) if closed > 0 else {}
+    standings = {name: standings.get(name, (0.0, 0.0, 0.0)) for name in seeds}
+    ranked = ranking(standings, {name: seed for name, (seed, _) in seeds.items()})
+    return {
+        'id': tournament['id'],
+        'name': tournament['name'],
+        'rounds': tournament['rounds'],
+        'closed_rounds': max(closed, 0),
+        'standings': [{
+            'position': position,
+            'name': name,
+            'display_name': format_name(name),
+            'seed': seeds[name][0],
+            'rating': seeds[name][1],
+            'points': standings[name][0],
+            'buchholz': standings[name][1],
+            'sonneborn_berger': standings[name][2],
+        } for position, name in enumerate(ranked, 1)],
+        'pairings': [[{
+            'board': board,
+            'white': white,
+            'black': black,
+            'white_display': format_name(white),
+            'black_display': format_name(black) if black else None,
+            'result': result,
+        } for board, white, black, result in pairings] for pairings in rounds],
+    }
+
+@app.route('/tournaments')
+def tournaments():
+    with read_db() as conn:
+        cur = conn.cursor()
+        cur.execute('SELECT id, name, rounds, created_at FROM tournaments WHERE league_id = %s ORDER BY id DESC',
+                    (current_league_id(),))
+        rows = cur.fetchall()
+        cur.close()
+    league = get_league()
+    players = [{'id': league.player_ids[player], 'display_name': league.display_names[player]}
+               for player in ranked_players(league)]
+    return render_template('tournaments.html', tournaments=rows, players=players)
+
+@app.route('/tournaments', methods=['POST'])
+@login_required
+def add_tournament():
+    """Crea un torneo suizo; la siembra es el rating actual de la liga"""
+    if not current_user.is_admin:
+        flash('Solo administradores pueden crear torneos')
+        return redirect(url_for('tournaments'))
+    
+    name = (request.form.get('name') or '').strip()
+    try:
+        rounds = int(request.form.get('rounds', ''))
+    except ValueError:
+        rounds = 0
+    league = get_league(current_league_id(), db_pool)
+    selected = set(request.form.getlist('players'))
+    entrants = [player for player in ranked_players(league)
+                if not selected or str(league.player_ids[player]) in selected]
+    if not name or not 1 <= rounds < len(entrants):
+        flash('Nombre requerido, al menos dos jugadores y menos rondas que jugadores')
+        return redirect(url_for('tournaments'))
+    
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute('INSERT INTO tournaments (league_id, name, rounds) VALUES (%s, %s, %s) RETURNING id',
+                    (league.league_id, name, rounds))
+        tournament_id = cur.fetchone()[0]
+        cur.executemany(
+            'INSERT INTO tournament_players (tournament_id, player_name, seed, rating) VALUES (%s, %s, %s, %s)',
+            [(tournament_id, league.names[player], seed, league.ratings[player])
+             for seed, player in enumerate(entrants, 1)]
+        )
+        conn.commit()
+        mark_write()
+    except Exception as e:
+        logger.error(f"Error al crear el torneo: {str(e)}")
+        conn.rollback()
+        flash('Error al crear el torneo')
+        return redirect(url_for('tournaments'))
+    finally:
+        cur.close()
+        conn.close()
+    
+    return redirect(url_for('tournament', tournament_id=tournament_id))
+
+@app.route('/tournaments/<int:tournament_id>')
+def tournament(tournament_id):
+    with read_db() as conn:
+        cur = conn.cursor()
+        row = load_tournament(cur, tournament_id, current_league_id())
+        summary = tournament_summary(cur, row) if row else None
+        cur.close()
+    if summary is None:
+        return jsonify({'error': 'Torneo no encontrado'}), 404
+    return render_template('tournament.html', tournament=summary)
+
+@app.route('/api/tournaments/<int:tournament_id>')
+def api_tournament(tournament_id):
+    with read_db() as conn:
+        cur = conn.cursor()
+        row = load_tournament(cur, tournament_id, current_league_id())
+        summary = tournament_summary(cur, row) if row else None
+        cur.close()
+    if summary is None:
+        return jsonify({'error': 'Torneo no encontrado'}), 404
+    return jsonify(summary)
+
+@app.route('/tournaments/<int:tournament_id>/rounds', methods=['POST'])
+@login_required
+def pair_tournament_round(tournament_id):
+    """Parea la ronda siguiente (la anterior debe tener todos sus resultados)"""
+    if not current_user.is_admin:
+        flash('Solo administradores pueden parear rondas')
+        return redirect(url_for('tournament', tournament_id=tournament_id))
+    
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        row = load_tournament(cur, tournament_id, current_league_id(), lock=True)
+        if row is None:
+            return jsonify({'error': 'Torneo no encontrado'}), 404
+        rounds = tournament_rounds(cur, tournament_id)
+        if len(rounds) >= row['rounds']:
+            flash('El torneo ya jugó todas sus rondas')
+            return redirect(url_for('tournament', tournament_id=tournament_id))
+        if rounds and any(result is None for *_, result in rounds[-1]):
+            flash('Faltan resultados de la ronda anterior')
+            return redirect(url_for('tournament', tournament_id=tournament_id))
+        
+        seeds = tournament_seeds(cur, tournament_id)
+        standings = tournament_standings(cur, tournament_id, len(rounds)) if rounds else {}
+        boards, bye = pair_round(swiss_players(seeds, rounds, standings))
+        round_number = len(rounds) + 1
+        pairings = [(tournament_id, round_number, board, white, black, None)
+                    for board, (white, black) in enumerate(boards, 1)]
+        if bye:
+            pairings.append((tournament_id, round_number, len(boards) + 1, bye, None, BYE_POINTS))
+        cur.executemany('''
+            INSERT INTO tournament_pairings (tournament_id, round, board, white, black, result)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        ''', pairings)
+        conn.commit()
+        mark_write()
+    except Exception as e:
+        logger.error(f"Error al parear la ronda: {str(e)}")
+        conn.rollback()
+        flash('Error al parear la ronda')
+    finally:
+        cur.close()
+        conn.close()
+    
+    return redirect(url_for('tournament', tournament_id=tournament_id))
+
+@app.route('/tournaments/<int:tournament_id>/results', methods=['POST'])
+@login_required
+def add_tournament_result(tournament_id):
+    """Resultado de un tablero: queda como partida de la liga y, si completa la ronda, la cierra"""
+    if not current_user.is_admin:
+        flash('Solo administradores pueden cargar resultados del torneo')
+        return redirect(url_for('tournament', tournament_id=tournament_id))
+    try:
+        round_number = int(request.form.get('round', ''))
+        board = int(request.form.get('board', ''))
+        result = float(request.form.get('result', ''))
+        if result not in [0, 0.5, 1]:
+            raise ValueError
+    except ValueError:
+        flash('Resultado inválido')
+        return redirect(url_for('tournament', tournament_id=tournament_id))
+    
+    league_id = current_league_id()
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        row = load_tournament(cur, tournament_id, league_id, lock=True)
+        if row is None:
+            return jsonify({'error': 'Torneo no encontrado'}), 404
+        cur.execute('''
+            SELECT white, black FROM tournament_pairings
+            WHERE tournament_id = %s AND round = %s AND board = %s AND result IS NULL AND black IS NOT NULL
+        ''', (tournament_id, round_number, board))
+        pairing = cur.fetchone()
+        if pairing is None:
+            flash('El tablero no existe o ya tiene resultado')
+            return redirect(url_for('tournament', tournament_id=tournament_id))
+        
+        cur.execute('''
+            UPDATE tournament_pairings SET result = %s
+            WHERE tournament_id = %s AND round = %s AND board = %s
+        ''', (result, tournament_id, round_number, board))
+        league = get_league(league_id, db_pool)
+        insert_game(cur, league, pairing['white'], pairing['black'], result, datetime.now(), current_user.id)
+        
+        rounds = tournament_rounds(cur, tournament_id)
+        if len(rounds) == round_number and all(r is not None for *_, r in rounds[-1]):
+            close_round(cur, tournament_id, tournament_seeds(cur, tournament_id), rounds)
+        conn.commit()
+        mark_write()
+        job_queue.wake()
+    except Exception as e:
+        logger.error(f"Error al guardar el resultado del torneo: {str(e)}")
+        conn.rollback()
+        flash('Error al guardar el resultado')
+    finally:
+        cur.close()
+        conn.close()
+    
+    return redirect(url_for('tournament', tournament_id=tournament_id))
+
+def load_fixtures(cur, league_id, start, end=None):
+    """Partidas programadas desde la semana `start` (hasta `end`, sin incluirla): [(semana, blancas, negras)]"""
+    query = 'SELECT week_start, white, black FROM fixtures WHERE league_id = %s AND week_start >= %s'
+    params = [league_id, start]
+    if end is not None:
+        query += ' AND week_start < %s'
+        params.append(end)
+    cur.execute(query + ' ORDER BY week_start, id', params)
+    return [(row['week_start'], row['white'], row['black']) for row in cur.fetchall()]
+
+def load_unavailability(cur, league_id, start, end=None):
+    """Semanas sin disponibilidad desde `start` (hasta `end`): semana -> nombres"""
+    query = 'SELECT week_start, player_name FROM player_unavailability WHERE league_id = %s AND week_start >= %s'
+    params = [league_id, start]
+    if end is not None:
+        query += ' AND week_start < %s'
+        params.append(end)
+    cur.execute(query, params)
+    unavailable = {}
+    for row in cur.fetchall():
+        unavailable.setdefault(row['week_start'], set()).add(row['player_name'])
+    return unavailable
+
+def fixture_weeks(fixtures, pending, player_name=None):
+    """Partidas programadas agrupadas por semana, marcando las pendientes (`pending`) y las de `player_name`"""
+    weeks = []
+    for (week, white, black), pending in zip(fixtures, pending):
+        if not weeks or weeks[-1]['week_start'] != week.strftime('%Y-%m-%d'):
+            weeks.append({'week_start': week.strftime('%Y-%m-%d'), 'fixtures': []})
+        weeks[-1]['fixtures'].append({
+            'white': white,
+            'black': black,
+            'white_display': format_name(white),
+            'black_display': format_name(black),
+            'pending': pending,
+            'mine': player_name is not None and player_name in (white, black),
+        })
+    return weeks
+
+def current_player_name():
+    return current_user.player_name if current_user.is_authenticated else None
+
+def schedule_summary(league, start):
+    """Calendario desde la semana `start` y las semanas sin disponibilidad de cada jugador"""
+    with read_db() as conn:
+        cur = conn.cursor()
+        fixtures = load_fixtures(cur, league.league_id, start)
+        unavailable = load_unavailability(cur, league.league_id, start)
+        cur.close()
+    return {
+        'weeks': fixture_weeks(fixtures, pending_fixtures(league, fixtures), current_player_name()),
+        'unavailable': {week.strftime('%Y-%m-%d'): sorted(names) for week, names in sorted(unavailable.items())},
+    }
+
+def pending_this_week(league, now=None):
+    """
+    Partidas programadas de la semana en curso que aún no se juegan,
+    primero las del usuario
+    """
+    start = week_start(now or datetime.now())
+    cached = pending_fixture_cache.get(league.league_id)
+    if cached is None or cached['generation'] != league.generation or cached['week'] != start:
+        try:
+            with read_db() as conn:
+                cur = conn.cursor()
+                fixtures = load_fixtures(cur, league.league_id, start, start + WEEK)
+                cur.close()
+        except DatabaseError as e:
+            # El calendario es opcional: la página principal se muestra igual sin él
+            logger.error(f"Error leyendo el calendario: {str(e)}")
+            return []
+        pending = [fixture for fixture, flag in zip(fixtures, pending_fixtures(league, fixtures)) if flag]
+        cached = pending_fixture_cache[league.league_id] = {
+            'generation': league.generation, 'week': start, 'fixtures': pending}
+    weeks = fixture_weeks(cached['fixtures'], [True] * len(cached['fixtures']), current_player_name())
+    fixtures = [fixture for week in weeks for fixture in week['fixtures']]
+    fixtures.sort(key=lambda fixture: not fixture['mine'])
+    return fixtures
+
+@app.route('/schedule')
+def schedule():
+    league = get_league()
+    start = week_start(datetime.now())
+    # Semanas en que el jugador (o un admin, por cualquiera) puede avisar que no juega
+    upcoming = [(start + WEEK * week).strftime('%Y-%m-%d') for week in range(DEFAULT_WEEKS)]
+    return render_template('schedule.html',
+                         schedule=schedule_summary(league, start),
+                         upcoming=upcoming,
+                         players=[league.names[player] for player in ranked_players(league)],
+                         player_name=current_player_name(),
+                         default_weeks=DEFAULT_WEEKS,
+                         max_weeks=MAX_WEEKS,
+                         start=start.strftime('%Y-%m-%d'))
+
+@app.route('/api/schedule')
+def api_schedule():
+    """Calendario desde la semana de `from` (por defecto, la actual)"""
+    try:
+        start = week_start(parse_date_arg('from') or datetime.now())
+    except ValueError:
+        return jsonify({'error': 'Fecha inválida'}), 400
+    return jsonify(schedule_summary(get_league(), start))
+
+@app.route('/schedule', methods=['POST'])
+@login_required
+def generate_schedule():
+    """
+    Genera el calendario de `weeks` semanas desde la semana de `start` con
+    los jugadores registrados, reemplazando lo programado desde esa semana
+    """
+    if not current_user.is_admin:
+        flash('Solo administradores pueden generar el calendario')
+        return redirect(url_for('schedule'))
+    try:
+        weeks = int(request.form.get('weeks') or DEFAULT_WEEKS)
+        start = week_start(datetime.fromisoformat(request.form['start']) if request.form.get('start')
+                           else datetime.now())
+        if not 1 <= weeks <= MAX_WEEKS:
+            raise ValueError
+    except ValueError:
+        flash(f'Semanas (entre 1 y {MAX_WEEKS}) o fecha inválidas')
+        return redirect(url_for('schedule'))
+    
+    league = get_league(current_league_id(), db_pool)
+    players = ranked_players(league)
+    if len(players) < 2:
+        flash('Se necesitan al menos dos jugadores')
+        return redirect(url_for('schedule'))
+    
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        unavailable = {
+            (week - start) // WEEK: names
+            for week, names in load_unavailability(cur, league.league_id, start, start + WEEK * weeks).items()
+        }
+        started = time.perf_counter()
+        method, season = season_schedule([league.names[player] for player in players],
+                                         [league.ratings[player] for player in players], weeks, unavailable)
+        elapsed = time.perf_counter() - started
+        cur.execute('DELETE FROM fixtures WHERE league_id = %s AND week_start >= %s', (league.league_id, start))
+        cur.executemany('INSERT INTO fixtures (league_id, week_start, white, black) VALUES (%s, %s, %s, %s)', [
+            (league.league_id, start + WEEK * week, white, black)
+            for week, pairs in enumerate(season) for white, black in pairs
+        ])
+        # Las partidas pendientes se muestran en el inicio (y en la instantánea)
+        generation = bump_generation(cur, league.league_id)
+        enqueue_derived_jobs(cur, league.league_id, generation)
+        conn.commit()
+        mark_write()
+        job_queue.wake()
+    except Exception as e:
+        logger.error(f"Error al generar el calendario: {str(e)}")
+        conn.rollback()
+        flash('Error al generar el calendario')
+        return redirect(url_for('schedule'))
+    finally:
+        cur.close()
+        conn.close()
+    
+    total = sum(len(pairs) for pairs in season)
+    flash(f"Calendario generado ({'todos contra todos' if method == 'round_robin' else 'por cupo semanal'}): "
+          f"{total} partidas en {weeks} semanas ({elapsed * 1000:.0f} ms)")
+    return redirect(url_for('schedule'))
+
+@app.route('/schedule/availability', methods=['POST'])
+@login_required
+def toggle_availability():
+    """Marca o desmarca una semana sin disponibilidad (la propia; un admin, la de cualquiera)"""
+    league_id = current_league_id()
+    # Cada usuario solo marca su jugador en su propia liga
+    player_name = (request.form.get('player') if current_user.is_admin else None) or current_user.player_in(league_id)
+    if not player_name:
+        flash('Tu usuario no tiene un jugador asociado en esta liga')
+        return redirect(url_for('schedule'))
+    try:
+        week = week_start(datetime.fromisoformat(request.form.get('week', '')))
+    except ValueError:
+        flash('Semana inválida')
+        return redirect(url_for('schedule'))
+    
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        # player_unavailability no referencia a players: se valida aquí
+        cur.execute('SELECT name FROM players WHERE league_id = %s AND name = %s', (league_id, player_name))
+        if not cur.fetchone():
+            flash('El jugador no existe en la liga')
+            return redirect(url_for('schedule'))
+        cur.execute('''
+            DELETE FROM player_unavailability WHERE league_id = %s AND player_name = %s AND week_start = %s
+            RETURNING player_name
+        ''', (league_id, player_name, week))
+        if cur.fetchone() is None:
+            cur.execute('INSERT INTO player_unavailability (league_id, player_name, week_start) VALUES (%s, %s, %s)',
+                        (league_id, player_name, week))
+        conn.commit()
+        mark_write()
+    except Exception as e:
+        logger.error(f"Error al guardar la disponibilidad: {str(e)}")
+        conn.rollback()
+        flash('Error al guardar la disponibilidad')
+    finally:
+        cur.close()
+        conn.close()
+    
+    return redirect(url_for('schedule'))
+
+def publish_snapshot(out_dir=None):
+    """
+    Renderiza las vistas de solo lectura tal como las ve un visitante anónimo
+    y las guarda como archivos estáticos en `out_dir`, para que el servidor
+    web las entregue a quien no tiene sesión sin pasar por Python ni la base
+    de datos. Devuelve la generación publicada (None si había una más nueva).
+    """
+    out_dir = out_dir or SNAPSHOT_DIR
+    league = get_league(DEFAULT_LEAGUE_ID)
+    files = {}
+    for relative_path, path in SNAPSHOT_PAGES.items():
+        # Contexto propio: el usuario de la petición en curso no debe aparecer en el render
+        with app.app_context(), app.test_request_context(path):
+            response = app.full_dispatch_request()
+        if response.status_code != 200:
+            raise RuntimeError(f'{path} respondió {response.status_code}')
+        files[relative_path] = response.get_data()
+    
+    if not publish(out_dir, league.generation, files):
+        return None
+    return league.generation
+
+@job_queue.handler('warm_league')
+def warm_league_job(payload):
+    """Recalcula la liga y los ratings del sistema configurado antes de que los pida una visita"""
+    engine_ratings(get_league(payload.get('league', DEFAULT_LEAGUE_ID)), RATING_ENGINE)
+
+@job_queue.handler('publish_snapshot')
+def publish_snapshot_job(payload):
+    if SNAPSHOT_DIR:
+        publish_snapshot(SNAPSHOT_DIR)
+
+@job_queue.handler('rating_intervals')
+def rating_intervals_job(payload):
+    """
+    Intervalos de confianza del ELO y probabilidad de cada posición, por
+    bootstrap del historial con las penalizaciones semanales, como el
+    rating que se muestra (ver app/utils/bootstrap.py). Se guardan por
+    generación para que el ranking los muestre sin calcularlos por visita.
+    """
+    league = get_league(payload.get('league', DEFAULT_LEAGUE_ID))
+    players = [player for player, player_id in enumerate(league.player_ids)
+               if player_id >= 0 and league.rated[player]]
+    if len(players) < 2:
+        return
+    
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute('SELECT 1 FROM rating_intervals WHERE league_id = %s AND generation = %s',
+                    (league.league_id, league.generation))
+        if cur.fetchone():
+            return
+        
+        white, black, score, _ = rated_games(league)
+        result = bootstrap_ratings(league.initial_ratings, white, black, score, players,
+                                   rated_penalties(league), k=league.k,
+                                   samples=BOOTSTRAP_SAMPLES, seed=league.generation)
+        rows = []
+        for i, player in enumerate(players):
+            rows.append({
+                'id': league.player_ids[player],
+                'name': league.names[player],
+                'rating': league.ratings[player],
+                'lower': int(round(result['lower'][i])),
+                'median': int(round(result['median'][i])),
+                'upper': int(round(result['upper'][i])),
+                'expected_rank': round(float(result['expected_rank'][i]), 2),
+                'rank_probabilities': [round(float(p), 4) for p in result['rank_probabilities'][i]]
+            })
+        payload = {
+            'generation': league.generation,
+            'samples': BOOTSTRAP_SAMPLES,
+            'confidence': CONFIDENCE,
+            'players': rows
+        }
+        
+        cur.execute('''
+            INSERT INTO rating_intervals (league_id, generation, payload) VALUES (%s, %s, %s)
+            ON CONFLICT (league_id, generation) DO NOTHING
+        ''', (league.league_id, league.generation, json.dumps(payload)))
+        # Solo se conserva la última generación calculada de la liga
+        cur.execute('DELETE FROM rating_intervals WHERE league_id = %s AND generation < %s',
+                    (league.league_id, league.generation))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+def stored_payload(table, cache, league):
+    """
+    Último resultado guardado en `table` para la liga (puede ser de una
+    generación anterior mientras el trabajo de la actual no termina), o
+    None si no hay. Mientras no esté al día se consulta cada
+    INTERVALS_RECHECK_SECONDS como mucho.
+    """
+    cached = cache.get(league.league_id)
+    if cached is not None and (cached['payload'] or {}).get('generation') == league.generation:
+        return cached['payload']
+    if cached is not None and time.time() - cached['checked_at'] < INTERVALS_RECHECK_SECONDS:
+        return cached['payload']
+    
+    try:
+        with read_db() as conn:
+            cur = conn.cursor()
+            cur.execute(f'''
+                SELECT payload FROM {table} WHERE league_id = %s AND generation <= %s
+                ORDER BY generation DESC LIMIT 1
+            ''', (league.league_id, league.generation))
+            row = cur.fetchone()
+            cur.close()
+    except DatabaseError as e:
+        # Son datos opcionales: las páginas se muestran igual sin ellos
+        logger.error(f"Error leyendo {table}: {str(e)}")
+        row = None
+    payload = row['payload'] if row else None
+    cache[league.league_id] = {'payload': payload, 'checked_at': time.time()}
+    return payload
+
+def rating_intervals(league):
+    """Últimos intervalos de confianza calculados para la liga, o None si no hay"""
+    return stored_payload('rating_intervals', interval_cache, league)
+
+def season_projection(league):
+    """Última proyección de la temporada calculada para la liga, o None si no hay"""
+    return stored_payload('season_projections', stored_projection_cache, league)
+
+@job_queue.handler('projections')
+def projections_job(payload):
+    """
+    Proyección de fin de temporada con los parámetros por defecto (ver
+    app/utils/projections.py). Se guarda por generación para que
+    /api/projections no simule en la petición; la semilla es la generación,
+    así el resultado no cambia entre procesos.
+    """
+    league = get_league(payload.get('league', DEFAULT_LEAGUE_ID))
+    
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute('SELECT 1 FROM season_projections WHERE league_id = %s AND generation = %s',
+                    (league.league_id, league.generation))
+        if cur.fetchone():
+            return
+        
+        payload = build_projection(league, seed=league.generation)
+        if payload is None:
+            return
+        cur.execute('''
+            INSERT INTO season_projections (league_id, generation, payload) VALUES (%s, %s, %s)
+            ON CONFLICT (league_id, generation) DO NOTHING
+        ''', (league.league_id, league.generation, json.dumps(payload)))
+        # Solo se conserva la última generación calculada de la liga
+        cur.execute('DELETE FROM season_projections WHERE league_id = %s AND generation < %s',
+                    (league.league_id, league.generation))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+@app.route('/api/ratings/intervals')
+def ratings_intervals():
+    """Intervalos de confianza del ELO y probabilidades de cada posición (bootstrap)"""
+    league = get_league()
+    payload = rating_intervals(league)
+    if payload is None:
+        return jsonify({'error': 'Los intervalos aún no están calculados'}), 404
+    return jsonify({**payload, 'stale': payload['generation'] != league.generation})
+
+def update_rollups(league_id, rebuild=False):
+    """
+    Pone al día los resúmenes por semana y por mes de la liga: solo se
+    recalculan los periodos desde el cambio más antiguo desde la última
+    actualización (con `rebuild`, todos). Devuelve las filas escritas, o
+    None si ya estaban al día.
+    """
+    league = get_league(league_id, db_pool)
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        # Un solo recálculo de la liga a la vez entre procesos
+        cur.execute('INSERT INTO rollup_state (league_id, generation, penalties) VALUES (%s, -1, 0) '
+                    'ON CONFLICT (league_id) DO NOTHING', (league_id,))
+        cur.execute('SELECT generation, penalties FROM rollup_state WHERE league_id = %s FOR UPDATE', (league_id,))
+        state = cur.fetchone()
+        if rebuild:
+            since = EPOCH
+        elif state['generation'] >= (league.generation or 0):
+            since = None
+        else:
+            since = changed_since(league, state['generation'], state['penalties'])
+        if since is None:
+            if not rebuild and state['generation'] < (league.generation or 0):
+                cur.execute('UPDATE rollup_state SET generation = %s WHERE league_id = %s',
+                            (league.generation, league_id))
+            conn.commit()
+            return None
+        
+        rows = period_rollups(league, since)
+        for period, start_of in ROLLUP_PERIODS.items():
+            cur.execute('DELETE FROM player_rollups WHERE league_id = %s AND period = %s AND period_start >= %s',
+                        (league_id, period, start_of(since)))
+        cur.executemany('''
+            INSERT INTO player_rollups (league_id, period, period_start, player_name, games, score,
+                                        rating_start, rating_end, penalties)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ''', [(league_id, period, start, league.names[player], *values)
+              for period, start, player, *values in rows])
+        cur.execute('UPDATE rollup_state SET generation = %s, penalties = %s WHERE league_id = %s',
+                    (league.generation or 0, len(league.penalty_at), league_id))
+        conn.commit()
+        return len(rows)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+@job_queue.handler('rollups')
+def rollups_job(payload):
+    update_rollups(payload.get('league', DEFAULT_LEAGUE_ID))
+
+LEADERBOARD_ORDER = {
+    'rating_change': 'rating_end - rating_start',
+    'score': 'score',
+    'games': 'games',
+}
+DEFAULT_LEADERBOARD_LIMIT = 20
+MAX_LEADERBOARD_LIMIT = 500
+MAX_WINNER_PERIODS = 104
+
+def leaderboard_args():
+    """Orden (by) y cantidad (limit) de las tablas por periodo"""
+    by = request.args.get('by', 'rating_change')
+    limit = request.args.get('limit', DEFAULT_LEADERBOARD_LIMIT, type=int)
+    if by not in LEADERBOARD_ORDER or not 1 <= limit <= MAX_LEADERBOARD_LIMIT:
+        raise ValueError('Parámetros inválidos')
+    return by, limit
+
+def rollup_row(row):
+    return {
+        'name': row['player_name'],
+        'display_name': format_name(row['player_name']),
+        'games': row['games'],
+        'score': row['score'],
+        'rating_start': row['rating_start'],
+        'rating_end': row['rating_end'],
+        'rating_change': row['rating_end'] - row['rating_start'],
+        'penalties': row['penalties'],
+    }
+
+@app.route('/api/leaderboards/<period>')
+def leaderboard(period):
+    """Tabla de una semana o un mes (?start=YYYY-MM-DD, por defecto el actual), desde los resúmenes"""
+    if period not in ROLLUP_PERIODS:
+        return jsonify({'error': 'Periodo inválido (week o month)'}), 404
+    try:
+        by, limit = leaderboard_args()
+        start = parse_period_start(period, request.args.get('start'))
+    except ValueError:
+        return jsonify({'error': 'Parámetros inválidos'}), 400
+    
+    with read_db() as conn:
+        cur = conn.cursor()
+        cur.execute(f'''
+            SELECT player_name, games, score, rating_start, rating_end, penalties FROM player_rollups
+            WHERE league_id = %s AND period = %s AND period_start = %s
+            ORDER BY {LEADERBOARD_ORDER[by]} DESC, rating_end - rating_start DESC, player_name
+            LIMIT %s
+        ''', (current_league_id(), period, start, limit))
+        rows = cur.fetchall()
+        cur.close()
+    return jsonify({
+        'period': period,
+        'start': start.strftime('%Y-%m-%d'),
+        'end': shift_period(period, start, 1).strftime('%Y-%m-%d'),
+        'by': by,
+        'players': [{'position': position, **rollup_row(row)} for position, row in enumerate(rows, 1)],
+    })
+
+@app.route('/api/leaderboards/<period>/winners')
+def leaderboard_winners(period):
+    """Ganador de cada una de las últimas `periods` semanas o meses (con al menos una partida)"""
+    if period not in ROLLUP_PERIODS:
+        return jsonify({'error': 'Periodo inválido (week o month)'}), 404
+    try:
+        by, _ = leaderboard_args()
+        periods = request.args.get('periods', 12, type=int)
+        if not 1 <= periods <= MAX_WINNER_PERIODS:
+            raise ValueError('periods fuera de rango')
+    except ValueError:
+        return jsonify({'error': 'Parámetros inválidos'}), 400
+    
+    current = ROLLUP_PERIODS[period](datetime.now())
+    with read_db() as conn:
+        cur = conn.cursor()
+        cur.execute(f'''
+            SELECT * FROM (
+                SELECT period_start, player_name, games, score, rating_start, rating_end, penalties,
+                       ROW_NUMBER() OVER (PARTITION BY period_start
+                                          ORDER BY {LEADERBOARD_ORDER[by]} DESC, rating_end - rating_start DESC,
+                                                   player_name) AS position
+                FROM player_rollups
+                WHERE league_id = %s AND period = %s AND period_start >= %s AND games > 0
+            ) ranked
+            WHERE position = 1
+            ORDER BY period_start DESC
+        ''', (current_league_id(), period, shift_period(period, current, 1 - periods)))
+        rows = cur.fetchall()
+        cur.close()
+    return jsonify({
+        'period': period,
+        'by': by,
+        'winners': [{'start': row['period_start'].strftime('%Y-%m-%d'), **rollup_row(row)} for row in rows],
+    })
+
+@job_queue.handler('close_weeks')
+def close_weeks_job(payload):
+    close_weeks(payload.get('league', DEFAULT_LEAGUE_ID))
+
+def enqueue_derived_jobs(cur, league_id, generation):
+    """
+    Trabajos derivados de una escritura, en su misma transacción: se ejecutan
+    fuera de la petición después del commit. La clave incluye la liga y la
+    generación, así cada cambio de la liga los encola una sola vez.
+    """
+    payload = {'league': league_id}
+    enqueue(cur, 'warm_league', f'warm_league:{league_id}:{generation}', payload)
+    enqueue(cur, 'rating_intervals', f'rating_intervals:{league_id}:{generation}', payload)
+    enqueue(cur, 'projections', f'projections:{league_id}:{generation}', payload)
+    enqueue(cur, 'rollups', f'rollups:{league_id}:{generation}', payload)
+    # La instantánea estática es de la liga por defecto
+    if SNAPSHOT_DIR and league_id == DEFAULT_LEAGUE_ID:
+        enqueue(cur, 'publish_snapshot', f'publish_snapshot:{generation}')
+
+@app.route('/api/metrics/replica')
+def replica_metrics():
+    """Retraso de la réplica y cuántas lecturas fueron a cada base en este proceso"""
+    metrics = replica_router.metrics()
+    metrics['reading_from'] = 'replica' if read_pool() is replica_pool else 'primary'
+    return jsonify(metrics)
+
+@app.route('/api/metrics/jobs')
+def jobs_metrics():
+    """Trabajos pendientes y retraso del más antiguo (lag_seconds)"""
+    with read_db() as conn:
+        cur = conn.cursor()
+        metrics = job_queue.metrics(cur)
+        cur.close()
+    return jsonify(metrics)
+
+def player_index():
+    """Índice en memoria de los nombres de la liga, reconstruido solo cuando cambia la generación"""
+    league = get_league()
+    cached = player_index_cache.get(league.league_id)
+    if cached is not None and cached[0] == league.generation:
+        return cached[1]
+    index = PlayerIndex([(player_id, name) for player_id, name in zip(league.player_ids, league.names)
+                         if player_id >= 0])
+    player_index_cache[league.league_id] = (league.generation, index)
+    return index
+
+@app.route('/api/players/search')
+def player_search():
+    """
+    Jugadores cuyo nombre o alguna de sus palabras empieza con ?q=, sin
+    distinguir mayúsculas ni tildes ("buron" encuentra a "Burón").
+    Usa el índice de Postgres; si la consulta falla, el índice en memoria.
+    """
+    query = request.args.get('q', '')
+    limit = request.args.get('limit', SEARCH_LIMIT, type=int)
+    if len(query) > MAX_QUERY_LENGTH or limit is None or not 1 <= limit <= MAX_SEARCH_LIMIT:
+        return jsonify({'error': 'Parámetros inválidos'}), 400
+    if not fold(query):
+        return jsonify({'players': []})
+    
+    try:
+        with read_db() as conn:
+            cur = conn.cursor()
+            matches = search_players(cur, current_league_id(), query, limit)
+            cur.close()
+    except Exception as e:
+        logger.warning(f"Búsqueda de jugadores sin índice de Postgres: {str(e)}")
+        matches = player_index().search(query, limit)
+    
+    return jsonify({'players': [
+        {'id': player_id, 'name': name, 'display_name': format_name(name)}
+        for player_id, name in matches
+    ]})
+
+@app.route('/register', methods=['GET', 'POST'])
+def register():
+    if request.method == 'POST':
+        username = request.form.get('username')
+        password = request.form.get('password')
+        player_name = request.form.get('player_name')
+        
+        if not all([username, password, player_name]):  # Ahora player_name es requerido
+            flash('Usuario, contraseña y jugador son requeridos')
+            return render_template('register.html')
+            
+        conn = get_db()
+        cur = conn.cursor()
+        
+        try:
+            # Verificar si el usuario ya existe
+            cur.execute('SELECT id FROM users WHERE username = %s', (username,))
+            if cur.fetchone():
+                flash('El nombre de usuario ya está en uso')
+                return render_template('register.html')
+            
+            # Verificar si el jugador existe en la liga elegida
+            league_id = current_league_id()
+            cur.execute('SELECT name FROM players WHERE league_id = %s AND name = %s', (league_id, player_name))
+            if not cur.fetchone():
+                flash('El jugador no existe en la liga')
+                return render_template('register.html')
+            
+            # Crear el usuario
+            cur.execute(
+                'INSERT INTO users (username, password_hash, league_id, player_name) VALUES (%s, %s, %s, %s)',
+                (username, generate_password_hash(password), league_id, player_name)
+            )
+            
+            conn.commit()
+            mark_write()
+            app.logger.info(f"Usuario creado exitosamente: {username} asociado a jugador: {player_name}")
+            flash('Usuario creado exitosamente')
+            return redirect(url_for('login'))
+            
+        except Exception as e:
+            app.logger.error(f"Error en registro: {str(e)}")
             flash('Error al crear el usuario. Por favor intenta más tarde.')
-            return render_template('register.html', players=get_players())
+            return render_template('register.html')
             
         finally:
             if cur:
@@ -777,7 +2561,7 @@ def register():
                 except Exception as e:
                     app.logger.error(f"Error al cerrar conexión: {str(e)}")
     
-    return render_template('register.html', players=get_players())
+    return render_template('register.html')
 
 def reset_db():
     """Reiniciar la base de datos completamente"""
@@ -788,50 +2572,45 @@ def reset_db():
         # Deshabilitar temporalmente las restricciones de foreign key
         cur.execute('SET CONSTRAINTS ALL DEFERRED')
         
-        # Eliminar tablas en orden correcto
+        # Eliminar tablas en orden correcto (las ligas creadas también se eliminan)
         cur.execute('DROP TABLE IF EXISTS games CASCADE')
         cur.execute('DROP TABLE IF EXISTS users CASCADE')
         cur.execute('DROP TABLE IF EXISTS players CASCADE')
+        cur.execute('DROP TABLE IF EXISTS rating_intervals, season_projections, penalties, week_closures CASCADE')
+        cur.execute('DROP TABLE IF EXISTS tournament_standings, tournament_pairings, tournament_players, tournaments CASCADE')
+        cur.execute('DROP TABLE IF EXISTS fixtures, player_unavailability CASCADE')
+        cur.execute('DROP TABLE IF EXISTS player_rollups, rollup_state CASCADE')
+        cur.execute('DROP TABLE IF EXISTS leagues CASCADE')
         
         conn.commit()
         
-        # Crear tablas en orden correcto
-        cur.execute('''
-            CREATE TABLE players (
-                id SERIAL PRIMARY KEY,
-                name TEXT UNIQUE NOT NULL,
-                initial_rating INTEGER NOT NULL
-            )
-        ''')
-        
-        cur.execute('''
-            CREATE TABLE users (
-                id SERIAL PRIMARY KEY,
-                username TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                is_admin BOOLEAN NOT NULL DEFAULT FALSE,
-                player_name TEXT REFERENCES players(name)
-            )
-        ''')
-        
-        cur.execute('''
-            CREATE TABLE games (
-                id SERIAL PRIMARY KEY,
-                white TEXT NOT NULL REFERENCES players(name),
-                black TEXT NOT NULL REFERENCES players(name),
-                result REAL NOT NULL,
-                date TIMESTAMP NOT NULL,
-                added_by INTEGER REFERENCES users(id)
-            )
-        ''')
+        # Crear tablas en orden correcto. La generación no se reinicia, para
+        # que ninguna caché quede vigente
+        create_tables(cur)
+        create_games_table(cur)
+        cur.execute(OUTBOX_SCHEMA)
+        cur.execute(CHANGES_SCHEMA)
+        create_search_index(cur)
+        cur.execute(INTERVALS_SCHEMA)
+        cur.execute(PROJECTIONS_SCHEMA)
+        cur.execute(PENALTIES_SCHEMA)
+        cur.execute(TOURNAMENT_SCHEMA)
+        cur.execute(SCHEDULE_SCHEMA)
+        cur.execute(ROLLUP_SCHEMA)
+        cur.execute('DELETE FROM league_meta WHERE id <> %s', (DEFAULT_LEAGUE_ID,))
+        generation = bump_generation(cur, DEFAULT_LEAGUE_ID)
+        # Los clientes con datos anteriores al reinicio deben descargar todo de nuevo
+        cur.execute('UPDATE league_meta SET reset_generation = %s WHERE id = %s', (generation, DEFAULT_LEAGUE_ID))
+        enqueue_derived_jobs(cur, DEFAULT_LEAGUE_ID, generation)
         
         # Cargar jugadores iniciales desde start.json
         with open('start.json', 'r', encoding='utf-8') as f:
             start_data = json.load(f)
             for player in start_data['players']:
                 cur.execute(
-                    'INSERT INTO players (name, initial_rating) VALUES (%s, %s)',
-                    (player['name'], player['rating'])
+                    'INSERT INTO players (league_id, name, initial_rating, generation, search_name) '
+                    'VALUES (%s, %s, %s, %s, %s)',
+                    (DEFAULT_LEAGUE_ID, player['name'], player['rating'], generation, fold(player['name']))
                 )
         
         # Crear usuario admin
@@ -858,6 +2637,8 @@ def reset_database():
     
     try:
         reset_db()
+        mark_write()
+        job_queue.wake()
         flash('Base de datos reiniciada exitosamente')
     except Exception as e:
         logger.error(f"Error al reiniciar la base de datos: {str(e)}")
@@ -885,16 +2666,32 @@ def add_player():
         flash('El rating inicial debe ser un número')
         return redirect(url_for('index'))
         
+    league_id = current_league_id()
     conn = get_db()
     cur = conn.cursor()
     
     try:
-        # Verificar si el jugador ya existe en la base de datos
-        cur.execute('SELECT name FROM players WHERE name = %s', (player_name,))
+        # Verificar si el jugador ya existe en la liga
+        cur.execute('SELECT name FROM players WHERE league_id = %s AND name = %s', (league_id, player_name))
         if cur.fetchone():
             flash('Este jugador ya existe')
             return redirect(url_for('index'))
         
+        # start.json guarda los ratings iniciales de la liga por defecto
+        if league_id != DEFAULT_LEAGUE_ID:
+            generation = bump_generation(cur, league_id)
+            cur.execute(
+                'INSERT INTO players (league_id, name, initial_rating, generation, search_name) '
+                'VALUES (%s, %s, %s, %s, %s)',
+                (league_id, player_name, initial_rating, generation, fold(player_name))
+            )
+            enqueue_derived_jobs(cur, league_id, generation)
+            conn.commit()
+            mark_write()
+            job_queue.wake()
+            flash('Jugador creado exitosamente')
+            return redirect(url_for('index'))
+        
         # Verificar y actualizar start.json primero
         try:
             with open('start.json', 'r', encoding='utf-8') as f:
@@ -916,13 +2713,18 @@ def add_player():
                 json.dump(start_data, f, indent=4, ensure_ascii=False)
                 
             # Si start.json se actualizó correctamente, crear jugador en la base de datos
+            generation = bump_generation(cur, league_id)
             cur.execute(
-                'INSERT INTO players (name, initial_rating) VALUES (%s, %s)',
-                (player_name, initial_rating)
+                'INSERT INTO players (league_id, name, initial_rating, generation, search_name) '
+                'VALUES (%s, %s, %s, %s, %s)',
+                (league_id, player_name, initial_rating, generation, fold(player_name))
             )
+            enqueue_derived_jobs(cur, league_id, generation)
             
             # Confirmar transacción
             conn.commit()
+            mark_write()
+            job_queue.wake()
             flash('Jugador creado exitosamente')
                 
         except Exception as e:
@@ -935,15 +2737,16 @@ def add_player():
         logger.error(f"Error al crear jugador: {str(e)}")
         flash('Error al crear el jugador')
         # Intentar revertir los cambios en start.json
-        try:
-            with open('start.json', 'r', encoding='utf-8') as f:
-                start_data = json.load(f)
-            # Eliminar el jugador si fue agregado
-            start_data['players'] = [p for p in start_data['players'] if p['name'] != player_name]
-            with open('start.json', 'w', encoding='utf-8') as f:
-                json.dump(start_data, f, indent=4, ensure_ascii=False)
-        except Exception as rollback_error:
-            logger.error(f"Error al revertir cambios en start.json: {str(rollback_error)}")
+        if league_id == DEFAULT_LEAGUE_ID:
+            try:
+                with open('start.json', 'r', encoding='utf-8') as f:
+                    start_data = json.load(f)
+                # Eliminar el jugador si fue agregado
+                start_data['players'] = [p for p in start_data['players'] if p['name'] != player_name]
+                with open('start.json', 'w', encoding='utf-8') as f:
+                    json.dump(start_data, f, indent=4, ensure_ascii=False)
+            except Exception as rollback_error:
+                logger.error(f"Error al revertir cambios en start.json: {str(rollback_error)}")
         conn.rollback()
         
     finally:
@@ -953,6 +2756,43 @@ def add_player():
     # Recargar la página después de agregar el jugador
     return redirect(url_for('index'))
 
+@app.route('/leagues', methods=['POST'])
+@login_required
+def add_league():
+    if not current_user.is_admin:
+        flash('Solo administradores pueden crear ligas')
+        return redirect(url_for('index'))
+    
+    slug = (request.form.get('slug') or '').strip().lower()
+    name = (request.form.get('name') or '').strip()
+    season = (request.form.get('season') or '').strip() or None
+    if not name or not SLUG_PATTERN.match(slug):
+        flash('Nombre requerido y un identificador de minúsculas, números y guiones')
+        return redirect(url_for('index'))
+    
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute('SELECT 1 FROM leagues WHERE slug = %s', (slug,))
+        if cur.fetchone():
+            flash('Ya existe una liga con ese identificador')
+            return redirect(url_for('index'))
+        create_league(cur, slug, name, season)
+        conn.commit()
+        mark_write()
+    except Exception as e:
+        logger.error(f"Error al crear la liga: {str(e)}")
+        conn.rollback()
+        flash('Error al crear la liga')
+        return redirect(url_for('index'))
+    finally:
+        cur.close()
+        conn.close()
+    
+    league_directory(refresh=True)
+    flash('Liga creada exitosamente')
+    return redirect(url_for('index', league=slug))
+
 def add_lettuce_column():
     conn = get_db()
     cur = conn.cursor()
@@ -987,7 +2827,9 @@ def suggest_game():
     
     try:
         # Obtener información de ambos jugadores
-        cur.execute('SELECT name, display_name FROM players WHERE id IN (%s, %s)', (white_id, black_id))
+        league_id = current_league_id()
+        cur.execute('SELECT name, display_name FROM players WHERE league_id = %s AND id IN (%s, %s)',
+                    (league_id, white_id, black_id))
         players = cur.fetchall()
         
         if len(players) != 2:
@@ -1001,9 +2843,10 @@ def suggest_game():
                 COUNT(CASE WHEN g.white = p.name THEN 1 END) as white_games,
                 COUNT(CASE WHEN g.black = p.name THEN 1 END) as black_games
             FROM players p
-            LEFT JOIN games g ON p.name IN (g.white, g.black)
+            LEFT JOIN games g ON g.league_id = p.league_id AND p.name IN (g.white, g.black)
+            WHERE p.league_id = %s
             GROUP BY p.id, p.name
-        ''')
+        ''', (league_id,))
         color_stats = {row['id']: {
             'white_games': row['white_games'],
             'black_games': row['black_games']
@@ -1029,7 +2872,194 @@ def suggest_game():
         cur.close()
         conn.close()
 
+# Tablas que check_storage copia de Postgres a SQLite, en orden de dependencias
+STORAGE_TABLES = [
+    ('leagues', 'id, slug, name, season'),
+    ('league_meta', 'id, generation, reset_generation'),
+    ('players', 'id, league_id, name, initial_rating, generation, search_name'),
+    ('games', 'id, league_id, white, black, result, date, has_lettuce_factor, generation'),
+    ('week_closures', 'league_id, week_start'),
+    ('penalties', 'league_id, week_start, player_name, missing_games, points'),
+]
+STORAGE_CHECK_RUNS = 5
+
+def check_storage(sqlite_path=':memory:'):
+    """
+    Paridad entre los dos motores: copia la liga de Postgres a una base
+    SQLite nueva, ejecuta en ambas las mismas lecturas (las que arman la liga
+    y la búsqueda de jugadores) y compara resultados y tiempos (mediana de
+    STORAGE_CHECK_RUNS). Devuelve la cantidad de diferencias.
+    """
+    from app.database import sqlite as sqlite_storage
+    sqlite_pool = ConnectionPool(lambda: sqlite_storage.connect(sqlite_path), 1)
+    source = get_db()
+    target = sqlite_storage.connect(sqlite_path)
+    try:
+        source_cur = source.cursor()
+        target_cur = target.cursor()
+        create_schema(target_cur, sqlite=True)
+        for table, columns in reversed(STORAGE_TABLES):
+            target_cur.execute(f'DELETE FROM {table}')
+        for table, columns in STORAGE_TABLES:
+            source_cur.execute(f'SELECT {columns} FROM {table}')
+            rows = [tuple(row) for row in source_cur.fetchall()]
+            placeholders = ', '.join(['%s'] * len(columns.split(',')))
+            target_cur.executemany(f'INSERT INTO {table} ({columns}) VALUES ({placeholders})', rows)
+        target.commit()
+    finally:
+        source.close()
+        target.close()
+    
+    def search(pool, league_id, query):
+        with read_db(pool) as conn:
+            cur = conn.cursor()
+            matches = search_players(cur, league_id, query, MAX_SEARCH_LIMIT)
+            cur.close()
+        return matches
+    
+    def rows(result):
+        # Mismo orden en ambos motores aunque haya partidas con la misma fecha
+        if isinstance(result, tuple):
+            return rows(result[0]), result[1]
+        return sorted(tuple(row) for row in result)
+    
+    checks = []
+    for league in league_directory(refresh=True).values():
+        league_id = league['id']
+        checks += [
+            (f'players[{league["slug"]}]', lambda pool, l=league_id: rows(fetch_players(l, pool))),
+            (f'games[{league["slug"]}]', lambda pool, l=league_id: rows(fetch_games(l, pool))),
+            (f'penalties[{league["slug"]}]', lambda pool, l=league_id: rows(fetch_penalties(l, pool))),
+        ]
+        names = [row['name'] for row in fetch_players(league_id)]
+        queries = sorted({fold(name)[:2] for name in names} | {word[:3] for name in names for word in fold(name).split()[1:]})
+        checks.append((f'search[{league["slug"]}] ({len(queries)} búsquedas)',
+                       lambda pool, l=league_id, q=queries: [search(pool, l, query) for query in q]))
+    
+    differences = 0
+    for name, check in checks:
+        results, timings = [], []
+        for pool in (db_pool, sqlite_pool):
+            elapsed = []
+            for _ in range(STORAGE_CHECK_RUNS):
+                start = time.perf_counter()
+                result = check(pool)
+                elapsed.append(time.perf_counter() - start)
+            results.append(result)
+            timings.append(sorted(elapsed)[len(elapsed) // 2] * 1000)
+        same = results[0] == results[1]
+        differences += not same
+        print(f"{'ok ' if same else 'DIF'} {name}: postgres {timings[0]:.2f} ms, sqlite {timings[1]:.2f} ms")
+    return differences
+
+def build_league_images(out_dir):
+    """
+    Recalcula cada liga desde el primario y guarda su imagen en `out_dir`
+    (para incluirla en el despliegue, ver serverless.py). Devuelve
+    (liga, generación, bytes) de cada imagen escrita.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    built = []
+    for entry in league_directory(refresh=True).values():
+        league_id = entry['id']
+        with read_db(db_pool) as conn:
+            cur = conn.cursor()
+            generation = get_generation(cur, league_id)
+            cur.close()
+        league = load_league_data(league_id, db_pool, generation)
+        if league is None:
+            raise RuntimeError(f"No se pudo cargar la liga {entry['slug']}")
+        league.generation = generation
+        data = league_image.dumps(league)
+        # La imagen debe leerse idéntica a la liga recalculada
+        if league_image.dumps(league_image.loads(data)) != data:
+            raise RuntimeError(f"La imagen de la liga {entry['slug']} no se lee igual")
+        path = os.path.join(out_dir, f'league-{league_id}.img')
+        write_atomic(path, data)
+        built.append((entry['slug'], generation, len(data)))
+    return built
+
+# Páginas del informe de build-assets
+ASSET_REPORT_PAGES = ['/', '/crosstable', '/login', '/register']
+
+def build_assets():
+    """
+    Publica los CSS y JS en static/assets y compara, por página, los bytes
+    que se enviaban con todo en línea y sin comprimir contra los de ahora:
+    la primera visita (HTML comprimido más los archivos) y las siguientes
+    (los archivos ya están en el caché del navegador).
+    """
+    manifest = build(os.path.dirname(os.path.abspath(__file__)))
+    manifest.pop('files')
+    asset_bundle.reset()
+    encoding = preferred_encoding('br, gzip')
+    client = app.test_client()
+    report = []
+    for path in ASSET_REPORT_PAGES:
+        response = client.get(path, headers={'Accept-Encoding': encoding or 'identity'})
+        if response.status_code != 200:
+            raise RuntimeError(f'{path} respondió {response.status_code}')
+        sent = len(response.get_data())
+        html = client.get(path).get_data()
+        assets = [entry for entry in manifest.values() if entry['file'].encode() in html]
+        before = len(html) + sum(entry['bytes']['source'] for entry in assets)
+        first = sent + sum(entry['bytes'].get(encoding, entry['bytes']['minified']) for entry in assets)
+        report.append((path, before, first, sent))
+    return manifest, report
+
 # Ejecutar una vez al inicio
 if __name__ == '__main__':
-    init_db()
-    app.run(debug=True, host='0.0.0.0', port=3007) 
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Liga de ajedrez')
+    subcommands = parser.add_subparsers(dest='command')
+    publish_parser = subcommands.add_parser('publish', help='Publicar la instantánea estática para visitantes anónimos')
+    publish_parser.add_argument('--out', default=SNAPSHOT_DIR or 'snapshot', help='Directorio de salida')
+    subcommands.add_parser('close-weeks', help='Cerrar las semanas terminadas y aplicar sus penalizaciones')
+    storage_parser = subcommands.add_parser('check-storage', help='Comparar las consultas de Postgres y SQLite')
+    storage_parser.add_argument('--sqlite', default=':memory:', help='Base SQLite de destino (se reemplazan sus datos)')
+    image_parser = subcommands.add_parser('build-image', help='Guardar la imagen binaria de cada liga para el arranque en frío')
+    image_parser.add_argument('--out', default=LEAGUE_IMAGE_DIR or 'league_image', help='Directorio de salida')
+    rollups_parser = subcommands.add_parser('rebuild-rollups', help='Recalcular los resúmenes por semana y por mes de cada liga')
+    rollups_parser.add_argument('--league', help='Slug de la liga (por defecto, todas)')
+    subcommands.add_parser('build-assets', help='Publicar CSS y JS minificados y comprimidos, e informar los bytes ahorrados')
+    args = parser.parse_args()
+    
+    if args.command == 'publish':
+        generation = publish_snapshot(args.out)
+        if generation is None:
+            print(f'{args.out} ya tiene una generación más nueva; no se publicó')
+        else:
+            print(f'Generación {generation} publicada en {args.out}')
+    elif args.command == 'close-weeks':
+        for league in league_directory(refresh=True).values():
+            weeks = close_weeks(league['id'])
+            print(f"{league['name']}: {len(weeks)} semana(s) cerrada(s)"
+                  + (f" hasta el {weeks[-1].strftime('%Y-%m-%d')}" if weeks else ''))
+    elif args.command == 'check-storage':
+        if SQLITE_PATH:
+            parser.error('check-storage compara contra Postgres: quitar SQLITE_PATH')
+        differences = check_storage(args.sqlite)
+        print(f'{differences} diferencia(s)')
+        raise SystemExit(1 if differences else 0)
+    elif args.command == 'build-image':
+        for slug, generation, size in build_league_images(args.out):
+            print(f'{slug}: generación {generation}, {size / 1024:.1f} KiB')
+    elif args.command == 'rebuild-rollups':
+        for slug, league in league_directory(refresh=True).items():
+            if args.league and slug != args.league:
+                continue
+            started = time.perf_counter()
+            rows = update_rollups(league['id'], rebuild=True)
+            print(f"{league['name']}: {rows} resumen(es) en {time.perf_counter() - started:.2f} s")
+    elif args.command == 'build-assets':
+        manifest, report = build_assets()
+        for name, entry in manifest.items():
+            sizes = ', '.join(f'{encoding} {size}' for encoding, size in entry['bytes'].items())
+            print(f"{name} -> static/assets/{entry['file']} ({sizes} bytes)")
+        print(f"{'página':<14}{'antes':>10}{'1a visita':>11}{'siguientes':>12}{'ahorro':>9}")
+        for path, before, first, repeat in report:
+            print(f'{path:<14}{before:>10}{first:>11}{repeat:>12}{1 - repeat / before:>9.0%}')
+    else:
+        init_db()
+        app.run(debug=True, host='0.0.0.0', port=3007) 
\ No newline at end of file
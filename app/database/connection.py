@@ -2,7 +2,11 @@ import psycopg2
 from psycopg2.extras import DictCursor
 import os
 
+from . import sqlite
+
 def get_db():
+    if os.environ.get('SQLITE_PATH'):
+        return sqlite.connect(os.environ['SQLITE_PATH'])
     connection = psycopg2.connect(
         os.environ.get('POSTGRES_URL'),
         sslmode='require'
@@ -11,4 +15,6 @@ def get_db():
     return connection
 
 def init_db():
-    # Código actual de init_db... 
\ No newline at end of file
+    """Crea o actualiza las tablas ejecutando las migraciones pendientes"""
+    from .migrations import run_migrations
+    run_migrations() 
\ No newline at end of file
@@ -1,4 +1,13 @@
 from .connection import get_db
+from app.utils.bootstrap import INTERVALS_SCHEMA
+from app.utils.jobs import OUTBOX_SCHEMA
+from app.utils.leagues import GAMES_SCHEMA, create_partitions, migrate_to_leagues
+from app.utils.penalties import PENALTIES_SCHEMA
+from app.utils.player_search import create_search_index
+from app.utils.projections import PROJECTIONS_SCHEMA
+from app.utils.rollups import ROLLUP_SCHEMA
+from app.utils.schedule import SCHEDULE_SCHEMA
+from app.utils.swiss import TOURNAMENT_SCHEMA
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,10 +30,202 @@ def add_lettuce_column():
         cur.close()
         conn.close()
 
+def add_league_generation():
+    """Crea la tabla league_meta con la generación de la liga (invalida las cachés en memoria)"""
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS league_meta (
+                id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+                generation BIGINT NOT NULL DEFAULT 0
+            );
+            INSERT INTO league_meta (id, generation) VALUES (1, 0) ON CONFLICT (id) DO NOTHING;
+        ''')
+        conn.commit()
+        logger.info("Tabla league_meta creada exitosamente")
+    except Exception as e:
+        logger.error(f"Error creando tabla league_meta: {str(e)}")
+        conn.rollback()
+    finally:
+        cur.close()
+        conn.close()
+
+def add_jobs_outbox():
+    """Crea la tabla jobs_outbox con los trabajos derivados pendientes"""
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute(OUTBOX_SCHEMA)
+        conn.commit()
+        logger.info("Tabla jobs_outbox creada exitosamente")
+    except Exception as e:
+        logger.error(f"Error creando tabla jobs_outbox: {str(e)}")
+        conn.rollback()
+    finally:
+        cur.close()
+        conn.close()
+
+def add_change_generations():
+    """Agrega la generación de cada partida y jugador, y la del último reinicio (para /api/changes)"""
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute('''
+            ALTER TABLE games ADD COLUMN IF NOT EXISTS generation BIGINT NOT NULL DEFAULT 0;
+            ALTER TABLE players ADD COLUMN IF NOT EXISTS generation BIGINT NOT NULL DEFAULT 0;
+            ALTER TABLE league_meta ADD COLUMN IF NOT EXISTS reset_generation BIGINT NOT NULL DEFAULT 0;
+        ''')
+        conn.commit()
+        logger.info("Columnas de generación agregadas exitosamente")
+    except Exception as e:
+        logger.error(f"Error agregando columnas de generación: {str(e)}")
+        conn.rollback()
+    finally:
+        cur.close()
+        conn.close()
+
+def add_player_search():
+    """Agrega el nombre normalizado de los jugadores y sus índices de búsqueda"""
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        create_search_index(cur)
+        conn.commit()
+        logger.info("Índice de búsqueda de jugadores creado exitosamente")
+    except Exception as e:
+        logger.error(f"Error creando índice de búsqueda de jugadores: {str(e)}")
+        conn.rollback()
+    finally:
+        cur.close()
+        conn.close()
+
+def add_leagues():
+    """
+    Crea la tabla de ligas, pasa los datos existentes a la liga por defecto y
+    particiona las partidas por liga. Va antes de las tablas derivadas, que
+    referencian a las ligas.
+    """
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        migrate_to_leagues(cur)
+        cur.execute(GAMES_SCHEMA)
+        create_partitions(cur)
+        conn.commit()
+        logger.info("Ligas creadas exitosamente")
+    except Exception as e:
+        logger.error(f"Error creando las ligas: {str(e)}")
+        conn.rollback()
+    finally:
+        cur.close()
+        conn.close()
+
+def add_rating_intervals():
+    """Crea la tabla rating_intervals con los intervalos de confianza por generación"""
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute(INTERVALS_SCHEMA)
+        conn.commit()
+        logger.info("Tabla rating_intervals creada exitosamente")
+    except Exception as e:
+        logger.error(f"Error creando tabla rating_intervals: {str(e)}")
+        conn.rollback()
+    finally:
+        cur.close()
+        conn.close()
+
+def add_penalties():
+    """Crea las tablas week_closures y penalties con las penalizaciones semanales"""
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute(PENALTIES_SCHEMA)
+        conn.commit()
+        logger.info("Tablas de penalizaciones creadas exitosamente")
+    except Exception as e:
+        logger.error(f"Error creando tablas de penalizaciones: {str(e)}")
+        conn.rollback()
+    finally:
+        cur.close()
+        conn.close()
+
+def add_tournaments():
+    """Crea las tablas de los torneos suizos: inscritos, pareos y clasificación por ronda"""
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute(TOURNAMENT_SCHEMA)
+        conn.commit()
+        logger.info("Tablas de torneos creadas exitosamente")
+    except Exception as e:
+        logger.error(f"Error creando tablas de torneos: {str(e)}")
+        conn.rollback()
+    finally:
+        cur.close()
+        conn.close()
+
+def add_schedule():
+    """Crea las tablas del calendario de la temporada y de las semanas sin disponibilidad"""
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute(SCHEDULE_SCHEMA)
+        conn.commit()
+        logger.info("Tablas del calendario creadas exitosamente")
+    except Exception as e:
+        logger.error(f"Error creando tablas del calendario: {str(e)}")
+        conn.rollback()
+    finally:
+        cur.close()
+        conn.close()
+
+def add_rollups():
+    """Crea las tablas de resúmenes por semana y por mes de cada jugador"""
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute(ROLLUP_SCHEMA)
+        conn.commit()
+        logger.info("Tablas de resúmenes creadas exitosamente")
+    except Exception as e:
+        logger.error(f"Error creando tablas de resúmenes: {str(e)}")
+        conn.rollback()
+    finally:
+        cur.close()
+        conn.close()
+
+def add_season_projections():
+    """Crea la tabla season_projections con la proyección de la temporada por generación"""
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute(PROJECTIONS_SCHEMA)
+        conn.commit()
+        logger.info("Tabla season_projections creada exitosamente")
+    except Exception as e:
+        logger.error(f"Error creando tabla season_projections: {str(e)}")
+        conn.rollback()
+    finally:
+        cur.close()
+        conn.close()
+
 def run_migrations():
     """Ejecuta todas las migraciones en orden"""
     migrations = [
         add_lettuce_column,
+        add_league_generation,
+        add_jobs_outbox,
+        add_change_generations,
+        add_player_search,
+        add_leagues,
+        add_rating_intervals,
+        add_penalties,
+        add_tournaments,
+        add_schedule,
+        add_rollups,
+        add_season_projections,
         # Agregar aquí futuras migraciones en orden
     ]
     
@@ -49,6 +250,7 @@ def reset_db():
             DROP TABLE IF EXISTS games CASCADE;
             DROP TABLE IF EXISTS users CASCADE;
             DROP TABLE IF EXISTS players CASCADE;
+            DROP TABLE IF EXISTS leagues CASCADE;
         ''')
         
         conn.commit()
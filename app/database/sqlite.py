@@ -0,0 +1,285 @@
+import json
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from functools import lru_cache
+
+# Base SQLite en el mismo proceso, para un solo nodo o pruebas: las mismas
+# consultas de Postgres se traducen al dialecto de SQLite (ver translate) y
+# las conexiones imitan la parte de psycopg2 que usa la aplicación.
+# Un solo proceso: las notificaciones (pg_notify) no salen del proceso.
+
+# Sentencias preparadas que conserva cada conexión (las del pool se reutilizan)
+CACHED_STATEMENTS = 256
+# Milisegundos que una escritura espera a que otra termine
+BUSY_TIMEOUT_MS = 5000
+# Base en memoria compartida entre las conexiones del proceso
+MEMORY_URI = 'file:league?mode=memory&cache=shared'
+
+# Partidas en una sola tabla: SQLite no tiene particiones
+GAMES_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS games (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        league_id INTEGER NOT NULL REFERENCES leagues (id),
+        white TEXT NOT NULL,
+        black TEXT NOT NULL,
+        result REAL NOT NULL,
+        date TIMESTAMP NOT NULL,
+        added_by INTEGER REFERENCES users (id),
+        has_lettuce_factor BOOLEAN NOT NULL DEFAULT FALSE,
+        generation BIGINT NOT NULL DEFAULT 0,
+        FOREIGN KEY (league_id, white) REFERENCES players (league_id, name),
+        FOREIGN KEY (league_id, black) REFERENCES players (league_id, name)
+    );
+    CREATE INDEX IF NOT EXISTS games_league_date ON games (league_id, date);
+'''
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(list, json.dumps)
+sqlite3.register_adapter(dict, json.dumps)
+sqlite3.register_converter('TIMESTAMP', lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter('BOOLEAN', lambda value: value not in (b'0', b''))
+sqlite3.register_converter('JSONB', json.loads)
+
+_listeners = {}
+_listeners_lock = threading.Lock()
+_memory_anchor = None
+
+_NOW = "datetime('now', 'localtime')"
+_REWRITES = [
+    (re.compile(r'\b(?:BIG)?SERIAL\s+PRIMARY KEY', re.I), 'INTEGER PRIMARY KEY AUTOINCREMENT'),
+    (re.compile(r'\s+text_pattern_ops\b', re.I), ''),
+    (re.compile(r'\)\s*PARTITION BY LIST \([^)]*\)', re.I), ')'),
+    (re.compile(r'\s+FOR UPDATE(?: SKIP LOCKED)?', re.I), ''),
+    (re.compile(r'\bDEFAULT NOW\(\)', re.I), f'DEFAULT ({_NOW})'),
+    # NOW() + %s * INTERVAL '1 second'  /  NOW() - INTERVAL '7 days'
+    (re.compile(r"\bNOW\(\)\s*([+-])\s*%s\s*\*\s*INTERVAL\s*'1 (\w+?)s?'", re.I),
+     lambda m: f"datetime('now', 'localtime', '{m.group(1)}' || ? || ' {m.group(2)}s')"),
+    (re.compile(r"\bNOW\(\)\s*([+-])\s*INTERVAL\s*'(\d+) (\w+)'", re.I),
+     lambda m: f"datetime('now', 'localtime', '{m.group(1)}{m.group(2)} {m.group(3)}')"),
+    (re.compile(r'\bNOW\(\)', re.I), _NOW),
+    (re.compile(r'=\s*ANY\(%s\)', re.I), 'IN (SELECT value FROM json_each(?))'),
+    (re.compile(r'\bLIKE\s+%s', re.I), lambda m: "LIKE ? ESCAPE '\\'"),
+    (re.compile(r'\bGREATEST\(', re.I), 'MAX('),
+    (re.compile(r'\bLEAST\(', re.I), 'MIN('),
+    (re.compile(r'^SET CONSTRAINTS ALL DEFERRED$', re.I), 'PRAGMA defer_foreign_keys = ON'),
+    # INSERT ... SELECT ... ON CONFLICT: sin WHERE, SQLite lee ON como parte de un JOIN
+    (re.compile(r'^(INSERT INTO .+? SELECT (?:(?!\bWHERE\b).)+?)(\s+ON CONFLICT)', re.I | re.S), r'\1 WHERE true\2'),
+]
+# Sentencias sin equivalente (secuencias, particiones): no hacen nada en SQLite
+_SKIPPED = re.compile(r'^(SELECT setval\(|CREATE TABLE IF NOT EXISTS \w+ PARTITION OF )', re.I)
+_ADD_COLUMN = re.compile(r'^ALTER TABLE (\w+) ADD COLUMN IF NOT EXISTS (\w+)(.*)$', re.I | re.S)
+_READ = re.compile(r'^\s*SELECT\b', re.I)
+_LOCKING = re.compile(r'\bFOR UPDATE\b', re.I)
+_DROP_TABLES = re.compile(r'^DROP TABLE IF EXISTS ([\w\s,]+?)(?:\s+CASCADE)?$', re.I)
+
+
+def _split(sql):
+    """Sentencias separadas por `;` (fuera de comillas)"""
+    statements, current, quoted = [], [], False
+    for char in sql:
+        if char == "'":
+            quoted = not quoted
+        if char == ';' and not quoted:
+            statements.append(''.join(current))
+            current = []
+        else:
+            current.append(char)
+    statements.append(''.join(current))
+    return [statement.strip() for statement in statements if statement.strip()]
+
+
+def _rewrite_extract(statement):
+    """EXTRACT(EPOCH FROM a - b) -> segundos entre a y b"""
+    marker = 'EXTRACT(EPOCH FROM '
+    while True:
+        start = statement.upper().find(marker)
+        if start < 0:
+            return statement
+        depth, i = 1, start + len(marker)
+        minus = None
+        while depth:
+            char = statement[i]
+            if char == '(':
+                depth += 1
+            elif char == ')':
+                depth -= 1
+            elif char == '-' and depth == 1 and minus is None:
+                minus = i
+            i += 1
+        left = statement[start + len(marker):minus].strip()
+        right = statement[minus + 1:i - 1].strip()
+        statement = (statement[:start] + f'((julianday({left}) - julianday({right})) * 86400.0)'
+                     + statement[i:])
+
+
+@lru_cache(maxsize=512)
+def translate(sql):
+    """
+    Traduce una consulta de Postgres (parámetros %s) a las sentencias de
+    SQLite y si escribe (o bloquea con FOR UPDATE). El resultado se
+    memoriza: la misma consulta reutiliza la sentencia preparada de la conexión.
+    """
+    writes = not _READ.match(sql) or bool(_LOCKING.search(sql))
+    statements = []
+    for statement in _split(sql):
+        if _SKIPPED.match(statement):
+            continue
+        drop = _DROP_TABLES.match(statement)
+        if drop:
+            # Una tabla por sentencia y sin CASCADE
+            statements.extend(f'DROP TABLE IF EXISTS {table.strip()}' for table in drop.group(1).split(','))
+            continue
+        statement = _rewrite_extract(statement)
+        for pattern, replacement in _REWRITES:
+            statement = pattern.sub(replacement, statement)
+        statements.append(statement.replace('%s', '?'))
+    return tuple(statements), writes
+
+
+def listen(channel, callback):
+    """Registra `callback(payload)` para las notificaciones de `channel` de este proceso"""
+    with _listeners_lock:
+        _listeners.setdefault(channel, set()).add(callback)
+
+
+def _deliver(notifications):
+    for channel, payload in notifications:
+        with _listeners_lock:
+            callbacks = list(_listeners.get(channel, ()))
+        for callback in callbacks:
+            callback(payload)
+
+
+class Cursor:
+    """Cursor con parámetros %s; las filas se leen por posición o por nombre, como DictCursor"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.cursor = connection.raw.cursor()
+
+    def execute(self, sql, params=()):
+        statements, writes = translate(sql)
+        if writes:
+            self.connection._begin()
+        for statement in statements:
+            column = _ADD_COLUMN.match(statement)
+            if column and self.connection._has_column(column.group(1), column.group(2)):
+                continue
+            if column:
+                statement = f'ALTER TABLE {column.group(1)} ADD COLUMN {column.group(2)}{column.group(3)}'
+            self.cursor.execute(statement, params if len(statements) == 1 else ())
+
+    def executemany(self, sql, seq_of_params):
+        self.connection._begin()
+        (statement,), _ = translate(sql)
+        self.cursor.executemany(statement, seq_of_params)
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def fetchmany(self, size):
+        return self.cursor.fetchmany(size)
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+
+    @property
+    def description(self):
+        return self.cursor.description
+
+    def close(self):
+        # psycopg2 permite cerrar el cursor después de la conexión
+        if not self.connection.closed:
+            self.cursor.close()
+
+
+class Connection:
+    """
+    Conexión con la interfaz de psycopg2 que usa la aplicación (cursor,
+    commit, rollback, set_session). Como READ COMMITTED en Postgres, cada
+    lectura fuera de una transacción ve lo último confirmado; la primera
+    escritura (o FOR UPDATE) abre la transacción con el candado de
+    escritura (BEGIN IMMEDIATE), que se suelta en commit o rollback.
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.closed = False
+        self.autocommit = False
+        self.readonly = False
+        self.notifications = []
+        raw.create_function('pg_notify', 2, self._notify)
+
+    def _notify(self, channel, payload):
+        self.notifications.append((channel, payload))
+        return ''
+
+    def _begin(self):
+        if not (self.autocommit or self.readonly or self.raw.in_transaction):
+            self.raw.execute('BEGIN IMMEDIATE')
+
+    def _has_column(self, table, column):
+        return any(row[1] == column for row in self.raw.execute(f'PRAGMA table_info({table})'))
+
+    def cursor(self, cursor_factory=None):
+        return Cursor(self)
+
+    def set_session(self, readonly=None, autocommit=None):
+        if readonly is not None:
+            self.readonly = readonly
+            self.raw.execute(f'PRAGMA query_only = {"ON" if readonly else "OFF"}')
+        if autocommit is not None:
+            self.autocommit = autocommit
+
+    def set_isolation_level(self, level):
+        self.autocommit = level == 0
+
+    def listen(self, channel, callback):
+        listen(channel, callback)
+
+    def commit(self):
+        if self.raw.in_transaction:
+            self.raw.execute('COMMIT')
+        notifications, self.notifications = self.notifications, []
+        _deliver(notifications)
+
+    def rollback(self):
+        if self.raw.in_transaction:
+            self.raw.execute('ROLLBACK')
+        self.notifications = []
+
+    def close(self):
+        if not self.closed:
+            self.rollback()
+            self.raw.close()
+            self.closed = True
+
+
+def connect(path):
+    """Abre `path` (':memory:' = base en memoria compartida por el proceso) en modo WAL"""
+    global _memory_anchor
+    uri = path == ':memory:'
+    if uri:
+        path = MEMORY_URI
+    raw = sqlite3.connect(path, uri=uri, isolation_level=None, check_same_thread=False,
+                          detect_types=sqlite3.PARSE_DECLTYPES, cached_statements=CACHED_STATEMENTS)
+    raw.row_factory = sqlite3.Row
+    raw.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}')
+    raw.execute('PRAGMA foreign_keys = ON')
+    if uri:
+        # La base en memoria vive mientras haya una conexión abierta
+        if _memory_anchor is None:
+            _memory_anchor = sqlite3.connect(path, uri=True, check_same_thread=False)
+    else:
+        raw.execute('PRAGMA journal_mode = WAL')
+        raw.execute('PRAGMA synchronous = NORMAL')
+    return Connection(raw)
@@ -1,7 +1,7 @@
 from flask import Blueprint, render_template
 from flask_login import current_user
 from app.database.connection import get_db
-from app.utils.elo import getElo
+from app.utils.elo import getElo, K_FACTOR
 from app.utils.helpers import format_name
 import json
 from datetime import datetime
@@ -114,7 +114,7 @@ def index():
         white_rating = historical_ratings[game['white_name']]
         black_rating = historical_ratings[game['black_name']]
         
-        new_white, new_black = getElo(white_rating, black_rating, 50, game['result'])
+        new_white, new_black = getElo(white_rating, black_rating, K_FACTOR, game['result'])
         white_change = new_white - white_rating
         black_change = new_black - black_rating
         
@@ -1,5 +1,5 @@
-from .elo import getElo, GetProbability
+from .elo import getElo, GetProbability, K_FACTOR
 from .helpers import format_name, get_players
 
 # Exportar las funciones que necesitamos
-__all__ = ['getElo', 'GetProbability', 'format_name', 'get_players'] 
\ No newline at end of file
+__all__ = ['getElo', 'GetProbability', 'K_FACTOR', 'format_name', 'get_players'] 
\ No newline at end of file
@@ -0,0 +1,176 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin brotli solo se generan las variantes gzip
+    brotli = None
+
+# CSS y JS propios: se escriben en assets/ y se publican minificados, con el
+# hash del contenido en el nombre (static/assets/app.<hash>.css), junto a sus
+# variantes .gz y .br. Como el nombre cambia con el contenido, los
+# navegadores pueden guardarlos para siempre (Cache-Control immutable).
+SOURCE_DIR = 'assets'
+BUILD_DIR = os.path.join('static', 'assets')
+MANIFEST = 'manifest.json'
+SOURCES = ('app.css', 'player_search.js', 'app.js')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Extensión del archivo precomprimido de cada codificación
+ENCODINGS = {'br': '.br', 'gzip': '.gz'}
+
+# Respuestas dinámicas: se comprimen las de estos tipos desde este tamaño
+COMPRESSIBLE_TYPES = {'text/html', 'application/json', 'text/css', 'application/javascript'}
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def minify_css(text):
+    """Sin comentarios ni espacios sobrantes (los de los selectores se conservan)"""
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    text = re.sub(r':\s+', ':', text)
+    return text.replace(';}', '}').strip()
+
+
+def minify_js(text):
+    """
+    Minificación conservadora: quita la sangría, las líneas vacías y los
+    comentarios de línea completa, y conserva los saltos de línea (la
+    inserción automática de punto y coma no cambia)
+    """
+    lines = (line.strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def compress(data, encoding, best=False):
+    """`data` comprimido con gzip o br (`best`: el mayor nivel, para los archivos precomprimidos)"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if best else BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=9 if best else GZIP_LEVEL, mtime=0)
+
+
+def available_encodings():
+    return [encoding for encoding in ENCODINGS if encoding != 'br' or brotli is not None]
+
+
+def preferred_encoding(accept_encoding, encodings=None):
+    """La mejor codificación de `encodings` que acepta el cliente (br antes que gzip), o None"""
+    accepted = set()
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        if name and params.replace(' ', '') not in ('q=0', 'q=0.0'):
+            accepted.add(name.lower())
+    for encoding in encodings if encodings is not None else available_encodings():
+        if encoding in accepted:
+            return encoding
+    return None
+
+
+def build(root, write=True):
+    """
+    Minifica, calcula el hash y comprime cada fuente de SOURCES. Con `write`
+    deja los archivos y el manifiesto en BUILD_DIR (borrando las versiones
+    anteriores). Devuelve el manifiesto: nombre -> archivo, hash de la
+    fuente y tamaños, más el contenido de cada variante en 'files' (no se
+    guarda en el manifiesto).
+    """
+    manifest, files = {}, {}
+    for name in SOURCES:
+        with open(os.path.join(root, SOURCE_DIR, name), 'rb') as f:
+            source = f.read()
+        base, ext = os.path.splitext(name)
+        data = MINIFIERS[ext](source.decode('utf-8')).encode('utf-8')
+        filename = f'{base}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+        variants = {None: data}
+        for encoding in available_encodings():
+            variants[encoding] = compress(data, encoding, best=True)
+        files[filename] = variants
+        manifest[name] = {
+            'file': filename,
+            'source_hash': hashlib.sha256(source).hexdigest(),
+            'bytes': {'source': len(source), 'minified': len(data),
+                      **{encoding: len(variant) for encoding, variant in variants.items() if encoding}},
+        }
+
+    if write:
+        out_dir = os.path.join(root, BUILD_DIR)
+        os.makedirs(out_dir, exist_ok=True)
+        current = {filename + ENCODINGS.get(encoding, '') for filename, variants in files.items() for encoding in variants}
+        for filename, variants in files.items():
+            for encoding, data in variants.items():
+                with open(os.path.join(out_dir, filename + ENCODINGS.get(encoding, '')), 'wb') as f:
+                    f.write(data)
+        with open(os.path.join(out_dir, MANIFEST), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=4)
+        for stale in set(os.listdir(out_dir)) - current - {MANIFEST}:
+            os.remove(os.path.join(out_dir, stale))
+    return {**manifest, 'files': files}
+
+
+class AssetBundle:
+    """
+    Los archivos publicados de la aplicación. Usa el manifiesto de
+    BUILD_DIR si corresponde a las fuentes actuales; si no (o si no existe,
+    en desarrollo), los genera en memoria la primera vez que se piden.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.lock = threading.Lock()
+        self.manifest = None
+        self.files = None
+
+    def load(self):
+        with self.lock:
+            if self.manifest is not None:
+                return self.manifest
+            manifest = None
+            try:
+                with open(os.path.join(self.root, BUILD_DIR, MANIFEST), encoding='utf-8') as f:
+                    manifest = json.load(f)
+                for name in SOURCES:
+                    with open(os.path.join(self.root, SOURCE_DIR, name), 'rb') as f:
+                        if hashlib.sha256(f.read()).hexdigest() != manifest[name]['source_hash']:
+                            manifest = None
+                            break
+            except (OSError, ValueError, KeyError):
+                manifest = None
+            self.files = None
+            if manifest is None:
+                built = build(self.root, write=False)
+                self.files = built.pop('files')
+                manifest = built
+            self.manifest = manifest
+            return manifest
+
+    def reset(self):
+        """Vuelve a leer el manifiesto en el próximo pedido (después de build)"""
+        with self.lock:
+            self.manifest = None
+
+    def filename(self, name):
+        """Nombre publicado (con hash) de la fuente `name`"""
+        return self.load()[name]['file']
+
+    def variant(self, filename, accept_encoding):
+        """(contenido, codificación) de `filename` para el cliente, o None si no existe"""
+        manifest = self.load()
+        if not any(entry['file'] == filename for entry in manifest.values()):
+            return None
+        encodings = available_encodings() if self.files is not None else [
+            encoding for encoding in ENCODINGS
+            if os.path.exists(os.path.join(self.root, BUILD_DIR, filename + ENCODINGS[encoding]))]
+        encoding = preferred_encoding(accept_encoding, encodings)
+        if self.files is not None:
+            return self.files[filename][encoding], encoding
+        with open(os.path.join(self.root, BUILD_DIR, filename + ENCODINGS.get(encoding, '')), 'rb') as f:
+            return f.read(), encoding
@@ -0,0 +1,124 @@
+import numpy as np
+
+from app.utils.elo import K_FACTOR, GetProbability
+from app.utils.parallel import parallel_map
+
+# Remuestreos por defecto y nivel de los intervalos (percentiles 5 y 95)
+DEFAULT_SAMPLES = 2000
+CONFIDENCE = 0.9
+# Remuestreos por bloque: cada bloque usa su propia semilla, así el resultado
+# no depende de cuántos procesos se usen
+CHUNK_SIZE = 250
+
+# Intervalos calculados por el trabajo `rating_intervals`, uno por liga y generación
+INTERVALS_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS rating_intervals (
+        league_id INTEGER NOT NULL REFERENCES leagues (id) ON DELETE CASCADE,
+        generation BIGINT NOT NULL,
+        computed_at TIMESTAMP NOT NULL DEFAULT NOW(),
+        payload JSONB NOT NULL,
+        PRIMARY KEY (league_id, generation)
+    )
+'''
+
+
+def _penalty_steps(picks, penalty_position):
+    """
+    Paso de la repetición de cada muestra en que se aplica cada penalización:
+    antes de la primera partida remuestreada que se jugó después de ella.
+    `picks` está ordenado por fila; devuelve (muestras, penalizaciones).
+    """
+    samples, n_games = picks.shape
+    # Cada fila se desplaza a su propio tramo para buscar en todas a la vez
+    offsets = np.arange(samples)[:, None] * (n_games + 1)
+    flat = (picks + offsets).ravel()
+    steps = np.searchsorted(flat, (penalty_position[None, :] + offsets).ravel())
+    return steps.reshape(samples, -1) - offsets // (n_games + 1) * n_games
+
+
+def _bootstrap_chunk(args):
+    """
+    Remuestrea el historial `samples` veces (con reemplazo, conservando el
+    orden cronológico), repite el ELO de cada muestra con las penalizaciones
+    semanales en su lugar y devuelve los ratings finales de `players` y
+    cuántas veces terminó cada uno en cada posición
+    """
+    initial, white, black, score, penalties, players, k, samples, seed = args
+    penalty_player, penalty_position, penalty_points = penalties
+    rng = np.random.default_rng(seed)
+    n_games = len(white)
+    rows = np.arange(samples)
+
+    ratings = np.repeat(initial[None, :], samples, axis=0)
+    picks = np.sort(rng.integers(0, n_games, size=(samples, n_games)), axis=1) if n_games else \
+        np.zeros((samples, 0), dtype=np.int64)
+    # Penalizaciones de cada paso: (muestra, penalización) ordenadas por paso
+    n_penalties = len(penalty_player)
+    steps = _penalty_steps(picks, penalty_position).ravel()
+    order = np.argsort(steps, kind='stable')
+    bounds = np.searchsorted(steps[order], np.arange(n_games + 2))
+
+    def penalize(step):
+        applied = order[bounds[step]:bounds[step + 1]]
+        if len(applied):
+            penalty = applied % n_penalties
+            np.subtract.at(ratings, (applied // n_penalties, penalty_player[penalty]), penalty_points[penalty])
+
+    for step in range(n_games):
+        penalize(step)
+        game = picks[:, step]
+        w = white[game]
+        b = black[game]
+        rw = ratings[rows, w]
+        rb = ratings[rows, b]
+        change = k * (score[game] - GetProbability(rw, rb))
+        ratings[rows, w] = np.rint(rw + change)
+        ratings[rows, b] = np.rint(rb - change)
+    penalize(n_games)
+
+    final = ratings[:, players]
+    # Posiciones de cada muestra (desempate al azar)
+    n = len(players)
+    order = np.lexsort((rng.random((samples, n)), -final), axis=1)
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(n)[None, :], axis=1)
+    rank_counts = np.zeros((n, n), dtype=np.int64)
+    np.add.at(rank_counts, (np.broadcast_to(np.arange(n), ranks.shape), ranks), 1)
+    return {'ratings': final, 'rank_counts': rank_counts}
+
+
+def bootstrap_ratings(initial, white, black, score, players, penalties=None, k=K_FACTOR,
+                      samples=DEFAULT_SAMPLES, seed=None, workers=None):
+    """
+    Intervalos de confianza del ELO de `players` y probabilidad de cada
+    posición final, por bootstrap del historial. `penalties` son las
+    penalizaciones (jugador, partidas anteriores, puntos) que se descuentan
+    en cada muestra (ver rated_penalties). Con la misma semilla el
+    resultado es idéntico.
+    """
+    chunks = []
+    remaining = samples
+    while remaining > 0:
+        chunks.append(min(CHUNK_SIZE, remaining))
+        remaining -= chunks[-1]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    initial = np.asarray(initial, dtype=np.float64)
+    players = np.asarray(players, dtype=np.int64)
+    if penalties is None:
+        penalties = ((),) * 3
+    penalties = tuple(np.asarray(column, dtype=np.int64) for column in penalties)
+    tasks = [(initial, white, black, score, penalties, players, k, size, chunk_seed)
+             for size, chunk_seed in zip(chunks, seeds)]
+
+    results = parallel_map(_bootstrap_chunk, tasks, workers)
+
+    ratings = np.concatenate([result['ratings'] for result in results])
+    rank_probabilities = sum(result['rank_counts'] for result in results) / samples
+    tail = (1 - CONFIDENCE) / 2
+    return {
+        'lower': np.quantile(ratings, tail, axis=0),
+        'median': np.median(ratings, axis=0),
+        'upper': np.quantile(ratings, 1 - tail, axis=0),
+        'rank_probabilities': rank_probabilities,
+        'expected_rank': rank_probabilities @ np.arange(1, len(players) + 1),
+    }
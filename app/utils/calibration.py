@@ -0,0 +1,121 @@
+from itertools import product
+
+import numpy as np
+
+from app.utils.parallel import parallel_map
+
+# Modelos de rating evaluados:
+#   elo: ELO de la liga (K fijo, ratings redondeados como en getElo)
+#   elo_provisional: K doble durante las primeras PROVISIONAL_GAMES partidas de cada jugador
+MODELS = ('elo', 'elo_provisional')
+PROVISIONAL_GAMES = 10
+# Las probabilidades se acotan para que el log-loss sea finito
+PROBABILITY_EPSILON = 1e-6
+# Candidatos por bloque enviado a cada proceso
+CANDIDATES_PER_TASK = 64
+
+
+def build_grid(k_values, initial_values, white_advantages, models=MODELS):
+    """Todas las combinaciones de modelo, K, rating inicial y ventaja de blancas"""
+    return [
+        {'model': model, 'k': k, 'initial': initial, 'white_advantage': advantage}
+        for model, k, initial, advantage in product(models, k_values, initial_values, white_advantages)
+    ]
+
+
+def game_arrays(games, start_ratings):
+    """
+    Convierte partidas (white, black, result) en arreglos de índices.
+    Devuelve (white, black, score, nombres, ratings de start.json).
+    """
+    index = {}
+    names = []
+
+    def intern(name):
+        if name not in index:
+            index[name] = len(names)
+            names.append(name)
+        return index[name]
+
+    for name in start_ratings:
+        intern(name)
+    white = np.array([intern(g[0]) for g in games], dtype=np.int64)
+    black = np.array([intern(g[1]) for g in games], dtype=np.int64)
+    score = np.array([float(g[2]) for g in games], dtype=np.float64)
+    start = np.array([start_ratings.get(name, np.nan) for name in names], dtype=np.float64)
+    return white, black, score, names, start
+
+
+def _evaluate_chunk(args):
+    """Recorre el historial una vez actualizando todos los candidatos del bloque a la vez"""
+    white, black, score, start, candidates, burn_in = args
+    n_candidates = len(candidates)
+    n_players = len(start)
+
+    k = np.array([c['k'] for c in candidates], dtype=np.float64)
+    advantage = np.array([c['white_advantage'] for c in candidates], dtype=np.float64)
+    provisional = np.array([c['model'] == 'elo_provisional' for c in candidates])
+
+    ratings = np.empty((n_candidates, n_players))
+    for i, candidate in enumerate(candidates):
+        if candidate['initial'] == 'start':
+            # Los jugadores sin rating en start.json parten del promedio
+            mean = np.nanmean(start) if np.isfinite(start).any() else 500.0
+            ratings[i] = np.where(np.isfinite(start), start, mean)
+        else:
+            ratings[i] = float(candidate['initial'])
+
+    played = np.zeros(n_players, dtype=np.int64)
+    log_loss = np.zeros(n_candidates)
+    brier = np.zeros(n_candidates)
+    correct = np.zeros(n_candidates)
+    scored = 0
+
+    for g in range(len(white)):
+        w, b, s = white[g], black[g], score[g]
+        rw = ratings[:, w]
+        rb = ratings[:, b]
+        expected = 1 / (1 + 10 ** ((rb - rw - advantage) / 400))
+
+        if g >= burn_in:
+            p = np.clip(expected, PROBABILITY_EPSILON, 1 - PROBABILITY_EPSILON)
+            log_loss -= s * np.log(p) + (1 - s) * np.log(1 - p)
+            brier += (s - expected) ** 2
+            if s != 0.5:
+                correct += (expected > 0.5) == (s == 1)
+            scored += 1
+
+        k_white = np.where(provisional & (played[w] < PROVISIONAL_GAMES), 2 * k, k)
+        k_black = np.where(provisional & (played[b] < PROVISIONAL_GAMES), 2 * k, k)
+        ratings[:, w] = np.rint(rw + k_white * (s - expected))
+        ratings[:, b] = np.rint(rb - k_black * (s - expected))
+        played[w] += 1
+        played[b] += 1
+
+    decisive = int(np.count_nonzero(score[burn_in:] != 0.5))
+    return [
+        {
+            **candidate,
+            'games': scored,
+            'log_loss': log_loss[i] / scored if scored else float('nan'),
+            'brier': brier[i] / scored if scored else float('nan'),
+            'accuracy': correct[i] / decisive if decisive else float('nan'),
+        }
+        for i, candidate in enumerate(candidates)
+    ]
+
+
+def evaluate_grid(games, start_ratings, grid, burn_in=0, workers=None):
+    """
+    Evalúa cada candidato del grid reproduciendo el historial completo y
+    midiendo qué tan bien predice cada partida antes de jugarse.
+    Devuelve los candidatos ordenados por log-loss.
+    """
+    white, black, score, names, start = game_arrays(games, start_ratings)
+    tasks = [
+        (white, black, score, start, grid[i:i + CANDIDATES_PER_TASK], burn_in)
+        for i in range(0, len(grid), CANDIDATES_PER_TASK)
+    ]
+    results = [row for chunk in parallel_map(_evaluate_chunk, tasks, workers) for row in chunk]
+    results.sort(key=lambda row: row['log_loss'])
+    return results
@@ -0,0 +1,54 @@
+import threading
+from contextlib import contextmanager
+
+# Segundos que una petición espera por una conexión libre antes de fallar
+POOL_TIMEOUT = 10
+
+
+class ConnectionPool:
+    """
+    Pool acotado de conexiones de solo lectura. Cuando todas están en uso,
+    las peticiones esperan (en vez de fallar como ThreadedConnectionPool),
+    de modo que con workers de gevent miles de greenlets pueden compartir
+    unas pocas conexiones a Postgres. Las conexiones se abren al pedirlas
+    y se reutilizan, evitando el handshake TLS en cada consulta.
+    """
+
+    def __init__(self, connect, size):
+        self.connect = connect
+        self.slots = threading.BoundedSemaphore(size)
+        self.idle = []
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def connection(self, timeout=POOL_TIMEOUT):
+        if not self.slots.acquire(timeout=timeout):
+            raise TimeoutError('No hay conexiones libres a la base de datos')
+        conn = None
+        try:
+            with self.lock:
+                conn = self.idle.pop() if self.idle else None
+            if conn is None or conn.closed:
+                conn = self.connect()
+                conn.set_session(readonly=True, autocommit=True)
+            yield conn
+        except Exception:
+            # Ante cualquier error la conexión se descarta: puede haber quedado rota
+            if conn is not None and not conn.closed:
+                conn.close()
+            conn = None
+            raise
+        finally:
+            if conn is not None and not conn.closed:
+                with self.lock:
+                    self.idle.append(conn)
+            self.slots.release()
+
+    def prewarm(self, count=1):
+        """Abre `count` conexiones por adelantado (p. ej. al arrancar en frío); los errores se ignoran"""
+        for _ in range(count):
+            try:
+                with self.connection():
+                    pass
+            except Exception:
+                return
@@ -1,3 +1,8 @@
+import os
+
+# Factor K de la liga; se puede ajustar con la variable de entorno ELO_K (ver calibrate.py)
+K_FACTOR = int(os.environ.get('ELO_K', '50'))
+
 def GetProbability(rating1, rating2):
     return 1 / (1 + 10 ** ((rating2 - rating1) / 400))
 
@@ -0,0 +1,203 @@
+import json
+import logging
+import select
+import threading
+import time
+from collections import deque
+
+from app.utils.elo import getElo
+
+logger = logging.getLogger(__name__)
+
+# Canal de Postgres (LISTEN/NOTIFY) por el que viajan los eventos de la liga:
+# NOTIFY dentro de la transacción de escritura solo se entrega si hay commit
+CHANNEL = 'league_events'
+# Cada cuántos segundos se envía un comentario para mantener viva la conexión
+HEARTBEAT_SECONDS = 15
+RECONNECT_SECONDS = 5
+# Eventos pendientes por cliente; si un cliente lento acumula más, se le pide recargar
+MAX_PENDING_EVENTS = 64
+# Límite de NOTIFY en Postgres (8000 bytes); un delta mayor se reemplaza por una recarga
+MAX_PAYLOAD_BYTES = 7900
+
+
+def format_event(event_id, name, data):
+    """Mensaje en formato text/event-stream (`data` ya serializado como JSON)"""
+    return f'id: {event_id}\nevent: {name}\ndata: {data}\n\n'
+
+
+class Subscription:
+    """Cola de eventos de una conexión /events a la liga `league_id`"""
+    __slots__ = ('league_id', 'events', 'ready', 'overflowed')
+
+    def __init__(self, league_id=None):
+        self.league_id = league_id
+        self.events = deque()
+        self.ready = threading.Event()
+        self.overflowed = False
+
+    def push(self, event):
+        if len(self.events) >= MAX_PENDING_EVENTS:
+            self.overflowed = True
+        else:
+            self.events.append(event)
+        self.ready.set()
+
+    def drain(self, timeout):
+        """Espera hasta `timeout` segundos y devuelve los eventos pendientes"""
+        self.ready.clear()
+        if not self.events and not self.overflowed:
+            self.ready.wait(timeout)
+        events = []
+        while self.events:
+            events.append(self.events.popleft())
+        return events
+
+
+class EventBroker:
+    """
+    Reparte los eventos de la liga a las conexiones del proceso. Un solo hilo
+    por proceso escucha el canal de Postgres, de modo que las conexiones
+    inactivas no consumen conexiones a la base de datos.
+    """
+
+    def __init__(self, connect, channel=CHANNEL):
+        self.connect = connect
+        self.channel = channel
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.listener = None
+
+    def subscribe(self, league_id=None):
+        subscription = Subscription(league_id)
+        with self.lock:
+            self.subscribers.add(subscription)
+            if self.listener is None or not self.listener.is_alive():
+                self.listener = threading.Thread(target=self._listen, name='league-events', daemon=True)
+                self.listener.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers.discard(subscription)
+
+    def broadcast(self, payload):
+        """
+        Envía un evento (JSON de NOTIFY) a las conexiones de su liga; un
+        evento sin liga va a todas
+        """
+        try:
+            data = json.loads(payload)
+            event = (data.get('generation', ''), data.get('type', 'message'), payload)
+        except ValueError:
+            logger.error(f"Evento inválido: {payload[:200]}")
+            return
+        league_id = data.get('league')
+        with self.lock:
+            subscribers = [subscription for subscription in self.subscribers
+                           if league_id is None or subscription.league_id in (None, league_id)]
+        for subscription in subscribers:
+            subscription.push(event)
+
+    def _listen(self):
+        from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+        reconnecting = False
+        while True:
+            conn = None
+            try:
+                conn = self.connect()
+                if hasattr(conn, 'listen'):
+                    # SQLite: las notificaciones se entregan en el proceso al hacer commit
+                    conn.listen(self.channel, self.broadcast)
+                    return
+                conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                cur = conn.cursor()
+                cur.execute(f'LISTEN {self.channel}')
+                if reconnecting:
+                    # Pudieron perderse eventos mientras no había conexión
+                    self.broadcast(json.dumps({'type': 'reload'}))
+                reconnecting = False
+
+                while True:
+                    if select.select([conn], [], [], HEARTBEAT_SECONDS) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self.broadcast(conn.notifies.pop(0).payload)
+            except Exception as e:
+                logger.error(f"Error escuchando eventos de la liga: {str(e)}")
+                reconnecting = True
+                time.sleep(RECONNECT_SECONDS)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+
+def game_delta(league, generation, white_name, black_name, result, date, has_lettuce_factor, games_this_week):
+    """
+    Cambios que produce una partida nueva sobre la liga actual (sin la
+    partida): la fila del historial, los dos jugadores y las posiciones que
+    cambian en la clasificación. Si la liga no corresponde a la generación
+    anterior, el evento solo pide recargar.
+    """
+    white = league.index.get(white_name)
+    black = league.index.get(black_name)
+    if (league.generation is None or league.generation != generation - 1
+            or white is None or black is None
+            or not (league.rated[white] and league.rated[black])):
+        return {'type': 'reload', 'generation': generation}
+
+    white_rating = league.ratings[white]
+    black_rating = league.ratings[black]
+    new_white, new_black = getElo(white_rating, black_rating, league.k, result)
+
+    players = [player for player, player_id in enumerate(league.player_ids)
+               if player_id >= 0 and league.rated[player]]
+    before = sorted(players, key=lambda player: league.ratings[player], reverse=True)
+    new_ratings = {white: new_white, black: new_black}
+    after = sorted(players, key=lambda player: new_ratings.get(player, league.ratings[player]), reverse=True)
+    old_rank = {player: rank for rank, player in enumerate(before, start=1)}
+
+    code = int(result * 2)
+    white_wins = league.white_wins[white] + (code == 2)
+    white_games = league.white_games[white] + 1
+    black_wins = league.black_wins[black] + (code == 0)
+    black_games = league.black_games[black] + 1
+
+    def player_row(player, rating):
+        row = {
+            'id': league.player_ids[player],
+            'rating': rating,
+            'games_this_week': games_this_week[player] + 1,
+            'warning': games_this_week[player] + 1 < 3,
+        }
+        if player == white:
+            row['white_games'] = white_games
+            row['white_winrate'] = round(white_wins / white_games * 100, 1)
+        else:
+            row['black_games'] = black_games
+            row['black_winrate'] = round(black_wins / black_games * 100, 1)
+        return row
+
+    return {
+        'type': 'game',
+        'generation': generation,
+        'game': {
+            'white': league.display_names[white],
+            'black': league.display_names[black],
+            'result': result,
+            'white_rating': white_rating,
+            'black_rating': black_rating,
+            'white_change': new_white - white_rating,
+            'black_change': new_black - black_rating,
+            'date': date.strftime('%Y-%m-%d %H:%M:%S'),
+            'has_lettuce_factor': has_lettuce_factor,
+        },
+        'players': [player_row(white, new_white), player_row(black, new_black)],
+        'ranks': [
+            {'id': league.player_ids[player], 'from': old_rank[player], 'to': rank}
+            for rank, player in enumerate(after, start=1)
+            if old_rank[player] != rank
+        ],
+    }
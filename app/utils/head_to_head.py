@@ -0,0 +1,143 @@
+import numpy as np
+
+# Hasta esta cantidad de jugadores se usan matrices densas NxN; con más,
+# solo se guardan los pares que se han enfrentado
+DENSE_MAX_PLAYERS = 256
+# Fecha de "nunca se han enfrentado"
+NEVER = np.iinfo(np.int64).min
+
+
+class HeadToHead:
+    """
+    Enfrentamientos directos entre cada par de jugadores: partidas, puntos
+    (en medios puntos, desde el punto de vista de la fila) y fecha de la
+    última partida en microsegundos. Cada partida nueva se registra en O(1).
+    """
+    __slots__ = ('size', 'dense_max_players', 'games', 'points', 'last_played', 'pairs')
+
+    def __init__(self, dense_max_players=DENSE_MAX_PLAYERS):
+        self.size = 0
+        self.dense_max_players = dense_max_players
+        self.games = np.zeros((0, 0), dtype=np.int32)
+        self.points = np.zeros((0, 0), dtype=np.int32)
+        self.last_played = np.full((0, 0), NEVER, dtype=np.int64)
+        # Modo disperso: (menor, mayor) -> [partidas, medios puntos del menor, última fecha]
+        self.pairs = None
+
+    @property
+    def dense(self):
+        return self.pairs is None
+
+    def copy(self):
+        h2h = HeadToHead(self.dense_max_players)
+        h2h.size = self.size
+        if self.dense:
+            h2h.games = self.games.copy()
+            h2h.points = self.points.copy()
+            h2h.last_played = self.last_played.copy()
+        else:
+            h2h.games = h2h.points = h2h.last_played = None
+            h2h.pairs = {key: entry[:] for key, entry in self.pairs.items()}
+        return h2h
+
+    def add_player(self):
+        """Reserva espacio para un jugador nuevo (la capacidad crece al doble)"""
+        self.size += 1
+        if not self.dense:
+            return
+        if self.size > self.dense_max_players:
+            self._to_sparse()
+            return
+        capacity = len(self.games)
+        if self.size > capacity:
+            new_capacity = min(max(2 * capacity, 16), self.dense_max_players)
+            self.games = self._grow(self.games, new_capacity, 0)
+            self.points = self._grow(self.points, new_capacity, 0)
+            self.last_played = self._grow(self.last_played, new_capacity, NEVER)
+
+    @staticmethod
+    def _grow(matrix, capacity, fill):
+        grown = np.full((capacity, capacity), fill, dtype=matrix.dtype)
+        size = len(matrix)
+        grown[:size, :size] = matrix
+        return grown
+
+    def _to_sparse(self):
+        low, high = np.nonzero(np.triu(self.games))
+        self.pairs = {
+            (a, b): [games, points, last]
+            for a, b, games, points, last in zip(
+                low.tolist(), high.tolist(), self.games[low, high].tolist(),
+                self.points[low, high].tolist(), self.last_played[low, high].tolist())
+        }
+        self.games = self.points = self.last_played = None
+
+    def add(self, white, black, code, micros):
+        """Registra una partida (code: medios puntos de blancas)"""
+        if self.dense:
+            self.games[white, black] += 1
+            self.games[black, white] += 1
+            self.points[white, black] += code
+            self.points[black, white] += 2 - code
+            self.last_played[white, black] = self.last_played[black, white] = max(
+                self.last_played[white, black], micros)
+            return
+        if white < black:
+            key, points = (white, black), code
+        else:
+            key, points = (black, white), 2 - code
+        entry = self.pairs.get(key)
+        if entry is None:
+            self.pairs[key] = [1, points, micros]
+        else:
+            entry[0] += 1
+            entry[1] += points
+            entry[2] = max(entry[2], micros)
+
+    def pair(self, a, b):
+        """(partidas, medios puntos de a, última fecha o None) entre a y b"""
+        if self.dense:
+            games = int(self.games[a, b])
+            last = int(self.last_played[a, b])
+            return games, int(self.points[a, b]), last if games else None
+        entry = self.pairs.get((a, b) if a < b else (b, a))
+        if entry is None:
+            return 0, 0, None
+        games, points, last = entry
+        return games, points if a < b else 2 * games - points, last
+
+    def matrix(self, players):
+        """Submatrices densas (partidas, medios puntos, última fecha) para los jugadores dados"""
+        players = np.asarray(players, dtype=np.int64)
+        if self.dense:
+            grid = np.ix_(players, players)
+            return self.games[grid], self.points[grid], self.last_played[grid]
+
+        n = len(players)
+        games = np.zeros((n, n), dtype=np.int32)
+        points = np.zeros((n, n), dtype=np.int32)
+        last_played = np.full((n, n), NEVER, dtype=np.int64)
+        position = {player: i for i, player in enumerate(players.tolist())}
+        for (a, b), (count, low_points, last) in self.pairs.items():
+            i = position.get(a)
+            j = position.get(b)
+            if i is None or j is None:
+                continue
+            games[i, j] = games[j, i] = count
+            points[i, j] = low_points
+            points[j, i] = 2 * count - low_points
+            last_played[i, j] = last_played[j, i] = last
+        return games, points, last_played
+
+    def entries(self, players=None):
+        """Pares (a, b, partidas, medios puntos de a, última fecha) con a < b que se han enfrentado"""
+        if self.dense:
+            low, high = np.nonzero(np.triu(self.games[:self.size, :self.size]))
+            rows = zip(low.tolist(), high.tolist(), self.games[low, high].tolist(),
+                       self.points[low, high].tolist(), self.last_played[low, high].tolist())
+        else:
+            rows = ((a, b, *entry) for (a, b), entry in sorted(self.pairs.items()))
+        if players is None:
+            return list(rows)
+        players = set(players)
+        return [row for row in rows if row[0] in players and row[1] in players]
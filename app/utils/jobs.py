@@ -0,0 +1,279 @@
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Tabla outbox: los trabajos se insertan en la misma transacción que la
+# escritura que los origina, así que sobreviven a caídas del proceso
+OUTBOX_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS jobs_outbox (
+        id BIGSERIAL PRIMARY KEY,
+        kind TEXT NOT NULL,
+        idempotency_key TEXT UNIQUE NOT NULL,
+        payload JSONB NOT NULL DEFAULT '{}',
+        created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+        run_after TIMESTAMP NOT NULL DEFAULT NOW(),
+        attempts INTEGER NOT NULL DEFAULT 0,
+        last_error TEXT,
+        done_at TIMESTAMP,
+        failed_at TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS jobs_outbox_pending
+        ON jobs_outbox (run_after) WHERE done_at IS NULL AND failed_at IS NULL;
+'''
+
+# Cada cuánto se revisa el outbox aunque nadie avise: acota el retraso de
+# trabajos dejados por otros procesos o por un proceso que se cayó
+POLL_SECONDS = 5
+# Un trabajo tomado queda reservado este tiempo; si el proceso muere, otro lo retoma
+LEASE_SECONDS = 60
+MAX_ATTEMPTS = 5
+# Reintentos con espera exponencial: 2, 4, 8, 16... segundos
+RETRY_BASE_SECONDS = 2
+BATCH_SIZE = 20
+# Trabajos terminados que se conservan (para idempotencia y diagnóstico)
+RETENTION_DAYS = 7
+# Retraso máximo esperado entre que se crea un trabajo y se completa
+MAX_LAG_SECONDS = POLL_SECONDS + 30
+
+
+def enqueue(cur, kind, idempotency_key, payload=None):
+    """
+    Agrega un trabajo dentro de la transacción en curso. Si ya existe un
+    trabajo con la misma clave no se duplica. Devuelve True si se agregó.
+    """
+    cur.execute('''
+        INSERT INTO jobs_outbox (kind, idempotency_key, payload)
+        VALUES (%s, %s, %s)
+        ON CONFLICT (idempotency_key) DO NOTHING
+        RETURNING id
+    ''', (kind, idempotency_key, json.dumps(payload or {})))
+    return cur.fetchone() is not None
+
+
+class JobQueue:
+    """
+    Cola de trabajos derivados: un hilo despachador toma trabajos pendientes
+    del outbox (FOR UPDATE SKIP LOCKED, de modo que varios procesos pueden
+    compartir la tabla) y los ejecuta en un pool de hilos. Los handlers deben
+    ser idempotentes: un trabajo puede ejecutarse más de una vez si el
+    proceso muere antes de marcarlo como terminado.
+    """
+
+    def __init__(self, connect, workers=2):
+        self.connect = connect
+        self.workers = workers
+        self.handlers = {}
+        self.wakeup = threading.Event()
+        self.lock = threading.Lock()
+        self.dispatcher = None
+        self.executor = None
+        self.in_flight = set()
+        # Contadores del proceso
+        self.processed = 0
+        self.retried = 0
+        self.failed = 0
+        self.last_lag_seconds = None
+
+    def handler(self, kind):
+        """Decorador que registra la función que ejecuta los trabajos de un tipo"""
+        def decorator(func):
+            self.handlers[kind] = func
+            return func
+        return decorator
+
+    def wake(self):
+        """Avisa que hay trabajos nuevos (llamar después del commit)"""
+        self.start()
+        self.wakeup.set()
+
+    @property
+    def running(self):
+        return self.dispatcher is not None and self.dispatcher.is_alive()
+
+    def start(self):
+        """
+        Inicia el despachador si no está corriendo. Cada proceso que atiende
+        peticiones debe llamarlo al arrancar, aunque solo lea: así revisa el
+        outbox cada POLL_SECONDS y retoma los trabajos de otros procesos.
+        """
+        if self.running:
+            return
+        with self.lock:
+            if self.dispatcher is None or not self.dispatcher.is_alive():
+                self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='jobs')
+                self.dispatcher = threading.Thread(target=self._dispatch, name='jobs-dispatcher', daemon=True)
+                self.dispatcher.start()
+
+    def submit(self, kind, idempotency_key, payload=None):
+        """Agrega un trabajo en su propia transacción y lo despacha"""
+        conn = self.connect()
+        cur = conn.cursor()
+        try:
+            added = enqueue(cur, kind, idempotency_key, payload)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+            conn.close()
+        self.wake()
+        return added
+
+    def _dispatch(self):
+        last_prune = 0
+        while True:
+            # La primera vuelta no espera: al arrancar se retoman los trabajos pendientes
+            try:
+                while True:
+                    capacity = self.workers - len(self.in_flight)
+                    jobs = self._claim(min(capacity, BATCH_SIZE)) if capacity > 0 else []
+                    if not jobs:
+                        break
+                    for job in jobs:
+                        with self.lock:
+                            self.in_flight.add(job[0])
+                        self.executor.submit(self._run, *job)
+                if time.time() - last_prune > 3600:
+                    self._prune()
+                    last_prune = time.time()
+            except Exception as e:
+                logger.error(f"Error despachando trabajos: {str(e)}")
+            self.wakeup.wait(POLL_SECONDS)
+            self.wakeup.clear()
+
+    def _claim(self, limit):
+        """Reserva hasta `limit` trabajos vencidos de tipos conocidos"""
+        if not self.handlers:
+            return []
+        conn = self.connect()
+        cur = conn.cursor()
+        try:
+            cur.execute('''
+                UPDATE jobs_outbox
+                SET run_after = NOW() + %s * INTERVAL '1 second', attempts = attempts + 1
+                WHERE id IN (
+                    SELECT id FROM jobs_outbox
+                    WHERE done_at IS NULL AND failed_at IS NULL
+                      AND run_after <= NOW() AND kind = ANY(%s)
+                    ORDER BY id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, kind, payload, attempts, created_at
+            ''', (LEASE_SECONDS, list(self.handlers), limit))
+            jobs = [tuple(row) for row in cur.fetchall()]
+            conn.commit()
+            return jobs
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+            conn.close()
+
+    def _run(self, job_id, kind, payload, attempts, created_at):
+        error = None
+        try:
+            self.handlers[kind](payload)
+        except Exception as e:
+            error = e
+            logger.error(f"Error en trabajo {kind} #{job_id} (intento {attempts}): {str(e)}")
+
+        try:
+            self._finish(job_id, attempts, created_at, error)
+        except Exception as e:
+            # El trabajo se reintentará cuando venza la reserva
+            logger.error(f"Error registrando el trabajo {kind} #{job_id}: {str(e)}")
+        finally:
+            with self.lock:
+                self.in_flight.discard(job_id)
+            # Puede haber más trabajos esperando un hilo libre
+            self.wakeup.set()
+
+    def _finish(self, job_id, attempts, created_at, error):
+        conn = self.connect()
+        cur = conn.cursor()
+        try:
+            if error is None:
+                cur.execute('''
+                    UPDATE jobs_outbox SET done_at = NOW(), last_error = NULL
+                    WHERE id = %s
+                    RETURNING EXTRACT(EPOCH FROM done_at - created_at)
+                ''', (job_id,))
+                row = cur.fetchone()
+                with self.lock:
+                    self.processed += 1
+                    self.last_lag_seconds = float(row[0]) if row else None
+            elif attempts >= MAX_ATTEMPTS:
+                cur.execute(
+                    'UPDATE jobs_outbox SET failed_at = NOW(), last_error = %s WHERE id = %s',
+                    (str(error)[:1000], job_id)
+                )
+                with self.lock:
+                    self.failed += 1
+            else:
+                delay = RETRY_BASE_SECONDS ** attempts
+                cur.execute('''
+                    UPDATE jobs_outbox
+                    SET run_after = NOW() + %s * INTERVAL '1 second', last_error = %s
+                    WHERE id = %s
+                ''', (delay, str(error)[:1000], job_id))
+                with self.lock:
+                    self.retried += 1
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+            conn.close()
+
+    def _prune(self):
+        conn = self.connect()
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                "DELETE FROM jobs_outbox WHERE done_at < NOW() - %s * INTERVAL '1 day'",
+                (RETENTION_DAYS,)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+            conn.close()
+
+    def metrics(self, cur):
+        """Estado del outbox (con un cursor de lectura) y contadores del proceso"""
+        cur.execute('''
+            SELECT
+                COUNT(*) FILTER (WHERE done_at IS NULL AND failed_at IS NULL) AS pending,
+                COUNT(*) FILTER (WHERE failed_at IS NOT NULL) AS failed,
+                EXTRACT(EPOCH FROM NOW() - MIN(created_at)
+                        FILTER (WHERE done_at IS NULL AND failed_at IS NULL)) AS lag_seconds
+            FROM jobs_outbox
+        ''')
+        pending, failed, lag = cur.fetchone()
+        lag = float(lag) if lag is not None else 0.0
+        # El retraso se mide en el outbox: crece aunque ningún proceso lo esté despachando
+        return {
+            'pending': pending,
+            'failed': failed,
+            'lag_seconds': round(lag, 3),
+            'max_lag_seconds': MAX_LAG_SECONDS,
+            'within_bound': lag <= MAX_LAG_SECONDS,
+            'process': {
+                'dispatcher_running': self.running,
+                'processed': self.processed,
+                'retried': self.retried,
+                'failed': self.failed,
+                'in_flight': len(self.in_flight),
+                'last_lag_seconds': round(self.last_lag_seconds, 3) if self.last_lag_seconds is not None else None,
+            },
+        }
@@ -0,0 +1,429 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+
+from app.utils.elo import K_FACTOR, getElo
+from app.utils.head_to_head import HeadToHead
+from app.utils.helpers import format_name
+from app.utils.leagues import DEFAULT_LEAGUE_ID
+from app.utils.player_stats import PlayerStats
+
+# Las fechas se guardan como microsegundos desde EPOCH (sin zona horaria, igual que la columna TIMESTAMP)
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+MICROS_PER_DAY = 24 * 60 * 60 * 1000000
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Resultados en medios puntos para blancas: 2 = ganan blancas, 1 = tablas, 0 = ganan negras
+WHITE_WIN, DRAW, BLACK_WIN = 2, 1, 0
+
+# Cada cuántas partidas se guarda una foto de los ratings de todos los jugadores
+CHECKPOINT_INTERVAL = 256
+
+
+def to_micros(date):
+    return (date - EPOCH) // MICROSECOND
+
+
+def from_micros(micros):
+    return EPOCH + timedelta(microseconds=micros)
+
+
+class League:
+    """
+    Liga en memoria con representación columnar.
+    Los jugadores se internan como índices enteros y cada partida ocupa una
+    posición en arreglos paralelos, de modo que procesar el historial no crea
+    un diccionario por partida.
+    """
+    __slots__ = (
+        'k', 'league_id', 'generation', 'closed_through', 'index', 'by_id', 'names', 'display_names', 'player_ids', 'player_generation', 'rated',
+        'initial_ratings', 'ratings',
+        'white_games', 'white_wins', 'white_draws',
+        'black_games', 'black_wins', 'black_draws',
+        'white', 'black', 'result', 'played_at', 'lettuce', 'game_generation',
+        'white_rating', 'black_rating', 'white_change', 'black_change',
+        'ledger_player', 'ledger_at', 'ledger_rating', 'ledger_game', 'timelines',
+        'penalty_player', 'penalty_at', 'penalty_points', 'penalty_position',
+        'checkpoint_ratings', 'checkpoint_games', 'engine_ratings', 'head_to_head', 'player_stats',
+    )
+
+    def __init__(self, initial_ratings, k=K_FACTOR):
+        self.k = k
+        self.league_id = DEFAULT_LEAGUE_ID
+        self.generation = None
+        # Inicio de la última semana cerrada (ver app/utils/penalties.py)
+        self.closed_through = None
+
+        # Jugadores (un elemento por jugador internado)
+        self.index = {}
+        self.by_id = {}
+        self.names = []
+        self.display_names = []
+        self.player_ids = array('i')
+        self.player_generation = array('q')  # Generación en que se agregó a la base de datos
+        self.rated = array('b')
+        self.initial_ratings = array('i')
+        self.ratings = array('i')
+        self.white_games = array('i')
+        self.white_wins = array('i')
+        self.white_draws = array('i')
+        self.black_games = array('i')
+        self.black_wins = array('i')
+        self.black_draws = array('i')
+
+        # Partidas (un elemento por partida, en orden cronológico)
+        self.white = array('i')
+        self.black = array('i')
+        self.result = array('b')
+        self.played_at = array('q')
+        self.lettuce = array('b')
+        self.game_generation = array('q')  # Generación en que se agregó (0 = anterior a las generaciones)
+        self.white_rating = array('i')  # Rating antes del juego
+        self.black_rating = array('i')  # Rating antes del juego
+        self.white_change = array('h')
+        self.black_change = array('h')
+
+        # Libro de ratings: una entrada por cada cambio de rating de un jugador
+        self.ledger_player = array('i')
+        self.ledger_at = array('q')
+        self.ledger_rating = array('i')  # Rating después del cambio
+        self.ledger_game = array('i')  # -1 en las penalizaciones
+        # Índice por jugador: posiciones de sus entradas en el libro
+        self.timelines = []
+        # Penalizaciones semanales (ver app/utils/penalties.py), en orden cronológico;
+        # position = partidas jugadas antes de aplicarla
+        self.penalty_player = array('i')
+        self.penalty_at = array('q')
+        self.penalty_points = array('i')
+        self.penalty_position = array('i')
+        # Fotos de ratings y partidas jugadas cada CHECKPOINT_INTERVAL partidas
+        self.checkpoint_ratings = []
+        self.checkpoint_games = []
+        # Resultados de otros sistemas de rating (ver rating_engines), por nombre
+        self.engine_ratings = {}
+        # Enfrentamientos directos por par de jugadores
+        self.head_to_head = HeadToHead()
+        # Rendimiento, rachas y forma de cada jugador en las partidas con rating
+        self.player_stats = PlayerStats()
+
+        for name, rating in initial_ratings.items():
+            self.add_player(name, rating)
+
+    def __len__(self):
+        return len(self.white)
+
+    def copy(self):
+        """
+        Copia independiente de la liga, para agregarle partidas sin tocar la
+        que otros hilos están leyendo (ver catch_up_league en app.py). Las
+        fotos de los checkpoints no cambian después de tomarse y se comparten.
+        """
+        league = League.__new__(League)
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if isinstance(value, (array, list)):
+                value = value[:]
+            elif isinstance(value, dict):
+                value = dict(value)
+            setattr(league, name, value)
+        league.timelines = [timeline[:] for timeline in self.timelines]
+        league.head_to_head = self.head_to_head.copy()
+        league.player_stats = self.player_stats.copy()
+        return league
+
+    def intern(self, name):
+        """Devuelve el índice del jugador, creándolo si no existe"""
+        player = self.index.get(name)
+        if player is None:
+            player = len(self.names)
+            self.index[name] = player
+            self.names.append(name)
+            self.display_names.append(format_name(name))
+            for column in (self.player_ids, self.player_generation, self.rated, self.initial_ratings, self.ratings,
+                           self.white_games, self.white_wins, self.white_draws,
+                           self.black_games, self.black_wins, self.black_draws):
+                column.append(0)
+            self.player_ids[player] = -1
+            self.timelines.append(array('i'))
+            self.head_to_head.add_player()
+            self.player_stats.add_player()
+        return player
+
+    def add_player(self, name, rating):
+        """Agrega un jugador con rating inicial (los que solo aparecen en partidas no tienen rating)"""
+        player = self.intern(name)
+        self.rated[player] = 1
+        self.initial_ratings[player] = rating
+        self.ratings[player] = rating
+        return player
+
+    def set_player_id(self, name, player_id, generation=0):
+        player = self.intern(name)
+        self.player_ids[player] = player_id
+        self.player_generation[player] = generation
+        self.by_id[player_id] = player
+
+    def is_rated(self, game):
+        return self.rated[self.white[game]] and self.rated[self.black[game]]
+
+    def add_game(self, white_name, black_name, result, date, has_lettuce_factor=False, generation=0):
+        """Agrega una partida (en orden cronológico) y actualiza ratings y estadísticas"""
+        white = self.intern(white_name)
+        black = self.intern(black_name)
+        code = int(result * 2)
+
+        self.white.append(white)
+        self.black.append(black)
+        self.result.append(code)
+        self.played_at.append(to_micros(date))
+        self.lettuce.append(1 if has_lettuce_factor else 0)
+        self.game_generation.append(generation)
+        self.head_to_head.add(white, black, code, self.played_at[-1])
+        if self.engine_ratings:
+            self.engine_ratings.clear()
+
+        # Actualizar estadísticas
+        self.white_games[white] += 1
+        self.black_games[black] += 1
+        if code == WHITE_WIN:
+            self.white_wins[white] += 1
+        elif code == BLACK_WIN:
+            self.black_wins[black] += 1
+        else:
+            self.white_draws[white] += 1
+            self.black_draws[black] += 1
+
+        # Las partidas con jugadores sin rating inicial no afectan el ELO
+        if not (self.rated[white] and self.rated[black]):
+            for column in (self.white_rating, self.black_rating, self.white_change, self.black_change):
+                column.append(0)
+            self._checkpoint()
+            return len(self.white) - 1
+
+        white_rating = self.ratings[white]
+        black_rating = self.ratings[black]
+        new_white, new_black = getElo(white_rating, black_rating, self.k, code / 2)
+
+        self.white_rating.append(white_rating)
+        self.black_rating.append(black_rating)
+        self.white_change.append(new_white - white_rating)
+        self.black_change.append(new_black - black_rating)
+        self.ratings[white] = new_white
+        self.ratings[black] = new_black
+
+        game = len(self.white) - 1
+        self.player_stats.add(white, code, white_rating, black_rating, new_white - white_rating, game)
+        self.player_stats.add(black, 2 - code, black_rating, white_rating, new_black - black_rating, game)
+        self._record(white, new_white, game, self.played_at[game])
+        self._record(black, new_black, game, self.played_at[game])
+        self._checkpoint()
+        return game
+
+    def add_penalty(self, name, date, points):
+        """
+        Descuenta `points` del rating del jugador en `date` (en orden
+        cronológico con las partidas): queda en el libro y las partidas
+        siguientes parten del rating penalizado
+        """
+        player = self.index.get(name)
+        if player is None or not self.rated[player]:
+            return
+        micros = to_micros(date)
+        self.penalty_player.append(player)
+        self.penalty_at.append(micros)
+        self.penalty_points.append(points)
+        self.penalty_position.append(len(self.white))
+        if self.engine_ratings:
+            self.engine_ratings.clear()
+
+        self.ratings[player] -= points
+        self._record(player, self.ratings[player], -1, micros)
+
+    def first_played(self, player):
+        """Fecha (microsegundos) de la primera partida con rating del jugador, o None"""
+        timeline = self.timelines[player]
+        return self.ledger_at[timeline[0]] if timeline else None
+
+    def _checkpoint(self):
+        if len(self.white) % CHECKPOINT_INTERVAL == 0:
+            self.checkpoint_ratings.append(array('i', self.ratings))
+            games = array('i', self.white_games)
+            for player, count in enumerate(self.black_games):
+                games[player] += count
+            self.checkpoint_games.append(games)
+
+    def _record(self, player, rating, game, micros):
+        self.timelines[player].append(len(self.ledger_player))
+        self.ledger_player.append(player)
+        self.ledger_at.append(micros)
+        self.ledger_rating.append(rating)
+        self.ledger_game.append(game)
+
+    def _timeline_range(self, player, start=None, end=None):
+        """Rango [lo, hi) de la línea de tiempo del jugador entre start y end (inclusive)"""
+        timeline = self.timelines[player]
+        ledger_at = self.ledger_at
+        lo, hi = 0, len(timeline)
+        if start is not None:
+            micros = to_micros(start)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if ledger_at[timeline[mid]] < micros:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            hi = len(timeline)
+        if end is not None:
+            micros = to_micros(end)
+            first, last = lo, hi
+            while first < last:
+                mid = (first + last) // 2
+                if ledger_at[timeline[mid]] <= micros:
+                    first = mid + 1
+                else:
+                    last = mid
+            hi = first
+        return lo, hi
+
+    def rating_history(self, player, start=None, end=None):
+        """Serie (fechas en microsegundos, ratings) del jugador entre start y end"""
+        timeline = self.timelines[player]
+        lo, hi = self._timeline_range(player, start, end)
+        dates = array('q', (self.ledger_at[position] for position in timeline[lo:hi]))
+        ratings = array('i', (self.ledger_rating[position] for position in timeline[lo:hi]))
+        return dates, ratings
+
+    def rating_history_overlay(self, players, start=None, end=None):
+        """Series de varios jugadores recorriendo el libro una sola vez"""
+        series = {player: (array('q'), array('i')) for player in players}
+        lo = 0 if start is None else bisect_left(self.ledger_at, to_micros(start))
+        hi = len(self.ledger_at) if end is None else bisect_right(self.ledger_at, to_micros(end))
+        for position in range(lo, hi):
+            entry = series.get(self.ledger_player[position])
+            if entry is not None:
+                entry[0].append(self.ledger_at[position])
+                entry[1].append(self.ledger_rating[position])
+        return series
+
+    def games_between(self, start, end):
+        """Cantidad de partidas de cada jugador entre start y end (inclusive)"""
+        counts = array('i', [0]) * len(self.names)
+        lo = bisect_left(self.played_at, to_micros(start))
+        hi = bisect_right(self.played_at, to_micros(end))
+        for game in range(lo, hi):
+            counts[self.white[game]] += 1
+            counts[self.black[game]] += 1
+        return counts
+
+    def state_at(self, date):
+        """
+        Ratings y partidas jugadas de cada jugador al instante `date`.
+        Parte de la última foto anterior y aplica a lo más CHECKPOINT_INTERVAL
+        partidas (y las penalizaciones entre ellas), sin recorrer el historial
+        desde el inicio.
+        """
+        micros = to_micros(date)
+        played = bisect_right(self.played_at, micros)
+        checkpoint = played // CHECKPOINT_INTERVAL
+        if checkpoint:
+            ratings = array('i', self.checkpoint_ratings[checkpoint - 1])
+            games = array('i', self.checkpoint_games[checkpoint - 1])
+        else:
+            ratings = array('i')
+            games = array('i')
+
+        # Jugadores internados después de la foto
+        missing = len(self.names) - len(ratings)
+        ratings.extend(self.initial_ratings[len(ratings):])
+        games.extend(array('i', [0]) * missing)
+
+        # Penalizaciones posteriores a la foto y anteriores a `date`
+        penalty = bisect_left(self.penalty_position, checkpoint * CHECKPOINT_INTERVAL)
+        penalties = len(self.penalty_position)
+        for game in range(checkpoint * CHECKPOINT_INTERVAL, played + 1):
+            while penalty < penalties and self.penalty_position[penalty] == game:
+                if self.penalty_at[penalty] <= micros:
+                    ratings[self.penalty_player[penalty]] -= self.penalty_points[penalty]
+                penalty += 1
+            if game == played:
+                break
+            white = self.white[game]
+            black = self.black[game]
+            games[white] += 1
+            games[black] += 1
+            if self.rated[white] and self.rated[black]:
+                ratings[white] = self.white_rating[game] + self.white_change[game]
+                ratings[black] = self.black_rating[game] + self.black_change[game]
+        return ratings, games, played
+
+    def games_since(self, generation):
+        """Índices de las partidas agregadas después de la generación dada, en orden cronológico"""
+        return [game for game, added in enumerate(self.game_generation) if added > generation]
+
+    def winrates(self, player):
+        """Winrate con blancas y con negras (solo victorias), en porcentaje"""
+        white_games = self.white_games[player]
+        black_games = self.black_games[player]
+        white_winrate = 0 if white_games == 0 else round(self.white_wins[player] / white_games * 100, 1)
+        black_winrate = 0 if black_games == 0 else round(self.black_wins[player] / black_games * 100, 1)
+        return white_winrate, black_winrate
+
+    def game_rows(self):
+        """Partidas con rating, de la más reciente a la más antigua"""
+        for game in range(len(self.white) - 1, -1, -1):
+            if self.is_rated(game):
+                yield GameRow(self, game)
+
+
+class GameRow:
+    """Vista de solo lectura sobre una partida de la liga, para las plantillas"""
+    __slots__ = ('league', 'game')
+
+    def __init__(self, league, game):
+        self.league = league
+        self.game = game
+
+    @property
+    def white(self):
+        return self.league.names[self.league.white[self.game]]
+
+    @property
+    def black(self):
+        return self.league.names[self.league.black[self.game]]
+
+    @property
+    def white_display(self):
+        return self.league.display_names[self.league.white[self.game]]
+
+    @property
+    def black_display(self):
+        return self.league.display_names[self.league.black[self.game]]
+
+    @property
+    def result(self):
+        return self.league.result[self.game] / 2
+
+    @property
+    def white_rating(self):
+        return self.league.white_rating[self.game]
+
+    @property
+    def black_rating(self):
+        return self.league.black_rating[self.game]
+
+    @property
+    def white_change(self):
+        return self.league.white_change[self.game]
+
+    @property
+    def black_change(self):
+        return self.league.black_change[self.game]
+
+    @property
+    def has_lettuce_factor(self):
+        return bool(self.league.lettuce[self.game])
+
+    @property
+    def date(self):
+        return from_micros(self.league.played_at[self.game]).strftime(DATE_FORMAT)
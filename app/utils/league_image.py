@@ -0,0 +1,204 @@
+import json
+import mmap
+import struct
+from array import array
+
+import numpy as np
+
+from app.utils.head_to_head import HeadToHead
+from app.utils.league import League, from_micros, to_micros
+from app.utils.player_stats import COLUMNS as STATS_COLUMNS, FORM_COLUMNS as STATS_FORM_COLUMNS
+from app.utils.snapshot import write_atomic
+
+# Imagen binaria de una liga en memoria: una cabecera JSON (generación,
+# nombres y la ubicación de cada columna) seguida de los arreglos tal como
+# están en memoria. Se lee con mmap y cada columna se copia de una vez, sin
+# volver a recorrer el historial.
+MAGIC = b'WLIMG'
+VERSION = 2
+_PREFIX = struct.Struct('<5sBI')  # magia, versión, largo de la cabecera
+_ALIGN = 8
+
+# Columnas array de League que se guardan tal cual
+COLUMNS = (
+    'player_ids', 'player_generation', 'rated', 'initial_ratings', 'ratings',
+    'white_games', 'white_wins', 'white_draws', 'black_games', 'black_wins', 'black_draws',
+    'white', 'black', 'result', 'played_at', 'lettuce', 'game_generation',
+    'white_rating', 'black_rating', 'white_change', 'black_change',
+    'ledger_player', 'ledger_at', 'ledger_rating', 'ledger_game',
+    'penalty_player', 'penalty_at', 'penalty_points', 'penalty_position',
+)
+# Columnas de league.player_stats (se guardan como stats_<nombre>)
+STATS = tuple(name for name, _ in STATS_COLUMNS + STATS_FORM_COLUMNS)
+
+
+def _concat(arrays, typecode):
+    """Arreglos de largo variable como (todos seguidos, largos)"""
+    values = array(typecode)
+    sizes = array('i')
+    for item in arrays:
+        values.extend(item)
+        sizes.append(len(item))
+    return values, sizes
+
+
+def _split(values, sizes):
+    items, start = [], 0
+    for size in sizes:
+        items.append(values[start:start + size])
+        start += size
+    return items
+
+
+def dumps(league):
+    """Imagen de la liga como bytes"""
+    blobs = {}
+    for name in COLUMNS:
+        column = getattr(league, name)
+        blobs[name] = (column.typecode, column.tobytes())
+    for name in STATS:
+        column = getattr(league.player_stats, name)
+        blobs['stats_' + name] = (column.typecode, column.tobytes())
+    for name, (values, sizes) in {
+        'timeline': _concat(league.timelines, 'i'),
+        'checkpoint_ratings': _concat(league.checkpoint_ratings, 'i'),
+        'checkpoint_games': _concat(league.checkpoint_games, 'i'),
+    }.items():
+        blobs[name] = (values.typecode, values.tobytes())
+        blobs[name + '_sizes'] = (sizes.typecode, sizes.tobytes())
+
+    h2h = league.head_to_head
+    if h2h.dense:
+        for name in ('games', 'points', 'last_played'):
+            matrix = getattr(h2h, name)
+            blobs['h2h_' + name] = (matrix.dtype.str, matrix.tobytes())
+        capacity = len(h2h.games)
+    else:
+        pairs = sorted(h2h.pairs.items())
+        for i, name in enumerate(('low', 'high')):
+            blobs['h2h_' + name] = ('<i8', np.array([key[i] for key, _ in pairs], dtype=np.int64).tobytes())
+        for i, name in enumerate(('games', 'points', 'last_played')):
+            blobs['h2h_' + name] = ('<i8', np.array([entry[i] for _, entry in pairs], dtype=np.int64).tobytes())
+        capacity = None
+
+    columns, offset = {}, 0
+    for name, (typecode, data) in blobs.items():
+        columns[name] = [typecode, offset, len(data)]
+        offset += len(data) + (-len(data) % _ALIGN)
+    header = json.dumps({
+        'league_id': league.league_id,
+        'generation': league.generation,
+        'k': league.k,
+        'closed_through': to_micros(league.closed_through) if league.closed_through else None,
+        'names': league.names,
+        'display_names': league.display_names,
+        'head_to_head': {'size': h2h.size, 'dense_max_players': h2h.dense_max_players,
+                         'dense': h2h.dense, 'capacity': capacity},
+        'columns': columns,
+    }, ensure_ascii=False).encode('utf-8')
+    header += b' ' * (-(_PREFIX.size + len(header)) % _ALIGN)
+
+    parts = [_PREFIX.pack(MAGIC, VERSION, len(header)), header]
+    for typecode, data in blobs.values():
+        parts.append(data)
+        parts.append(b'\0' * (-len(data) % _ALIGN))
+    return b''.join(parts)
+
+
+def _header(buffer):
+    magic, version, header_size = _PREFIX.unpack_from(buffer, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('Imagen de liga inválida o de otra versión')
+    return json.loads(bytes(buffer[_PREFIX.size:_PREFIX.size + header_size])), _PREFIX.size + header_size
+
+
+def loads(buffer):
+    """Liga desde una imagen (bytes, memoryview o mmap)"""
+    header, base = _header(buffer)
+    view = memoryview(buffer)
+    columns = header['columns']
+
+    def column(name):
+        typecode, offset, size = columns[name]
+        data = view[base + offset:base + offset + size]
+        if typecode.startswith('<'):
+            return np.frombuffer(data, dtype=typecode).copy()
+        values = array(typecode)
+        values.frombytes(data)
+        return values
+
+    league = League({}, k=header['k'])
+    league.league_id = header['league_id']
+    league.generation = header['generation']
+    if header['closed_through'] is not None:
+        league.closed_through = from_micros(header['closed_through'])
+    league.names = header['names']
+    league.display_names = header['display_names']
+    league.index = {name: player for player, name in enumerate(league.names)}
+    for name in COLUMNS:
+        setattr(league, name, column(name))
+    for name in STATS:
+        setattr(league.player_stats, name, column('stats_' + name))
+    league.by_id = {player_id: player for player, player_id in enumerate(league.player_ids) if player_id >= 0}
+    league.timelines = _split(column('timeline'), column('timeline_sizes'))
+    league.checkpoint_ratings = _split(column('checkpoint_ratings'), column('checkpoint_ratings_sizes'))
+    league.checkpoint_games = _split(column('checkpoint_games'), column('checkpoint_games_sizes'))
+
+    meta = header['head_to_head']
+    h2h = HeadToHead(meta['dense_max_players'])
+    h2h.size = meta['size']
+    if meta['dense']:
+        capacity = meta['capacity']
+        h2h.games = column('h2h_games').reshape(capacity, capacity)
+        h2h.points = column('h2h_points').reshape(capacity, capacity)
+        h2h.last_played = column('h2h_last_played').reshape(capacity, capacity)
+    else:
+        h2h.games = h2h.points = h2h.last_played = None
+        h2h.pairs = {
+            (low, high): [games, points, last]
+            for low, high, games, points, last in zip(
+                column('h2h_low').tolist(), column('h2h_high').tolist(), column('h2h_games').tolist(),
+                column('h2h_points').tolist(), column('h2h_last_played').tolist())
+        }
+    league.head_to_head = h2h
+    return league
+
+
+def read(path):
+    """Liga guardada en `path`, o None si no existe o no es válida"""
+    try:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            # El error se descarta dentro del bloque: su traza retiene vistas
+            # del mmap y no se podría cerrar
+            try:
+                return loads(mapped)
+            except (ValueError, KeyError, struct.error):
+                pass
+    except OSError:
+        pass
+    return None
+
+
+def image_generation(path):
+    """Generación guardada en `path` leyendo solo la cabecera, o None"""
+    try:
+        with open(path, 'rb') as f:
+            prefix = f.read(_PREFIX.size)
+            magic, version, header_size = _PREFIX.unpack(prefix)
+            if magic != MAGIC or version != VERSION:
+                return None
+            return json.loads(f.read(header_size))['generation']
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def write(path, league):
+    """
+    Guarda la imagen de la liga, salvo que `path` ya tenga una generación
+    igual o más nueva. Devuelve True si se escribió.
+    """
+    current = image_generation(path)
+    if current is not None and league.generation is not None and current >= league.generation:
+        return False
+    write_atomic(path, dumps(league))
+    return True
@@ -0,0 +1,127 @@
+import re
+
+# Liga original: los datos anteriores a las ligas múltiples quedan en ella
+DEFAULT_LEAGUE_ID = 1
+DEFAULT_LEAGUE_SLUG = 'waltiliga'
+DEFAULT_LEAGUE_NAME = 'Waltiliga'
+SLUG_PATTERN = re.compile(r'^[a-z0-9][a-z0-9-]{0,39}$')
+
+LEAGUES_SCHEMA = f'''
+    CREATE TABLE IF NOT EXISTS leagues (
+        id SERIAL PRIMARY KEY,
+        slug TEXT UNIQUE NOT NULL,
+        name TEXT NOT NULL,
+        season TEXT,
+        created_at TIMESTAMP NOT NULL DEFAULT NOW()
+    );
+    INSERT INTO leagues (id, slug, name) VALUES ({DEFAULT_LEAGUE_ID}, '{DEFAULT_LEAGUE_SLUG}', '{DEFAULT_LEAGUE_NAME}')
+        ON CONFLICT (id) DO NOTHING;
+    SELECT setval(pg_get_serial_sequence('leagues', 'id'), (SELECT MAX(id) FROM leagues));
+'''
+
+# Partidas particionadas por liga: cada liga tiene su propia tabla
+# (games_league_<id>), así las consultas de una liga no recorren las de otra
+GAMES_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS games (
+        id SERIAL,
+        league_id INTEGER NOT NULL REFERENCES leagues (id),
+        white TEXT NOT NULL,
+        black TEXT NOT NULL,
+        result REAL NOT NULL,
+        date TIMESTAMP NOT NULL,
+        added_by INTEGER REFERENCES users (id),
+        has_lettuce_factor BOOLEAN NOT NULL DEFAULT FALSE,
+        generation BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (league_id, id),
+        FOREIGN KEY (league_id, white) REFERENCES players (league_id, name),
+        FOREIGN KEY (league_id, black) REFERENCES players (league_id, name)
+    ) PARTITION BY LIST (league_id);
+    CREATE INDEX IF NOT EXISTS games_league_date ON games (league_id, date);
+'''
+
+
+def create_partition(cur, league_id):
+    cur.execute(f'CREATE TABLE IF NOT EXISTS games_league_{int(league_id)} '
+                f'PARTITION OF games FOR VALUES IN ({int(league_id)})')
+
+
+def create_partitions(cur):
+    """Crea la partición de partidas de cada liga que aún no la tiene"""
+    cur.execute('SELECT id FROM leagues')
+    for (league_id,) in [tuple(row) for row in cur.fetchall()]:
+        create_partition(cur, league_id)
+
+
+def create_league(cur, slug, name, season=None):
+    """Crea la liga con su partición de partidas y su generación. Devuelve el id."""
+    cur.execute('INSERT INTO leagues (slug, name, season) VALUES (%s, %s, %s) RETURNING id', (slug, name, season))
+    league_id = cur.fetchone()[0]
+    create_partition(cur, league_id)
+    cur.execute('INSERT INTO league_meta (id) VALUES (%s) ON CONFLICT (id) DO NOTHING', (league_id,))
+    return league_id
+
+
+def _constraint_exists(cur, name):
+    cur.execute('SELECT 1 FROM pg_constraint WHERE conname = %s', (name,))
+    return cur.fetchone() is not None
+
+
+def _column_exists(cur, table, column):
+    cur.execute('''
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s AND column_name = %s
+    ''', (table, column))
+    return cur.fetchone() is not None
+
+
+def migrate_to_leagues(cur):
+    """
+    Lleva una base de una sola liga al esquema con ligas: jugadores únicos
+    por liga, usuarios asociados a un jugador de su liga, partidas
+    particionadas y una generación por liga. Los datos existentes quedan en
+    la liga por defecto. Se puede ejecutar más de una vez.
+    """
+    cur.execute(LEAGUES_SCHEMA)
+
+    cur.execute(f'''
+        ALTER TABLE players ADD COLUMN IF NOT EXISTS league_id INTEGER NOT NULL
+            DEFAULT {DEFAULT_LEAGUE_ID} REFERENCES leagues (id)
+    ''')
+    if not _constraint_exists(cur, 'players_league_name_key'):
+        # Elimina también las referencias a players(name) de games y users
+        cur.execute('ALTER TABLE players DROP CONSTRAINT IF EXISTS players_name_key CASCADE')
+        cur.execute('ALTER TABLE players ADD CONSTRAINT players_league_name_key UNIQUE (league_id, name)')
+
+    cur.execute(f'ALTER TABLE users ADD COLUMN IF NOT EXISTS league_id INTEGER NOT NULL DEFAULT {DEFAULT_LEAGUE_ID}')
+    if not _constraint_exists(cur, 'users_player_fkey'):
+        cur.execute('''
+            ALTER TABLE users ADD CONSTRAINT users_player_fkey
+                FOREIGN KEY (league_id, player_name) REFERENCES players (league_id, name)
+        ''')
+
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('games')")
+    row = cur.fetchone()
+    if row is not None and row[0] != 'p':
+        cur.execute('ALTER TABLE games ADD COLUMN IF NOT EXISTS has_lettuce_factor BOOLEAN NOT NULL DEFAULT FALSE')
+        cur.execute('ALTER TABLE games ADD COLUMN IF NOT EXISTS generation BIGINT NOT NULL DEFAULT 0')
+        cur.execute('ALTER TABLE games RENAME TO games_unpartitioned')
+        cur.execute(GAMES_SCHEMA)
+        create_partitions(cur)
+        cur.execute(f'''
+            INSERT INTO games (id, league_id, white, black, result, date, added_by, has_lettuce_factor, generation)
+            SELECT id, {DEFAULT_LEAGUE_ID}, white, black, result, date, added_by, has_lettuce_factor, generation
+            FROM games_unpartitioned
+        ''')
+        cur.execute("SELECT setval(pg_get_serial_sequence('games', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM games")
+        cur.execute('DROP TABLE games_unpartitioned')
+
+    # Una fila de generación por liga
+    cur.execute('ALTER TABLE league_meta DROP CONSTRAINT IF EXISTS league_meta_id_check')
+    cur.execute('INSERT INTO league_meta (id) SELECT id FROM leagues ON CONFLICT (id) DO NOTHING')
+
+    # Tablas derivadas sin liga: se descartan y se vuelven a calcular
+    # (los cierres de semana se repiten solos con las mismas partidas)
+    for table in ('rating_intervals', 'penalties', 'week_closures'):
+        cur.execute('SELECT to_regclass(%s)', (table,))
+        if cur.fetchone()[0] is not None and not _column_exists(cur, table, 'league_id'):
+            cur.execute(f'DROP TABLE {table} CASCADE')
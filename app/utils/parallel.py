@@ -0,0 +1,57 @@
+import os
+import threading
+
+# Procesos del pool compartido (por defecto, uno por CPU)
+POOL_WORKERS = int(os.environ.get('PARALLEL_WORKERS', '0')) or os.cpu_count() or 1
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def process_pool():
+    """
+    Pool de procesos del proceso actual, creado la primera vez que se usa y
+    reutilizado por todos los cálculos (crear uno por llamada cuesta más que
+    muchos de los cálculos). Los procesos se inician con `spawn`: no heredan
+    el estado del servidor (conexiones, gevent) como pasaría con fork.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Importación diferida: multiprocessing no se carga al arrancar
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            _pool = ProcessPoolExecutor(max_workers=POOL_WORKERS,
+                                        mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def _discard_pool(pool):
+    """Descarta el pool si se rompió (p. ej. murió un proceso), para crear otro en la siguiente llamada"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def parallel_map(func, tasks, workers=None):
+    """
+    Ejecuta `func` sobre cada tarea en el pool de procesos compartido y
+    devuelve los resultados en orden. Con `workers=1`, una sola tarea o si
+    el entorno no permite crear procesos (p. ej. serverless), se ejecuta en
+    el proceso actual.
+    """
+    workers = workers or POOL_WORKERS
+    if workers > 1 and len(tasks) > 1 and POOL_WORKERS > 1:
+        from concurrent.futures.process import BrokenProcessPool
+        try:
+            pool = process_pool()
+        except (OSError, NotImplementedError):
+            pool = None
+        if pool is not None:
+            try:
+                return list(pool.map(func, tasks))
+            except (BrokenProcessPool, OSError, NotImplementedError):
+                _discard_pool(pool)
+    return [func(task) for task in tasks]
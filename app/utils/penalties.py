@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+from app.utils.league import to_micros
+
+# Partidas por semana exigidas y penalización por partida faltante
+GAMES_PER_WEEK = 3
+PENALTY_PER_MISSING_GAME = 10
+# Primera semana con penalizaciones (lunes 2025/01/13)
+PENALTY_START = datetime(2025, 1, 13)
+WEEK = timedelta(days=7)
+# Un jugador sin partidas en las últimas INACTIVE_WEEKS semanas (contando la
+# que se cierra) se considera retirado y deja de ser penalizado hasta que
+# vuelva a jugar: así, quien deja la liga suma a lo más INACTIVE_WEEKS
+# semanas de penalización en vez de una por semana para siempre
+INACTIVE_WEEKS = 4
+
+# Semanas cerradas y penalizaciones aplicadas al cerrarlas. Una semana se
+# cierra una sola vez: sus penalizaciones no se vuelven a calcular
+PENALTIES_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS week_closures (
+        league_id INTEGER NOT NULL REFERENCES leagues (id) ON DELETE CASCADE,
+        week_start TIMESTAMP NOT NULL,
+        closed_at TIMESTAMP NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (league_id, week_start)
+    );
+    CREATE TABLE IF NOT EXISTS penalties (
+        league_id INTEGER NOT NULL,
+        week_start TIMESTAMP NOT NULL,
+        player_name TEXT NOT NULL,
+        missing_games INTEGER NOT NULL,
+        points INTEGER NOT NULL,
+        PRIMARY KEY (league_id, week_start, player_name),
+        FOREIGN KEY (league_id, week_start) REFERENCES week_closures (league_id, week_start) ON DELETE CASCADE
+    );
+'''
+
+
+def week_start(date):
+    """Lunes a las 00:00 de la semana de `date`"""
+    return (date - timedelta(days=date.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def weeks_to_close(last_closed, now):
+    """Inicio de cada semana terminada y aún sin cerrar, en orden"""
+    start = PENALTY_START if last_closed is None else last_closed + WEEK
+    weeks = []
+    while start + WEEK <= now:
+        weeks.append(start)
+        start += WEEK
+    return weeks
+
+
+def week_penalties(league, start):
+    """
+    Penalizaciones de la semana que empieza en `start`: (jugador, partidas
+    faltantes, puntos) para cada jugador con rating que ya había jugado
+    alguna partida antes del fin de la semana y que jugó alguna en las
+    últimas INACTIVE_WEEKS semanas. Cuesta O(partidas de esas semanas +
+    jugadores): no recorre el historial.
+    """
+    end = start + WEEK
+    last_micro = end - timedelta(microseconds=1)
+    played = league.games_between(start, last_micro)
+    recent = league.games_between(end - INACTIVE_WEEKS * WEEK, last_micro)
+    end_micros = to_micros(end)
+    penalties = []
+    for player, player_id in enumerate(league.player_ids):
+        if player_id < 0 or not league.rated[player] or not recent[player]:
+            continue
+        first = league.first_played(player)
+        if first is None or first >= end_micros:
+            continue
+        missing = GAMES_PER_WEEK - played[player]
+        if missing > 0:
+            penalties.append((player, missing, PENALTY_PER_MISSING_GAME * missing))
+    return penalties
@@ -0,0 +1,108 @@
+import re
+import unicodedata
+from bisect import bisect_left
+
+# Nombre normalizado para buscar ("Matías Burón" -> "matias buron"), con
+# índice de prefijo (text_pattern_ops) e índice de trigramas si pg_trgm está disponible
+SEARCH_SCHEMA = '''
+    ALTER TABLE players ADD COLUMN IF NOT EXISTS search_name TEXT;
+    CREATE INDEX IF NOT EXISTS players_search_name_prefix
+        ON players (search_name text_pattern_ops);
+'''
+TRIGRAM_SCHEMA = '''
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    CREATE INDEX IF NOT EXISTS players_search_name_trgm
+        ON players USING gin (search_name gin_trgm_ops);
+'''
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+MAX_QUERY_LENGTH = 100
+
+
+def fold(text):
+    """Minúsculas, sin tildes y con los espacios normalizados"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(stripped.casefold().split())
+
+
+def like_patterns(query):
+    """
+    Patrones LIKE para `search_name`: el nombre completo empieza con la
+    búsqueda, o alguna palabra del nombre (un apellido) empieza con ella
+    """
+    escaped = re.sub(r'([\\%_])', r'\\\1', fold(query))
+    return escaped + '%', '% ' + escaped + '%'
+
+
+def search_players(cur, league_id, query, limit=DEFAULT_LIMIT):
+    """Busca en Postgres, dentro de la liga; primero los nombres que empiezan con la búsqueda"""
+    full, word = like_patterns(query)
+    cur.execute('''
+        SELECT id, name FROM players
+        WHERE league_id = %s AND (search_name LIKE %s OR search_name LIKE %s)
+        ORDER BY search_name LIKE %s DESC, search_name
+        LIMIT %s
+    ''', (league_id, full, word, full, limit))
+    return [(row[0], row[1]) for row in cur.fetchall()]
+
+
+class PlayerIndex:
+    """
+    Índice de prefijos en memoria: una lista ordenada con el nombre
+    normalizado de cada jugador y cada sufijo que empieza en una palabra
+    ("matias buron", "buron"). Una búsqueda es un bisect más el recorrido
+    de las coincidencias.
+    """
+
+    __slots__ = ('keys', 'entries', 'folded')
+
+    def __init__(self, players):
+        """`players`: pares (id, nombre)"""
+        self.folded = []
+        terms = []
+        for position, (player_id, name) in enumerate(players):
+            folded = fold(name)
+            self.folded.append((folded, player_id, name))
+            start = 0
+            while True:
+                terms.append((folded[start:], position))
+                start = folded.find(' ', start) + 1
+                if start == 0:
+                    break
+        terms.sort()
+        self.keys = [term for term, _ in terms]
+        self.entries = [position for _, position in terms]
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        prefix = fold(query)
+        if not prefix:
+            return []
+        matches = set()
+        i = bisect_left(self.keys, prefix)
+        while i < len(self.keys) and self.keys[i].startswith(prefix):
+            matches.add(self.entries[i])
+            i += 1
+        # Mismo orden que search_players
+        ranked = sorted(matches, key=lambda p: (not self.folded[p][0].startswith(prefix), self.folded[p][0]))
+        return [(self.folded[p][1], self.folded[p][2]) for p in ranked[:limit]]
+
+
+def create_search_index(cur):
+    """
+    Crea la columna e índices de búsqueda y completa los jugadores que no
+    la tienen. pg_trgm es opcional: sin permisos para crear la extensión
+    queda solo el índice de prefijo.
+    """
+    cur.execute(SEARCH_SCHEMA)
+    cur.execute('SAVEPOINT search_trigram')
+    try:
+        cur.execute(TRIGRAM_SCHEMA)
+        cur.execute('RELEASE SAVEPOINT search_trigram')
+    except Exception:
+        cur.execute('ROLLBACK TO SAVEPOINT search_trigram')
+
+    cur.execute('SELECT id, name FROM players WHERE search_name IS NULL')
+    for player_id, name in [(row[0], row[1]) for row in cur.fetchall()]:
+        cur.execute('UPDATE players SET search_name = %s WHERE id = %s', (fold(name), player_id))
@@ -0,0 +1,148 @@
+import math
+from array import array
+
+from app.utils.elo import GetProbability
+
+# Partidas que cuentan para la forma reciente
+FORM_GAMES = 10
+# Tope de la diferencia de rendimiento (con puntaje perfecto o nulo)
+MAX_PERFORMANCE_DELTA = 800
+
+# Columnas por jugador (nombre, tipo); las de la forma tienen FORM_GAMES
+# elementos por jugador en un anillo que se sobrescribe
+COLUMNS = (
+    ('games', 'i'),
+    ('points', 'i'),  # medios puntos
+    ('wins', 'i'),
+    ('losses', 'i'),
+    ('opponent_ratings', 'q'),  # suma de los ratings de los rivales antes de cada partida
+    ('expected', 'd'),  # suma de los puntajes esperados según el ELO
+    ('best_win_rating', 'i'),
+    ('best_win_game', 'i'),  # -1 si aún no gana
+    ('win_streak', 'i'),
+    ('longest_win_streak', 'i'),
+    ('unbeaten_streak', 'i'),
+    ('longest_unbeaten_streak', 'i'),
+)
+FORM_COLUMNS = (
+    ('form_points', 'b'),  # medios puntos de cada partida
+    ('form_opponent', 'i'),  # rating del rival antes de la partida
+    ('form_change', 'h'),  # cambio de ELO
+    ('form_game', 'i'),  # índice de la partida en la liga
+)
+
+
+def performance(opponent_ratings, points, games):
+    """
+    Rendimiento: rating medio de los rivales más la diferencia que
+    corresponde al porcentaje obtenido (400·log10(p / (1 - p)), con tope de
+    ±MAX_PERFORMANCE_DELTA), o None sin partidas
+    """
+    if not games:
+        return None
+    score = points / 2 / games
+    if score <= 0:
+        delta = -MAX_PERFORMANCE_DELTA
+    elif score >= 1:
+        delta = MAX_PERFORMANCE_DELTA
+    else:
+        delta = max(-MAX_PERFORMANCE_DELTA, min(MAX_PERFORMANCE_DELTA, 400 * math.log10(score / (1 - score))))
+    return int(round(opponent_ratings / games + delta))
+
+
+class PlayerStats:
+    """
+    Estadísticas de rendimiento de cada jugador en las partidas con rating:
+    totales, rachas, mejor victoria y las últimas FORM_GAMES partidas. Cada
+    partida nueva las actualiza en O(1), sin recorrer el historial.
+    """
+    __slots__ = tuple(name for name, _ in COLUMNS + FORM_COLUMNS)
+
+    def __init__(self):
+        for name, typecode in COLUMNS + FORM_COLUMNS:
+            setattr(self, name, array(typecode))
+
+    def copy(self):
+        stats = PlayerStats.__new__(PlayerStats)
+        for name in self.__slots__:
+            setattr(stats, name, getattr(self, name)[:])
+        return stats
+
+    def add_player(self):
+        for name, _ in COLUMNS:
+            getattr(self, name).append(0)
+        self.best_win_game[-1] = -1
+        for name, _ in FORM_COLUMNS:
+            getattr(self, name).extend([0] * FORM_GAMES)
+
+    def add(self, player, points, own_rating, opponent_rating, change, game):
+        """Registra una partida del jugador (`points`: medios puntos; ratings antes de la partida)"""
+        slot = player * FORM_GAMES + self.games[player] % FORM_GAMES
+        self.form_points[slot] = points
+        self.form_opponent[slot] = opponent_rating
+        self.form_change[slot] = change
+        self.form_game[slot] = game
+
+        self.games[player] += 1
+        self.points[player] += points
+        self.opponent_ratings[player] += opponent_rating
+        self.expected[player] += GetProbability(own_rating, opponent_rating)
+        if points == 2:
+            self.wins[player] += 1
+            self.win_streak[player] += 1
+            self.longest_win_streak[player] = max(self.longest_win_streak[player], self.win_streak[player])
+            if self.best_win_game[player] < 0 or opponent_rating > self.best_win_rating[player]:
+                self.best_win_rating[player] = opponent_rating
+                self.best_win_game[player] = game
+        else:
+            self.win_streak[player] = 0
+        if points == 0:
+            self.losses[player] += 1
+            self.unbeaten_streak[player] = 0
+        else:
+            self.unbeaten_streak[player] += 1
+            self.longest_unbeaten_streak[player] = max(self.longest_unbeaten_streak[player],
+                                                       self.unbeaten_streak[player])
+
+    def form(self, player):
+        """
+        Las últimas partidas del jugador, de la más antigua a la más
+        reciente: [(medios puntos, rating del rival, cambio, partida)]
+        """
+        games = self.games[player]
+        count = min(games, FORM_GAMES)
+        base = player * FORM_GAMES
+        slots = [base + (games - count + i) % FORM_GAMES for i in range(count)]
+        return [(self.form_points[slot], self.form_opponent[slot], self.form_change[slot], self.form_game[slot])
+                for slot in slots]
+
+    def summary(self, player):
+        """Estadísticas del jugador (el `best_win_game` es el índice de la partida en la liga)"""
+        games = self.games[player]
+        points = self.points[player]
+        form = self.form(player)
+        form_points = sum(entry[0] for entry in form)
+        return {
+            'games': games,
+            'wins': self.wins[player],
+            'draws': games - self.wins[player] - self.losses[player],
+            'losses': self.losses[player],
+            'score': points / 2,
+            'expected_score': round(self.expected[player], 2),
+            'score_over_expected': round(points / 2 - self.expected[player], 2),
+            'performance_rating': performance(self.opponent_ratings[player], points, games),
+            'average_opponent_rating': round(self.opponent_ratings[player] / games) if games else None,
+            'best_win_rating': self.best_win_rating[player] if self.best_win_game[player] >= 0 else None,
+            'best_win_game': self.best_win_game[player] if self.best_win_game[player] >= 0 else None,
+            'win_streak': self.win_streak[player],
+            'longest_win_streak': self.longest_win_streak[player],
+            'unbeaten_streak': self.unbeaten_streak[player],
+            'longest_unbeaten_streak': self.longest_unbeaten_streak[player],
+            'form': {
+                'games': len(form),
+                'results': ''.join('W' if entry[0] == 2 else 'D' if entry[0] == 1 else 'L' for entry in form),
+                'score': form_points / 2,
+                'performance_rating': performance(sum(entry[1] for entry in form), form_points, len(form)),
+                'rating_change': sum(entry[2] for entry in form),
+            },
+        }
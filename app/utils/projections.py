@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.utils.elo import K_FACTOR, GetProbability
+from app.utils.parallel import parallel_map
+from app.utils.penalties import GAMES_PER_WEEK, PENALTY_PER_MISSING_GAME
+
+# Rondas simuladas por semana (una por día) y semanas usadas para estimar la actividad
+ROUNDS_PER_WEEK = 7
+ACTIVITY_WEEKS = 4
+# Simulaciones por bloque: cada bloque usa su propia semilla, así el resultado
+# no depende de cuántos procesos se usen
+CHUNK_SIZE = 2000
+
+# Proyección con los parámetros por defecto, calculada una vez por generación
+# de la liga fuera de las peticiones (ver projections_job en app.py)
+PROJECTIONS_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS season_projections (
+        league_id INTEGER NOT NULL REFERENCES leagues (id) ON DELETE CASCADE,
+        generation BIGINT NOT NULL,
+        computed_at TIMESTAMP NOT NULL DEFAULT NOW(),
+        payload JSONB NOT NULL,
+        PRIMARY KEY (league_id, generation)
+    )
+'''
+
+
+def league_inputs(league, players, now=None):
+    """Ratings actuales, actividad semanal estimada y tasa de tablas de la liga"""
+    now = now or datetime.now()
+    recent = league.games_between(now - timedelta(weeks=ACTIVITY_WEEKS), now)
+    ratings = np.array([league.ratings[p] for p in players], dtype=np.float64)
+    activity = np.array([recent[p] / ACTIVITY_WEEKS for p in players], dtype=np.float64)
+
+    results = np.frombuffer(league.result, dtype=np.int8) if len(league) else np.zeros(0, dtype=np.int8)
+    draw_rate = float((results == 1).mean()) if len(results) >= 20 else 0.1
+    return ratings, activity, draw_rate
+
+
+def _simulate_chunk(args):
+    """Simula `simulations` temporadas y devuelve los acumulados del bloque"""
+    ratings, activity, draw_rate, k, weeks, simulations, seed = args
+    rng = np.random.default_rng(seed)
+    n = len(ratings)
+
+    current = np.repeat(ratings[None, :], simulations, axis=0)
+    penalties = np.zeros((simulations, n))
+    penalized_weeks = np.zeros((simulations, n))
+    available_prob = np.minimum(activity / ROUNDS_PER_WEEK, 1.0)
+    rows = np.arange(simulations)[:, None]
+
+    for week in range(weeks):
+        games = np.zeros((simulations, n))
+        for _ in range(ROUNDS_PER_WEEK):
+            # Emparejar al azar a los jugadores disponibles en esta ronda
+            available = rng.random((simulations, n)) < available_prob
+            keys = np.where(available, rng.random((simulations, n)), 2.0)
+            order = np.argsort(keys, axis=1)
+            a = order[:, 0:n - 1:2]
+            b = order[:, 1:n:2]
+            valid = available[rows, a] & available[rows, b]
+
+            ra = current[rows, a]
+            rb = current[rows, b]
+            expected = GetProbability(ra, rb)
+
+            # Resultado con la misma puntuación esperada que el ELO y tablas según la liga
+            draw = np.minimum(draw_rate, 2 * np.minimum(expected, 1 - expected))
+            u = rng.random(expected.shape)
+            score = np.where(u < expected - draw / 2, 1.0, np.where(u < expected + draw / 2, 0.5, 0.0))
+
+            change = np.where(valid, k * (score - expected), 0.0)
+            current[rows, a] = np.rint(ra + change)
+            current[rows, b] = np.rint(rb - change)
+            games[rows, a] += valid
+            games[rows, b] += valid
+
+        missing = np.maximum(GAMES_PER_WEEK - games, 0)
+        penalties += PENALTY_PER_MISSING_GAME * missing
+        penalized_weeks += missing > 0
+
+    # Posiciones finales (desempate al azar)
+    order = np.lexsort((rng.random((simulations, n)), -current), axis=1)
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(n)[None, :], axis=1)
+
+    return {
+        'rating_sum': current.sum(axis=0),
+        'rating_sq_sum': (current ** 2).sum(axis=0),
+        'rank_sum': ranks.sum(axis=0),
+        'titles': (ranks == 0).sum(axis=0),
+        'last_places': (ranks == n - 1).sum(axis=0),
+        'podiums': (ranks < 3).sum(axis=0),
+        'penalty_sum': penalties.sum(axis=0),
+        'penalized_weeks_sum': penalized_weeks.sum(axis=0),
+    }
+
+
+def simulate_season(ratings, activity, draw_rate, k=K_FACTOR, weeks=4, simulations=20000, seed=None, workers=None):
+    """
+    Proyecta el final de la temporada simulando `simulations` veces las
+    próximas `weeks` semanas. Con la misma semilla el resultado es idéntico.
+    """
+    chunks = []
+    remaining = simulations
+    while remaining > 0:
+        chunks.append(min(CHUNK_SIZE, remaining))
+        remaining -= chunks[-1]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    tasks = [(ratings, activity, draw_rate, k, weeks, size, chunk_seed)
+             for size, chunk_seed in zip(chunks, seeds)]
+
+    results = parallel_map(_simulate_chunk, tasks, workers)
+
+    totals = {key: sum(result[key] for result in results) for key in results[0]}
+    mean = totals['rating_sum'] / simulations
+    std = np.sqrt(np.maximum(totals['rating_sq_sum'] / simulations - mean ** 2, 0))
+    return {
+        'expected_rating': mean,
+        'rating_std': std,
+        'expected_rank': totals['rank_sum'] / simulations + 1,
+        'title_probability': totals['titles'] / simulations,
+        'last_place_probability': totals['last_places'] / simulations,
+        'podium_probability': totals['podiums'] / simulations,
+        'expected_penalty': totals['penalty_sum'] / simulations,
+        'expected_penalized_weeks': totals['penalized_weeks_sum'] / simulations,
+    }
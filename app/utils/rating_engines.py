@@ -0,0 +1,246 @@
+import math
+import os
+
+import numpy as np
+
+from app.utils.bradley_terry import pairwise_results, solve_davidson
+from app.utils.league import MICROS_PER_DAY, to_micros
+
+# Escala de Glicko-2 (Glickman, "Example of the Glicko-2 system")
+GLICKO_SCALE = 173.7178
+GLICKO_INITIAL_DEVIATION = 350.0
+GLICKO_INITIAL_VOLATILITY = 0.06
+GLICKO_TAU = 0.5
+GLICKO_EPSILON = 1e-6
+
+
+class RatingEngine:
+    """
+    Sistema de rating intercambiable.
+    `rate` recibe la liga completa y devuelve un diccionario de arreglos por
+    jugador (siempre incluye 'rating').
+    """
+    name = None
+
+    def rate(self, league, now=None):
+        raise NotImplementedError
+
+
+class EloEngine(RatingEngine):
+    """ELO de la liga: la liga ya lo calcula partida a partida al cargarse"""
+    name = 'elo'
+
+    def rate(self, league, now=None):
+        return {'rating': np.array(league.ratings, dtype=np.float64)}
+
+
+class Glicko2Engine(RatingEngine):
+    """
+    Glicko-2 con períodos de rating semanales (lunes a domingo, como la regla
+    de 3 partidas por semana). Cada período se procesa en bloque: todos los
+    jugadores activos se actualizan a la vez con operaciones vectorizadas.
+    """
+    name = 'glicko2'
+
+    def __init__(self, tau=GLICKO_TAU, initial_deviation=GLICKO_INITIAL_DEVIATION,
+                 initial_volatility=GLICKO_INITIAL_VOLATILITY):
+        self.tau = tau
+        self.initial_deviation = initial_deviation
+        self.initial_volatility = initial_volatility
+
+    def rate(self, league, now=None):
+        n = len(league.names)
+        max_phi = self.initial_deviation / GLICKO_SCALE
+        mu = np.zeros(n)
+        phi = np.full(n, max_phi)
+        sigma = np.full(n, self.initial_volatility)
+        # El rating inicial de cada jugador es el mismo que en el ELO
+        base = np.array(league.initial_ratings, dtype=np.float64)
+
+        white, black, score, week = self._rated_games(league)
+        last_week = None
+        if len(week):
+            # Límites de cada período dentro del arreglo de partidas (ordenadas por fecha)
+            boundaries = np.flatnonzero(np.diff(week)) + 1
+            starts = np.concatenate(([0], boundaries))
+            ends = np.concatenate((boundaries, [len(week)]))
+            for start, end in zip(starts, ends):
+                current_week = week[start]
+                if last_week is not None and current_week - last_week > 1:
+                    # Semanas sin partidas: aumenta la incertidumbre de todos
+                    phi = np.minimum(np.sqrt(phi ** 2 + (current_week - last_week - 1) * sigma ** 2), max_phi)
+                mu, phi, sigma = self._rating_period(mu, phi, sigma, white[start:end], black[start:end], score[start:end])
+                phi = np.minimum(phi, max_phi)
+                last_week = current_week
+
+        # Semanas transcurridas desde el último período con partidas
+        if now is not None and last_week is not None:
+            idle = week_number(to_micros(now)) - last_week
+            if idle > 0:
+                phi = np.minimum(np.sqrt(phi ** 2 + idle * sigma ** 2), max_phi)
+
+        return {
+            'rating': base + mu * GLICKO_SCALE,
+            'deviation': phi * GLICKO_SCALE,
+            'volatility': sigma,
+        }
+
+    def _rated_games(self, league):
+        white, black, score, played_at = rated_games(league)
+        return white, black, score, week_number(played_at)
+
+    def _rating_period(self, mu, phi, sigma, white, black, score):
+        """Actualiza a todos los jugadores con las partidas de un período"""
+        n = len(mu)
+        # Cada partida aporta un resultado para cada jugador
+        player = np.concatenate((white, black))
+        opponent = np.concatenate((black, white))
+        s = np.concatenate((score, 1 - score))
+
+        g = 1 / np.sqrt(1 + 3 * phi[opponent] ** 2 / math.pi ** 2)
+        expected = 1 / (1 + np.exp(-g * (mu[player] - mu[opponent])))
+        info = np.bincount(player, weights=g ** 2 * expected * (1 - expected), minlength=n)
+        improvement = np.bincount(player, weights=g * (s - expected), minlength=n)
+
+        active = info > 0
+        v = np.full(n, np.inf)
+        v[active] = 1 / info[active]
+        delta = np.zeros(n)
+        delta[active] = v[active] * improvement[active]
+
+        new_sigma = sigma.copy()
+        new_sigma[active] = self._volatility(phi[active], sigma[active], v[active], delta[active])
+
+        phi_star = np.sqrt(phi ** 2 + new_sigma ** 2)
+        new_phi = phi_star.copy()
+        new_phi[active] = 1 / np.sqrt(1 / phi_star[active] ** 2 + 1 / v[active])
+        new_mu = mu.copy()
+        new_mu[active] = mu[active] + new_phi[active] ** 2 * improvement[active]
+        return new_mu, new_phi, new_sigma
+
+    def _volatility(self, phi, sigma, v, delta):
+        """Nueva volatilidad por el método de Illinois, vectorizado sobre los jugadores"""
+        tau = self.tau
+        a = np.log(sigma ** 2)
+        phi2 = phi ** 2
+        delta2 = delta ** 2
+
+        def f(x):
+            ex = np.exp(x)
+            return ex * (delta2 - phi2 - v - ex) / (2 * (phi2 + v + ex) ** 2) - (x - a) / tau ** 2
+
+        A = a.copy()
+        B = np.empty_like(a)
+        large = delta2 > phi2 + v
+        B[large] = np.log(delta2[large] - phi2[large] - v[large])
+        if (~large).any():
+            k = np.ones(len(a))
+            pending = ~large
+            while pending.any():
+                candidate = a - k * tau
+                pending = pending & (f(candidate) < 0)
+                k[pending] += 1
+            B[~large] = (a - k * tau)[~large]
+
+        fA = f(A)
+        fB = f(B)
+        pending = np.abs(B - A) > GLICKO_EPSILON
+        while pending.any():
+            C = A + (A - B) * fA / (fB - fA)
+            fC = f(C)
+            swap = pending & (fC * fB <= 0)
+            halve = pending & ~swap
+            A = np.where(swap, B, A)
+            fA = np.where(swap, fB, np.where(halve, fA / 2, fA))
+            B = np.where(pending, C, B)
+            fB = np.where(pending, fC, fB)
+            pending = pending & (np.abs(B - A) > GLICKO_EPSILON)
+        return np.exp(A / 2)
+
+
+class BradleyTerryEngine(RatingEngine):
+    """
+    Rating de historial completo: máxima verosimilitud de Bradley-Terry con
+    tablas (Davidson) sobre los resultados por par de jugadores. No depende
+    del orden de las partidas. Guarda la última solución para usarla como
+    punto de partida en el siguiente cálculo.
+    """
+    name = 'bradley_terry'
+
+    def __init__(self):
+        self.previous = {}
+        self.previous_nu = None
+
+    def rate(self, league, now=None):
+        n = len(league.names)
+        white, black, score, _ = rated_games(league)
+        pairs = pairwise_results(white, black, score, n)
+
+        warm_start = None
+        if self.previous:
+            warm_start = np.array([self.previous.get(name, 1.0) for name in league.names])
+        strength, nu, iterations = solve_davidson(*pairs, n, warm_start=warm_start, warm_nu=self.previous_nu)
+        self.previous = dict(zip(league.names, strength.tolist()))
+        self.previous_nu = nu
+
+        # Misma escala que el ELO: 400 puntos de diferencia = 10 veces la fuerza
+        rated = np.frombuffer(league.rated, dtype=np.int8).astype(bool) if n else np.zeros(0, dtype=bool)
+        initial = np.array(league.initial_ratings, dtype=np.float64)
+        base = initial[rated].mean() if rated.any() else 0.0
+        return {
+            'rating': base + 400 * np.log10(strength),
+            'strength': strength,
+            'draw_parameter': nu,
+            'iterations': iterations,
+        }
+
+
+def rated_games(league):
+    """Partidas entre jugadores con rating: (blancas, negras, puntos de blancas, fecha en microsegundos)"""
+    if not len(league):
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0), empty
+    white = np.frombuffer(league.white, dtype=np.int32).astype(np.int64)
+    black = np.frombuffer(league.black, dtype=np.int32).astype(np.int64)
+    rated = np.frombuffer(league.rated, dtype=np.int8).astype(bool)
+    keep = rated[white] & rated[black]
+    score = np.frombuffer(league.result, dtype=np.int8)[keep] / 2
+    played_at = np.frombuffer(league.played_at, dtype=np.int64)[keep]
+    return white[keep], black[keep], score, played_at
+
+
+def rated_penalties(league):
+    """
+    Penalizaciones semanales (ver app/utils/penalties.py): (jugador, partidas
+    de rated_games jugadas antes de aplicarla, puntos)
+    """
+    player = np.frombuffer(league.penalty_player, dtype=np.int32).astype(np.int64)
+    points = np.frombuffer(league.penalty_points, dtype=np.int32).astype(np.int64)
+    if not len(player):
+        return player, player, points
+    white = np.frombuffer(league.white, dtype=np.int32)
+    black = np.frombuffer(league.black, dtype=np.int32)
+    rated = np.frombuffer(league.rated, dtype=np.int8).astype(bool)
+    rated_before = np.concatenate(([0], np.cumsum(rated[white] & rated[black])))
+    position = rated_before[np.frombuffer(league.penalty_position, dtype=np.int32)]
+    return player, position, points
+
+
+def week_number(micros):
+    """Número de semana (de lunes a domingo) de una fecha en microsegundos desde EPOCH"""
+    # El 1970-01-01 fue jueves: se desplaza para que las semanas empiecen en lunes
+    return (micros // MICROS_PER_DAY + 3) // 7
+
+
+ENGINES = {
+    EloEngine.name: EloEngine,
+    Glicko2Engine.name: Glicko2Engine,
+    BradleyTerryEngine.name: BradleyTerryEngine,
+}
+
+# Sistema usado para ordenar la clasificación
+RATING_ENGINE = os.environ.get('RATING_ENGINE', EloEngine.name)
+
+
+def get_engine(name=None):
+    return ENGINES[name or RATING_ENGINE]()
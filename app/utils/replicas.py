@@ -0,0 +1,86 @@
+import logging
+import math
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Una réplica más atrasada que esto no recibe lecturas
+MAX_REPLICA_LAG_SECONDS = 5
+# Cada cuánto se vuelve a medir el retraso de la réplica
+LAG_CHECK_SECONDS = 2
+# Después de escribir, las lecturas de la sesión van al primario al menos este tiempo
+READ_YOUR_WRITES_SECONDS = 5
+
+# Segundos de retraso de la réplica: 0 si ya aplicó todo lo recibido, o si
+# la "réplica" es el mismo primario (pg_is_in_recovery() = false)
+LAG_QUERY = '''
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM NOW() - pg_last_xact_replay_timestamp()), 0)
+    END
+'''
+
+
+class ReplicaRouter:
+    """
+    Elige el pool de una lectura: la réplica, salvo que esté más atrasada
+    que `max_lag` o que la sesión haya escrito hace menos de `window`
+    segundos (o del retraso actual, si es mayor): así quien escribe lee lo
+    que escribió. Sin réplica, todo va al primario.
+    """
+
+    def __init__(self, primary, replica=None, max_lag=MAX_REPLICA_LAG_SECONDS, window=READ_YOUR_WRITES_SECONDS):
+        self.primary = primary
+        self.replica = replica
+        self.max_lag = max_lag
+        self.window = window
+        self.lock = threading.Lock()
+        self.measured_lag = None
+        self.checked_at = 0
+        self.routed = {'primary': 0, 'replica': 0}
+
+    def lag(self):
+        """Retraso de la réplica en segundos (infinito si no responde), medido cada LAG_CHECK_SECONDS"""
+        with self.lock:
+            if time.time() - self.checked_at < LAG_CHECK_SECONDS:
+                return self.measured_lag
+            # Una sola medición a la vez; las demás lecturas usan la anterior
+            self.checked_at = time.time()
+        try:
+            with self.replica.connection() as conn:
+                cur = conn.cursor()
+                cur.execute(LAG_QUERY)
+                lag = float(cur.fetchone()[0])
+                cur.close()
+        except Exception as e:
+            logger.error(f"Error midiendo el retraso de la réplica: {str(e)}")
+            lag = math.inf
+        with self.lock:
+            self.measured_lag = lag
+        return lag
+
+    def pool(self, wrote_at=None):
+        """Pool para una lectura; `wrote_at`: última escritura de la sesión (time.time())"""
+        target = 'primary'
+        if self.replica is not None:
+            lag = self.lag()
+            if lag is not None and lag <= self.max_lag:
+                if wrote_at is None or time.time() - wrote_at >= max(self.window, lag):
+                    target = 'replica'
+        with self.lock:
+            self.routed[target] += 1
+        return self.replica if target == 'replica' else self.primary
+
+    def metrics(self):
+        with self.lock:
+            lag = self.measured_lag
+            return {
+                'replica': self.replica is not None,
+                'lag_seconds': None if lag is None or math.isinf(lag) else round(lag, 3),
+                'replica_available': lag is not None and not math.isinf(lag),
+                'max_lag_seconds': self.max_lag,
+                'read_your_writes_seconds': self.window,
+                'routed': dict(self.routed),
+            }
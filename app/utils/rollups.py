@@ -0,0 +1,127 @@
+from bisect import bisect_left
+from datetime import datetime
+
+import numpy as np
+
+from app.utils.league import EPOCH, from_micros, to_micros
+from app.utils.penalties import WEEK, week_start
+
+# Resumen de cada jugador por semana y por mes (partidas, puntos, rating al
+# empezar y al terminar el periodo, puntos de penalización), para las tablas
+# de cada periodo sin recorrer el historial. rollup_state guarda hasta qué
+# generación de la liga están al día (ver update_rollups en app.py).
+ROLLUP_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS player_rollups (
+        league_id INTEGER NOT NULL REFERENCES leagues (id) ON DELETE CASCADE,
+        period TEXT NOT NULL,
+        period_start TIMESTAMP NOT NULL,
+        player_name TEXT NOT NULL,
+        games INTEGER NOT NULL,
+        score REAL NOT NULL,
+        rating_start INTEGER NOT NULL,
+        rating_end INTEGER NOT NULL,
+        penalties INTEGER NOT NULL,
+        PRIMARY KEY (league_id, period, period_start, player_name)
+    );
+    CREATE TABLE IF NOT EXISTS rollup_state (
+        league_id INTEGER PRIMARY KEY REFERENCES leagues (id) ON DELETE CASCADE,
+        generation BIGINT NOT NULL,
+        penalties INTEGER NOT NULL
+    );
+'''
+
+
+def month_start(date):
+    """Día 1 a las 00:00 del mes de `date`"""
+    return date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+PERIODS = {'week': week_start, 'month': month_start}
+
+
+def shift(period, start, count):
+    """Inicio del periodo `count` periodos después (o antes, si es negativo) del que empieza en `start`"""
+    if period == 'week':
+        return start + WEEK * count
+    months = start.year * 12 + start.month - 1 + count
+    return start.replace(year=months // 12, month=months % 12 + 1)
+
+
+def changed_since(league, generation, penalties):
+    """
+    Desde cuándo cambiaron los resúmenes respecto de los calculados en
+    `generation` con `penalties` penalizaciones: la partida más antigua
+    agregada después (una partida atrasada cambia los ratings siguientes)
+    o la primera penalización nueva. EPOCH si hay que recalcular todo y
+    None si no cambió nada.
+    """
+    if generation < 0 or penalties > len(league.penalty_at):
+        return EPOCH
+    since = None
+    added = np.flatnonzero(np.frombuffer(league.game_generation, dtype=np.int64) > generation)
+    if len(added):
+        since = int(np.frombuffer(league.played_at, dtype=np.int64)[added].min())
+    if len(league.penalty_at) > penalties:
+        # La penalización se aplica al terminar la semana y cuenta en ella
+        first = min(league.penalty_at[penalties:]) - 1
+        since = first if since is None else min(since, first)
+    return None if since is None else from_micros(since)
+
+
+def period_rollups(league, since=EPOCH):
+    """
+    Resúmenes de cada periodo que empieza desde el que contiene `since`
+    (por tipo de periodo), recorriendo el libro de ratings una vez desde
+    ahí. Devuelve [(periodo, inicio, jugador, partidas, puntos, rating
+    inicial, rating final, penalización)]. Las penalizaciones cuentan en la
+    semana penalizada (se aplican el lunes siguiente a las 00:00).
+    """
+    starts = {period: start_of(since) for period, start_of in PERIODS.items()}
+    scan_from = to_micros(min(starts.values()))
+    lo = bisect_left(league.ledger_at, scan_from)
+    first_penalty = bisect_left(league.penalty_at, scan_from)
+    penalty_points = {
+        (league.penalty_player[i], league.penalty_at[i]): league.penalty_points[i]
+        for i in range(first_penalty, len(league.penalty_at))
+    }
+
+    rows = {}
+    keys = {}  # día -> inicio de cada periodo (muchas entradas caen el mismo día)
+    for position in range(lo, len(league.ledger_at)):
+        player = league.ledger_player[position]
+        micros = league.ledger_at[position]
+        after = league.ledger_rating[position]
+        game = league.ledger_game[position]
+        if game >= 0:
+            white = league.white[game] == player
+            before = league.white_rating[game] if white else league.black_rating[game]
+            points = league.result[game] if white else 2 - league.result[game]
+            penalty = 0
+        else:
+            penalty = penalty_points.get((player, micros), 0)
+            before = after + penalty
+            micros -= 1
+        day = micros // 86400000000
+        period_keys = keys.get(day)
+        if period_keys is None:
+            date = from_micros(micros)
+            period_keys = keys[day] = [(period, start_of(date)) for period, start_of in PERIODS.items()]
+        for period, start in period_keys:
+            if start < starts[period]:
+                continue
+            row = rows.get((period, start, player))
+            if row is None:
+                row = rows[(period, start, player)] = [0, 0, before, after, 0]
+            row[3] = after
+            if game >= 0:
+                row[0] += 1
+                row[1] += points
+            else:
+                row[4] += penalty
+    return [(period, start, player, games, points / 2, rating_start, rating_end, penalty)
+            for (period, start, player), (games, points, rating_start, rating_end, penalty) in rows.items()]
+
+
+def parse_period_start(period, value, now=None):
+    """Inicio del periodo que contiene la fecha ISO `value` (por defecto, el actual); ValueError si es inválida"""
+    return PERIODS[period](datetime.fromisoformat(value) if value else now or datetime.now())
@@ -0,0 +1,195 @@
+from bisect import bisect_left
+from collections import Counter
+
+import numpy as np
+
+from app.utils.league import to_micros
+from app.utils.penalties import GAMES_PER_WEEK, WEEK
+
+# Calendario de la temporada: las partidas programadas de cada semana (se
+# cumplen al jugarse esa semana entre los mismos jugadores, con cualquier
+# color) y las semanas en que un jugador avisó que no puede jugar
+SCHEDULE_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS fixtures (
+        id SERIAL PRIMARY KEY,
+        league_id INTEGER NOT NULL REFERENCES leagues (id) ON DELETE CASCADE,
+        week_start TIMESTAMP NOT NULL,
+        white TEXT NOT NULL,
+        black TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS fixtures_league_week ON fixtures (league_id, week_start);
+    CREATE TABLE IF NOT EXISTS player_unavailability (
+        league_id INTEGER NOT NULL REFERENCES leagues (id) ON DELETE CASCADE,
+        player_name TEXT NOT NULL,
+        week_start TIMESTAMP NOT NULL,
+        PRIMARY KEY (league_id, player_name, week_start)
+    );
+'''
+
+DEFAULT_WEEKS = 12
+MAX_WEEKS = 52
+
+# Costo de un rival repetido en el calendario (frente a la diferencia de rating)
+REPEAT_COST = 1e6
+
+
+def berger_rounds(players):
+    """
+    Rondas de un todos contra todos según las tablas de Berger: el último
+    jugador queda fijo y el resto rota; el fijo alterna color cada ronda y en
+    los demás tableros juega con blancas el de la primera mitad. Con número
+    impar se agrega un descanso (None), que se omite de los pares.
+    """
+    players = list(players)
+    if len(players) % 2:
+        players.append(None)
+    n = len(players)
+    fixed, rotating = players[-1], players[:-1]
+    rounds = []
+    for round_number in range(n - 1):
+        pairs = [(fixed, rotating[0]) if round_number % 2 else (rotating[0], fixed)]
+        pairs += [(rotating[i], rotating[n - 1 - i]) for i in range(1, n // 2)]
+        rounds.append([(white, black) for white, black in pairs if white is not None and black is not None])
+        # Berger: cada ronda avanza n/2 posiciones
+        rotating = rotating[n // 2:] + rotating[:n // 2]
+    return rounds
+
+
+def round_robin_schedule(players, weeks, unavailable, games_per_week=GAMES_PER_WEEK):
+    """
+    Todos contra todos repartido en semanas de `games_per_week` rondas. Una
+    partida con un jugador no disponible esa semana pasa a la primera semana
+    siguiente en que ambos pueden y aún tienen cupo.
+    `unavailable`: semana -> nombres no disponibles. Devuelve una lista de
+    pares (blancas, negras) por semana; lo que no cabe en `weeks` se omite.
+    """
+    schedule = [[] for _ in range(weeks)]
+    load = [dict() for _ in range(weeks)]
+    pending = []
+    for index, pairs in enumerate(berger_rounds(players)):
+        pending.extend((index // games_per_week, white, black) for white, black in pairs)
+    for earliest, white, black in pending:
+        for week in range(earliest, weeks):
+            blocked = unavailable.get(week, ())
+            if white in blocked or black in blocked:
+                continue
+            if load[week].get(white, 0) >= games_per_week or load[week].get(black, 0) >= games_per_week:
+                continue
+            schedule[week].append((white, black))
+            load[week][white] = load[week].get(white, 0) + 1
+            load[week][black] = load[week].get(black, 0) + 1
+            break
+    return schedule
+
+
+def quota_schedule(players, ratings, weeks, unavailable, games_per_week=GAMES_PER_WEEK):
+    """
+    Calendario por restricciones para grupos grandes: cada semana son
+    `games_per_week` rondas entre los disponibles. En cada ronda, de a uno
+    (primero los que más debe blancas o negras), cada jugador toma al rival
+    libre con menos enfrentamientos en la temporada y el rating más
+    cercano; si al final de la ronda quedan rivales repetidos, se
+    intercambian con otro tablero. El color lo lleva quien más lo necesita.
+    Con número impar descansa el que menos ha descansado.
+    """
+    n = len(players)
+    ratings = np.asarray(ratings, dtype=np.float64)
+    faced = np.zeros((n, n), dtype=np.int32)
+    balance = np.zeros(n, dtype=np.int32)  # blancas - negras en el calendario
+    rests = np.zeros(n, dtype=np.int32)
+    position = {name: i for i, name in enumerate(players)}
+    schedule = []
+    for week in range(weeks):
+        available = np.ones(n, dtype=bool)
+        for name in unavailable.get(week, ()):
+            if name in position:
+                available[position[name]] = False
+        pairs = []
+        for _ in range(games_per_week):
+            boards = []
+            free = available.copy()
+            candidates = np.flatnonzero(free)
+            if len(candidates) % 2:
+                resting = candidates[np.lexsort((ratings[candidates], rests[candidates]))[0]]
+                rests[resting] += 1
+                free[resting] = False
+            order = np.flatnonzero(free)
+            order = order[np.argsort(-np.abs(balance[order]), kind='stable')]
+            for player in order:
+                if not free[player]:
+                    continue
+                free[player] = False
+                cost = faced[player] * REPEAT_COST + np.abs(ratings - ratings[player])
+                cost[~free] = np.inf
+                opponent = int(np.argmin(cost))
+                if not np.isfinite(cost[opponent]):
+                    free[player] = True
+                    continue
+                free[opponent] = False
+                faced[player, opponent] += 1
+                faced[opponent, player] += 1
+                boards.append((player, opponent))
+            _untangle(boards, faced)
+            for player, opponent in boards:
+                white, black = (player, opponent) if balance[player] <= balance[opponent] else (opponent, player)
+                balance[white] += 1
+                balance[black] -= 1
+                pairs.append((players[white], players[black]))
+        schedule.append(pairs)
+    return schedule
+
+
+def _untangle(boards, faced):
+    """Cambia rivales entre tableros para quitar los repetidos de una ronda (`faced` ya los incluye)"""
+    for k, (a, b) in enumerate(boards):
+        if faced[a, b] <= 1:
+            continue
+        for j, (c, d) in enumerate(boards):
+            if j == k:
+                continue
+            for x, y in ((c, d), (d, c)):
+                if faced[a, x] == 0 and faced[b, y] == 0:
+                    for p, q, change in ((a, b, -1), (c, d, -1), (a, x, 1), (b, y, 1)):
+                        faced[p, q] += change
+                        faced[q, p] += change
+                    boards[k], boards[j] = (a, x), (b, y)
+                    break
+            else:
+                continue
+            break
+
+
+def season_schedule(players, ratings, weeks, unavailable, games_per_week=GAMES_PER_WEEK):
+    """
+    Calendario de `weeks` semanas: todos contra todos (Berger) si cabe en la
+    temporada, si no el calendario por cupo semanal. Devuelve el método
+    ('round_robin' o 'quota') y los pares de cada semana.
+    """
+    if len(players) - 1 <= weeks * games_per_week:
+        return 'round_robin', round_robin_schedule(players, weeks, unavailable, games_per_week)
+    return 'quota', quota_schedule(players, ratings, weeks, unavailable, games_per_week)
+
+
+def played_pairs(league, start, end):
+    """Partidas de cada par (sin orden) entre `start` y `end` (sin incluirlo)"""
+    lo = bisect_left(league.played_at, to_micros(start))
+    hi = bisect_left(league.played_at, to_micros(end))
+    return Counter(frozenset((league.names[league.white[game]], league.names[league.black[game]]))
+                   for game in range(lo, hi))
+
+
+def pending_fixtures(league, fixtures):
+    """
+    Para cada partida programada, si aún no se juega en su semana (cada
+    partida jugada cumple una programada del mismo par, con cualquier
+    color). `fixtures` son (semana, blancas, negras).
+    """
+    played = {}
+    pending = []
+    for week_start, white, black in fixtures:
+        if week_start not in played:
+            played[week_start] = played_pairs(league, week_start, week_start + WEEK)
+        pair = frozenset((white, black))
+        pending.append(played[week_start][pair] <= 0)
+        played[week_start][pair] -= 1
+    return pending
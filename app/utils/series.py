@@ -0,0 +1,63 @@
+from app.utils.league import DATE_FORMAT, MICROS_PER_DAY, from_micros
+
+
+def lttb(xs, ys, threshold):
+    """
+    Largest-Triangle-Three-Buckets: índices de los puntos a conservar para que
+    la serie tenga como máximo `threshold` puntos manteniendo su forma.
+    """
+    n = len(xs)
+    if threshold >= n:
+        return list(range(n))
+    if threshold < 3:
+        return [0, n - 1][:max(threshold, 0)]
+
+    selected = [0]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+    for bucket in range(threshold - 2):
+        # Promedio del siguiente bucket (el último punto para el último bucket)
+        next_start = int((bucket + 1) * bucket_size) + 1
+        next_end = min(int((bucket + 2) * bucket_size) + 1, n)
+        if next_start >= next_end:
+            next_start, next_end = n - 1, n
+        count = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / count
+        avg_y = sum(ys[next_start:next_end]) / count
+
+        # Punto del bucket actual que forma el triángulo más grande
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        ax, ay = xs[a], ys[a]
+        best, best_area = start, -1.0
+        for i in range(start, end):
+            area = abs((ax - avg_x) * (ys[i] - ay) - (ax - xs[i]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = i, area
+        selected.append(best)
+        a = best
+
+    selected.append(n - 1)
+    return selected
+
+
+def daily_last(xs):
+    """Índices del último punto de cada día"""
+    selected = []
+    for i in range(len(xs)):
+        if i + 1 == len(xs) or xs[i + 1] // MICROS_PER_DAY != xs[i] // MICROS_PER_DAY:
+            selected.append(i)
+    return selected
+
+
+def downsample(xs, ys, points=None, mode='lttb'):
+    """Reduce la serie a lo más `points` puntos y la devuelve como pares [fecha, rating]"""
+    if mode == 'daily':
+        indices = daily_last(xs)
+        if points and len(indices) > points:
+            indices = [indices[i] for i in lttb([xs[i] for i in indices], [ys[i] for i in indices], points)]
+    elif points and len(xs) > points:
+        indices = lttb(xs, ys, points)
+    else:
+        indices = range(len(xs))
+    return [[from_micros(xs[i]).strftime(DATE_FORMAT), ys[i]] for i in indices]
@@ -0,0 +1,51 @@
+import json
+import os
+import tempfile
+from datetime import datetime
+
+# Archivo con la generación y fecha de la última publicación
+MANIFEST = 'snapshot.json'
+
+
+def write_atomic(path, data):
+    """Escribe el archivo completo o nada: los lectores nunca ven un archivo a medias"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+def published_generation(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST), 'r', encoding='utf-8') as f:
+            return json.load(f).get('generation')
+    except (OSError, ValueError):
+        return None
+
+
+def publish(out_dir, generation, files):
+    """
+    Escribe los archivos de una generación (ruta relativa -> bytes) en `out_dir`.
+    Si ya hay publicada una generación más nueva no se sobrescribe.
+    Devuelve True si se publicó.
+    """
+    current = published_generation(out_dir)
+    if current is not None and generation is not None and current > generation:
+        return False
+
+    for relative_path, data in files.items():
+        write_atomic(os.path.join(out_dir, relative_path), data)
+    manifest = {
+        'generation': generation,
+        'published_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'files': sorted(files),
+    }
+    write_atomic(os.path.join(out_dir, MANIFEST), json.dumps(manifest, indent=2).encode('utf-8'))
+    return True
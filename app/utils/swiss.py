@@ -0,0 +1,304 @@
+import numpy as np
+
+# Torneos suizos dentro de una liga: los jugadores inscritos con su rating
+# al crear el torneo (la siembra), los pareos de cada ronda (black NULL =
+# descanso, result NULL = pendiente) y la clasificación con desempates al
+# cerrar cada ronda
+TOURNAMENT_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS tournaments (
+        id SERIAL PRIMARY KEY,
+        league_id INTEGER NOT NULL REFERENCES leagues (id) ON DELETE CASCADE,
+        name TEXT NOT NULL,
+        rounds INTEGER NOT NULL,
+        created_at TIMESTAMP NOT NULL DEFAULT NOW()
+    );
+    CREATE TABLE IF NOT EXISTS tournament_players (
+        tournament_id INTEGER NOT NULL REFERENCES tournaments (id) ON DELETE CASCADE,
+        player_name TEXT NOT NULL,
+        seed INTEGER NOT NULL,
+        rating INTEGER NOT NULL,
+        PRIMARY KEY (tournament_id, player_name)
+    );
+    CREATE TABLE IF NOT EXISTS tournament_pairings (
+        tournament_id INTEGER NOT NULL REFERENCES tournaments (id) ON DELETE CASCADE,
+        round INTEGER NOT NULL,
+        board INTEGER NOT NULL,
+        white TEXT NOT NULL,
+        black TEXT,
+        result REAL,
+        PRIMARY KEY (tournament_id, round, board)
+    );
+    CREATE TABLE IF NOT EXISTS tournament_standings (
+        tournament_id INTEGER NOT NULL REFERENCES tournaments (id) ON DELETE CASCADE,
+        round INTEGER NOT NULL,
+        player_name TEXT NOT NULL,
+        points REAL NOT NULL,
+        buchholz REAL NOT NULL,
+        sonneborn_berger REAL NOT NULL,
+        PRIMARY KEY (tournament_id, round, player_name)
+    );
+'''
+
+# Puntos del descanso (el que queda sin rival en una ronda impar)
+BYE_POINTS = 1.0
+
+# Costos del pareo: repetir rival solo si no queda otra, luego evitar un
+# tercer color seguido (o diferencia de colores mayor a 2), luego las
+# preferencias leves; el resto es la distancia al pareo ideal del grupo
+# (el 1º de la mitad alta contra el 1º de la mitad baja)
+REMATCH_COST = 1e6
+ABSOLUTE_COLOR_COST = 1e4
+COLOR_COST = 10
+# Intentos de la búsqueda de un pareo sin repetir cuando falla el de los grupos
+SEARCH_LIMIT = 100000
+
+
+class SwissPlayer:
+    """Estado de un jugador antes de parear una ronda"""
+    __slots__ = ('name', 'rating', 'points', 'colors', 'opponents', 'had_bye')
+
+    def __init__(self, name, rating, points=0.0, colors='', opponents=(), had_bye=False):
+        self.name = name
+        self.rating = rating
+        self.points = points
+        self.colors = colors  # 'W' o 'B' por cada partida jugada, en orden
+        self.opponents = set(opponents)
+        self.had_bye = had_bye
+
+    def color_preference(self):
+        """('W' o 'B' o None, si es absoluta)"""
+        difference = self.colors.count('W') - self.colors.count('B')
+        if difference > 0 or self.colors[-2:] == 'WW':
+            return 'B', difference >= 2 or self.colors[-2:] == 'WW'
+        if difference < 0 or self.colors[-2:] == 'BB':
+            return 'W', difference <= -2 or self.colors[-2:] == 'BB'
+        if self.colors:
+            return ('B' if self.colors[-1] == 'W' else 'W'), False
+        return None, False
+
+
+def assignment(cost):
+    """
+    Asignación de costo mínimo de una matriz cuadrada (método húngaro con
+    potenciales, O(n³)): columna asignada a cada fila. Cada paso recorre
+    las columnas con numpy, así un grupo de cientos de jugadores se resuelve
+    en milisegundos.
+    """
+    n = len(cost)
+    u = np.zeros(n + 1)
+    v = np.zeros(n + 1)
+    # row_of[j]: fila (desde 1) asignada a la columna j; la columna 0 es auxiliar
+    row_of = np.zeros(n + 1, dtype=np.int64)
+    way = np.zeros(n + 1, dtype=np.int64)
+    padded = np.empty(n + 1)
+    padded[0] = np.inf
+    for row in range(1, n + 1):
+        row_of[0] = row
+        column = 0
+        minv = np.full(n + 1, np.inf)
+        used = np.zeros(n + 1, dtype=bool)
+        while True:
+            used[column] = True
+            current = row_of[column]
+            padded[1:] = cost[current - 1] - u[current] - v[1:]
+            free = ~used
+            improved = free & (padded < minv)
+            minv[improved] = padded[improved]
+            way[improved] = column
+            candidates = np.where(free, minv, np.inf)
+            nearest = int(np.argmin(candidates))
+            delta = candidates[nearest]
+            u[row_of[used]] += delta
+            v[used] -= delta
+            minv[free] -= delta
+            column = nearest
+            if row_of[column] == 0:
+                break
+        while column:
+            previous = way[column]
+            row_of[column] = row_of[previous]
+            column = previous
+    result = np.empty(n, dtype=np.int64)
+    result[row_of[1:] - 1] = np.arange(n)
+    return result
+
+
+def _pair_cost(top, bottom):
+    """Matriz de costos entre la mitad alta y la mitad baja de un grupo"""
+    size = len(top)
+    cost = np.abs(np.subtract.outer(np.arange(size), np.arange(size))).astype(np.float64)
+    top_colors = [player.color_preference() for player in top]
+    bottom_colors = [player.color_preference() for player in bottom]
+    for i, player in enumerate(top):
+        for j, opponent in enumerate(bottom):
+            if opponent.name in player.opponents:
+                cost[i, j] += REMATCH_COST
+            (color, absolute), (other, other_absolute) = top_colors[i], bottom_colors[j]
+            if color is not None and color == other:
+                cost[i, j] += ABSOLUTE_COLOR_COST if absolute and other_absolute else COLOR_COST
+    return cost
+
+
+def _pair_group(group):
+    """
+    Parea un grupo par (ordenado por puntos y rating): la mitad alta contra
+    la mitad baja como una asignación de costo mínimo. Devuelve los pares y
+    los que quedaron con un rival repetido.
+    """
+    half = len(group) // 2
+    top, bottom = group[:half], group[half:]
+    cost = _pair_cost(top, bottom)
+    columns = assignment(cost)
+    pairs = [(top[i], bottom[j]) for i, j in enumerate(columns)]
+    repeated = [pair for (i, j), pair in zip(enumerate(columns), pairs) if cost[i, j] >= REMATCH_COST]
+    return pairs, repeated
+
+
+def _search_pairs(group, limit=SEARCH_LIMIT):
+    """
+    Pareo completo sin rivales repetidos por búsqueda con retroceso (cada
+    jugador, de arriba hacia abajo, con el rival libre más cercano en la
+    clasificación), o None si no existe o se agotan `limit` intentos
+    """
+    free = list(range(len(group)))
+    pairs = []
+    steps = [0]
+
+    def search():
+        if not free:
+            return True
+        first = free.pop(0)
+        for position, second in enumerate(free):
+            steps[0] += 1
+            if steps[0] > limit:
+                break
+            if group[second].name in group[first].opponents:
+                continue
+            free.pop(position)
+            pairs.append((group[first], group[second]))
+            if search():
+                return True
+            pairs.pop()
+            free.insert(position, second)
+        free.insert(0, first)
+        return False
+
+    return pairs if search() else None
+
+
+def _colors(first, second, board):
+    """(blancas, negras) de un par; `first` es el mejor clasificado"""
+    color, absolute = first.color_preference()
+    other, other_absolute = second.color_preference()
+    if color is None and other is None:
+        # Primera ronda: el mejor clasificado alterna el color por tablero
+        return (first, second) if board % 2 == 1 else (second, first)
+    if color is None or (color == other and other_absolute and not absolute):
+        color = 'B' if other == 'W' else 'W'
+    return (first, second) if color == 'W' else (second, first)
+
+
+def pair_round(players):
+    """
+    Pareo de una ronda suiza de `players` (SwissPlayer). Los grupos de
+    puntaje se parean de arriba hacia abajo; el que sobra de un grupo impar
+    o no tiene rival nuevo baja al siguiente, y si el último grupo no se
+    puede parear se une con el anterior. Con número impar descansa el de
+    menor clasificación que aún no haya descansado.
+    Devuelve ([(blancas, negras)] por tablero, nombre del que descansa o None).
+    """
+    ranked = sorted(players, key=lambda p: (-p.points, -p.rating, p.name))
+    bye = None
+    if len(ranked) % 2:
+        bye = next((p for p in reversed(ranked) if not p.had_bye), ranked[-1])
+        ranked.remove(bye)
+
+    groups = []
+    for player in ranked:
+        if groups and groups[-1][0].points == player.points:
+            groups[-1].append(player)
+        else:
+            groups.append([player])
+
+    paired = []  # (miembros del grupo, pares) de cada grupo ya pareado
+    carry = []
+    index = 0
+    while index < len(groups) or carry:
+        last = index >= len(groups) - 1
+        group = carry + (groups[index] if index < len(groups) else [])
+        index += 1
+        carry = []
+        if not last and len(group) % 2:
+            carry.append(group.pop())
+        while group:
+            pairs, repeated = _pair_group(group)
+            if not repeated:
+                break
+            if not last:
+                # Los que repetirían rival bajan al grupo siguiente
+                floated = {player.name for pair in repeated for player in pair}
+                carry = [player for player in group if player.name in floated] + carry
+                group = [player for player in group if player.name not in floated]
+                continue
+            if not paired:
+                # Todo el torneo en un grupo: las mitades pueden ser la
+                # restricción; se busca cualquier pareo sin repetir rival
+                pairs = _search_pairs(group) or pairs
+                break
+            # Último grupo imposible: se vuelve a parear junto con el anterior
+            members, _ = paired.pop()
+            group = members + group
+        else:
+            pairs = []
+        if group:
+            paired.append((group, pairs))
+
+    boards = []
+    for _, pairs in paired:
+        for first, second in pairs:
+            white, black = _colors(first, second, len(boards) + 1)
+            boards.append((white.name, black.name))
+    return boards, bye.name if bye else None
+
+
+def round_standings(previous, history, results):
+    """
+    Clasificación al cerrar una ronda a partir de la anterior, sin recorrer
+    todo el torneo: el Buchholz (suma de los puntos de los rivales) y el
+    Sonneborn-Berger (puntos de los rivales ponderados por el resultado
+    contra cada uno) suben con lo que sumó cada rival anterior en la ronda
+    más lo del rival nuevo.
+    previous: nombre -> (puntos, buchholz, sonneborn_berger) tras la ronda anterior
+    history: nombre -> [(rival, puntos obtenidos)] de las rondas anteriores
+    results: [(blancas, negras o None si es descanso, resultado de blancas)]
+    Devuelve la nueva clasificación con la misma forma que `previous`.
+    """
+    gained = {name: 0.0 for name in previous}
+    played = {}
+    for white, black, result in results:
+        if black is None:
+            gained[white] += BYE_POINTS
+            continue
+        gained[white] += result
+        gained[black] += 1 - result
+        played[white] = (black, result)
+        played[black] = (white, 1 - result)
+    points = {name: previous[name][0] + gained[name] for name in previous}
+
+    standings = {}
+    for name, (old_points, buchholz, sonneborn_berger) in previous.items():
+        for opponent, score in history.get(name, ()):
+            buchholz += gained[opponent]
+            sonneborn_berger += score * gained[opponent]
+        if name in played:
+            opponent, score = played[name]
+            buchholz += points[opponent]
+            sonneborn_berger += score * points[opponent]
+        standings[name] = (points[name], buchholz, sonneborn_berger)
+    return standings
+
+
+def ranking(standings, seeds):
+    """Nombres ordenados por puntos, Buchholz, Sonneborn-Berger y siembra"""
+    return sorted(standings, key=lambda name: (-standings[name][0], -standings[name][1],
+                                              -standings[name][2], seeds[name]))
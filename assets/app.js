@@ -0,0 +1,472 @@
+// Datos de la página en PAGE (ver templates/partials/scripts.html):
+// players, currentPlayer, generation y league (slug de la liga)
+
+// Theme switch functionality
+document.addEventListener('DOMContentLoaded', function() {
+    const themeSwitch = document.getElementById('themeSwitch');
+    const body = document.body;
+
+    // Check for saved theme preference
+    const darkMode = localStorage.getItem('darkMode') === 'true';
+    themeSwitch.checked = darkMode;
+    body.classList.toggle('dark-mode', darkMode);
+
+    // Theme switch handler
+    themeSwitch.addEventListener('change', function() {
+        body.classList.toggle('dark-mode');
+        localStorage.setItem('darkMode', this.checked);
+    });
+});
+
+// Jugadores de la clasificación (se actualizan con los eventos en vivo)
+const leaguePlayers = PAGE.players;
+
+// Fila del historial de partidas (white/black: nombres para mostrar)
+const eloChange = (change) => change > 0
+    ? `<span class="elo-change elo-up">+${change}</span>`
+    : change < 0 ? `<span class="elo-change elo-down">${change}</span>` : '';
+
+const escapeHtml = (text) => String(text).replace(/[&<>"']/g,
+    c => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c]));
+
+function buildGameRow(game) {
+    let result = '½';
+    if (game.result === 1) {
+        result = `<div class="d-flex justify-content-center align-items-center" style="width: 80px; margin: 0 auto;">
+            <i class="fas fa-crown text-warning"></i><i class="fas fa-chess-pawn text-white-piece mx-2"></i><i class="fas fa-fw invisible"></i></div>`;
+    } else if (game.result === 0) {
+        result = `<div class="d-flex justify-content-center align-items-center" style="width: 80px; margin: 0 auto;">
+            <i class="fas fa-fw invisible"></i><i class="fas fa-chess-pawn text-black-piece mx-2"></i><i class="fas fa-crown text-warning"></i></div>`;
+    }
+    const row = document.createElement('tr');
+    row.dataset.date = game.date;
+    row.innerHTML = `
+        <td>${escapeHtml(game.white)}</td>
+        <td>${game.white_rating} ${eloChange(game.white_change)}</td>
+        <td class="text-center">${result}</td>
+        <td>${game.black_rating} ${eloChange(game.black_change)}</td>
+        <td>${escapeHtml(game.black)}</td>
+        <td>${game.date}</td>
+        <td>${game.has_lettuce_factor ? '<span title="El Lechuga era espectador" style="cursor: help;">🥬</span>' : ''}</td>`;
+    return row;
+}
+
+// Crear una única instancia del modal
+const suggestModal = new bootstrap.Modal(document.getElementById('suggestGameModal'));
+
+// Variable para rastrear el modo de sugerencia
+let isSuggestForMe = false;
+
+// Random game suggestion
+function suggestRandomGame() {
+    isSuggestForMe = false;
+    const players = leaguePlayers;
+    if (players.length < 2) return;
+
+    // Función para calcular la diferencia de rating
+    const ratingDiff = (p1, p2) => Math.abs(p1.rating - p2.rating);
+
+    // Función para calcular el score de compatibilidad
+    const getMatchScore = (p1, p2) => {
+        const GAMES_NEEDED = 3;
+
+        // Priorizar jugadores que no han jugado entre sí recientemente
+        const notPlayedScore = 1;
+
+        // Priorizar jugadores que necesitan partidas
+        const gamesNeededScore = (
+            (GAMES_NEEDED - p1.games_this_week) + 
+            (GAMES_NEEDED - p2.games_this_week)
+        ) / (GAMES_NEEDED * 2);
+
+        return (notPlayedScore * 0.3) + (gamesNeededScore * 0.7);
+    };
+
+    // Generar todas las posibles parejas y ordenarlas por score
+    let pairs = [];
+    for (let i = 0; i < players.length; i++) {
+        for (let j = i + 1; j < players.length; j++) {
+            pairs.push({
+                white: players[i],
+                black: players[j],
+                score: getMatchScore(players[i], players[j])
+            });
+        }
+    }
+
+    // Ordenar parejas por score y tomar una de las mejores aleatoriamente
+    pairs.sort((a, b) => b.score - a.score);
+    const topPairs = pairs.slice(0, 3);
+    const selectedPair = topPairs[Math.floor(Math.random() * topPairs.length)];
+
+    // 50% de probabilidad de intercambiar colores
+    let player1 = selectedPair.white;
+    let player2 = selectedPair.black;
+    if (Math.random() < 0.5) {
+        [player1, player2] = [player2, player1];
+    }
+
+    // Asegurarnos de que los elementos existen antes de modificarlos
+    const whitePlayerElement = document.getElementById('whitePlayer');
+    const blackPlayerElement = document.getElementById('blackPlayer');
+    const whitePlayerIdElement = document.getElementById('whitePlayerId');
+    const blackPlayerIdElement = document.getElementById('blackPlayerId');
+    const matchInfoElement = document.getElementById('matchInfo');
+
+    if (!whitePlayerElement || !blackPlayerElement || !whitePlayerIdElement || 
+        !blackPlayerIdElement || !matchInfoElement) {
+        return;
+    }
+
+    whitePlayerElement.textContent = player1.display_name;
+    blackPlayerElement.textContent = player2.display_name;
+    whitePlayerIdElement.value = player1.id;
+    blackPlayerIdElement.value = player2.id;
+
+    // Mostrar información adicional sobre la sugerencia
+    const ratingDifference = Math.abs(player1.rating - player2.rating);
+    matchInfoElement.innerHTML = `
+        <small class="text-muted">
+            Diferencia de ELO: ${ratingDifference} puntos<br>
+            Partidas esta semana: ${player1.games_this_week}/3 vs ${player2.games_this_week}/3
+        </small>
+    `;
+
+    suggestModal.show();
+}
+
+// Conectar el botón "Jugar" con el modal de crear juego
+document.getElementById('suggestGameBtn').addEventListener('click', function() {
+    const whiteId = document.getElementById('whitePlayerId').value;
+    const blackId = document.getElementById('blackPlayerId').value;
+    const whiteName = document.getElementById('whitePlayer').textContent;
+    const blackName = document.getElementById('blackPlayer').textContent;
+
+    // Cerrar modal de sugerencia
+    bootstrap.Modal.getInstance(document.getElementById('suggestGameModal')).hide();
+
+    // Abrir modal de crear juego con los jugadores preseleccionados
+    setPlayerSearch(document.querySelector('#addGameModal input[name="white"]').closest('.player-search'), whiteId, whiteName);
+    setPlayerSearch(document.querySelector('#addGameModal input[name="black"]').closest('.player-search'), blackId, blackName);
+
+    const addGameModal = new bootstrap.Modal(document.getElementById('addGameModal'));
+    addGameModal.show();
+});
+
+// Función para sugerir partida para el usuario actual
+function suggestGameForMe() {
+    isSuggestForMe = true;
+    const players = leaguePlayers;
+    const currentPlayer = PAGE.currentPlayer;
+    if (players.length < 2) return;
+
+    // Encontrar el jugador actual en la lista
+    const me = players.find(p => p.name === currentPlayer);
+    if (!me) return;
+
+    // Filtrar jugadores excluyéndome
+    const otherPlayers = players.filter(p => p.name !== currentPlayer);
+
+    // Función para calcular el score de compatibilidad
+    const getMatchScore = (opponent) => {
+        const GAMES_NEEDED = 3;
+
+        // Priorizar jugadores que no han jugado entre sí recientemente
+        const notPlayedScore = 1;
+
+        // Priorizar jugadores que necesitan partidas
+        const gamesNeededScore = (
+            (GAMES_NEEDED - me.games_this_week) + 
+            (GAMES_NEEDED - opponent.games_this_week)
+        ) / (GAMES_NEEDED * 2);
+
+        // Dar más peso a la necesidad de partidas
+        return (notPlayedScore * 0.3) + (gamesNeededScore * 0.7);
+    };
+
+    // Calcular scores para todos los oponentes posibles
+    const opponents = otherPlayers.map(opponent => ({
+        player: opponent,
+        score: getMatchScore(opponent)
+    }));
+
+    // Ordenar por score y tomar uno de los mejores
+    opponents.sort((a, b) => b.score - a.score);
+    const topOpponents = opponents.slice(0, 3);
+    const selected = topOpponents[Math.floor(Math.random() * topOpponents.length)];
+
+    // 50% de probabilidad de que yo juegue con blancas
+    let player1 = Math.random() < 0.5 ? me : selected.player;
+    let player2 = player1 === me ? selected.player : me;
+
+    // Mostrar en el modal
+    const whitePlayerElement = document.getElementById('whitePlayer');
+    const blackPlayerElement = document.getElementById('blackPlayer');
+    const whitePlayerIdElement = document.getElementById('whitePlayerId');
+    const blackPlayerIdElement = document.getElementById('blackPlayerId');
+    const matchInfoElement = document.getElementById('matchInfo');
+
+    whitePlayerElement.textContent = player1.display_name;
+    blackPlayerElement.textContent = player2.display_name;
+    whitePlayerIdElement.value = player1.id;
+    blackPlayerIdElement.value = player2.id;
+
+    const ratingDifference = Math.abs(player1.rating - player2.rating);
+    matchInfoElement.innerHTML = `
+        <small class="text-muted">
+            Diferencia de ELO: ${ratingDifference} puntos<br>
+            Partidas esta semana: ${player1.games_this_week}/3 vs ${player2.games_this_week}/3
+        </small>
+    `;
+
+    suggestModal.show();
+}
+
+// Manejar el botón de "Otra partida"
+document.getElementById('anotherGameBtn').addEventListener('click', function() {
+    // Llamar a la función correspondiente
+    if (isSuggestForMe) {
+        suggestGameForMe();
+    } else {
+        suggestRandomGame();
+    }
+});
+
+// Limpiar estado de botones cuando se cierra el modal
+document.getElementById('suggestGameModal').addEventListener('hidden.bs.modal', function () {
+    document.querySelectorAll('.suggest-game-btn').forEach(btn => btn.classList.remove('active'));
+    isSuggestForMe = false;  // Resetear el modo al cerrar
+});
+
+// Actualizaciones en vivo: aplica los cambios de /events sobre las tablas sin recargar
+(function() {
+    if (!window.EventSource) return;
+    let generation = PAGE.generation;
+    const source = new EventSource('/events' + (generation !== null ? '?since=' + generation : ''));
+
+    const medals = {1: ['gold-medal', '🥇'], 2: ['silver-medal', '🥈'], 3: ['bronze-medal', '🥉']};
+
+    function setWinrate(row, color, winrate, games) {
+        const span = row.querySelector(`.${color}-winrate`);
+        if (!span) return;
+        span.classList.toggle('text-success', winrate >= 55);
+        span.classList.toggle('text-danger', winrate < 45);
+        span.innerHTML = `${winrate}%<small> (${games})</small>`;
+    }
+
+    function patchPlayer(row, player) {
+        const cached = leaguePlayers.find(p => p.id === player.id);
+        if (cached) {
+            cached.rating = player.rating;
+            cached.games_this_week = player.games_this_week;
+        }
+        row.querySelector('.player-rating').textContent = player.rating;
+        row.querySelector('.weekly-games').textContent = `${player.games_this_week}/3`;
+        if (!player.warning) {
+            row.querySelectorAll('.weekly-warning').forEach(el => el.remove());
+        }
+        if ('white_winrate' in player) setWinrate(row, 'white', player.white_winrate, player.white_games);
+        if ('black_winrate' in player) setWinrate(row, 'black', player.black_winrate, player.black_games);
+    }
+
+    function reorder(body, ranks) {
+        // Las filas que no cambian de posición conservan la suya
+        const rows = Array.from(body.querySelectorAll('tr[data-player-id]'));
+        const moved = new Map(ranks.map(r => [String(r.id), r.to]));
+        const order = new Array(rows.length);
+        rows.forEach((row, i) => {
+            const id = row.dataset.playerId;
+            order[(moved.has(id) ? moved.get(id) : i + 1) - 1] = row;
+        });
+        if (order.some(row => !row)) return false;
+
+        order.forEach((row, i) => {
+            const rank = i + 1;
+            body.appendChild(row);
+            row.cells[0].textContent = rank;
+            // La probabilidad de la posición anterior ya no corresponde
+            row.cells[0].removeAttribute('title');
+            row.classList.remove('gold-medal', 'silver-medal', 'bronze-medal', 'last-place');
+            row.querySelectorAll('.medal-icon, .last-place-icon').forEach(el => el.remove());
+            const nameCell = row.cells[1];
+            let icon = null;
+            if (medals[rank]) {
+                row.classList.add(medals[rank][0]);
+                icon = document.createElement('span');
+                icon.className = 'medal-icon';
+                icon.textContent = medals[rank][1];
+            } else if (rank === order.length) {
+                row.classList.add('last-place');
+                icon = document.createElement('span');
+                icon.className = 'last-place-icon';
+                icon.textContent = '🚩';
+            }
+            if (icon) nameCell.insertBefore(icon, nameCell.querySelector('.weekly-warning'));
+        });
+        return true;
+    }
+
+    source.addEventListener('game', function(e) {
+        const data = JSON.parse(e.data);
+        if (generation !== null && data.generation <= generation) return;
+        // Si se perdió algún evento intermedio, la única opción segura es recargar
+        if (generation === null || data.generation !== generation + 1) {
+            window.location.reload();
+            return;
+        }
+        const rankings = document.getElementById('rankingsBody');
+        const games = document.getElementById('gamesBody');
+        const rows = data.players.map(p => rankings && rankings.querySelector(`tr[data-player-id="${p.id}"]`));
+        if (!rankings || !games || rows.some(row => !row)) {
+            window.location.reload();
+            return;
+        }
+        data.players.forEach((player, i) => patchPlayer(rows[i], player));
+        if (!reorder(rankings, data.ranks)) {
+            window.location.reload();
+            return;
+        }
+        games.insertBefore(buildGameRow(data.game), games.firstChild);
+        generation = data.generation;
+        LeagueCache.refresh();
+    });
+
+    source.addEventListener('reload', function(e) {
+        const data = JSON.parse(e.data);
+        if (data.generation === undefined || data.generation !== generation) {
+            window.location.reload();
+        }
+    });
+})();
+
+// Caché local de la liga (IndexedDB): descarga solo los cambios desde la
+// última visita (/api/changes) y completa el historial sin pedirlo entero
+const LeagueCache = (function() {
+    // Una base por liga
+    const DB_NAME = 'waltiliga:' + PAGE.league;
+    const DB_VERSION = 1;
+    let syncing = null;
+
+    const promisify = (request) => new Promise((resolve, reject) => {
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+
+    function openDb() {
+        const request = indexedDB.open(DB_NAME, DB_VERSION);
+        request.onupgradeneeded = () => {
+            const db = request.result;
+            db.createObjectStore('meta');
+            db.createObjectStore('players', {keyPath: 'name'});
+            const games = db.createObjectStore('games', {keyPath: ['date', 'white', 'black']});
+            games.createIndex('date', 'date');
+        };
+        return promisify(request);
+    }
+
+    async function sync() {
+        const db = await openDb();
+        const since = (await promisify(db.transaction('meta').objectStore('meta').get('generation'))) || 0;
+        const response = await fetch('/api/changes?since=' + since);
+        if (!response.ok) throw new Error('No se pudieron obtener los cambios');
+        const data = await response.json();
+
+        const tx = db.transaction(['meta', 'players', 'games'], 'readwrite');
+        const players = tx.objectStore('players');
+        const games = tx.objectStore('games');
+        if (data.full) {
+            players.clear();
+            games.clear();
+        }
+        data.players.forEach(player => players.put(player));
+        data.games.forEach(game => games.put(game));
+        tx.objectStore('meta').put(data.generation, 'generation');
+        await new Promise((resolve, reject) => {
+            tx.oncomplete = resolve;
+            tx.onerror = () => reject(tx.error);
+        });
+        return db;
+    }
+
+    function refresh() {
+        if (!window.indexedDB) return Promise.resolve(null);
+        // Una sola sincronización a la vez
+        syncing = (syncing || Promise.resolve()).catch(() => null).then(sync);
+        return syncing;
+    }
+
+    async function gamesBefore(db, date) {
+        const displayNames = {};
+        (await promisify(db.transaction('players').objectStore('players').getAll()))
+            .forEach(player => displayNames[player.name] = player.display_name);
+        const older = [];
+        await new Promise((resolve, reject) => {
+            const index = db.transaction('games').objectStore('games').index('date');
+            const request = index.openCursor(IDBKeyRange.upperBound(date, true), 'prev');
+            request.onerror = () => reject(request.error);
+            request.onsuccess = () => {
+                const cursor = request.result;
+                if (!cursor) return resolve();
+                const game = cursor.value;
+                older.push({
+                    ...game,
+                    white: displayNames[game.white] || game.white,
+                    black: displayNames[game.black] || game.black
+                });
+                cursor.continue();
+            };
+        });
+        return older;
+    }
+
+    return {refresh, gamesBefore};
+})();
+
+document.addEventListener('DOMContentLoaded', function() {
+    if ('serviceWorker' in navigator) {
+        navigator.serviceWorker.register('/sw.js').catch(() => null);
+    }
+
+    const games = document.getElementById('gamesBody');
+    if (!games || !window.indexedDB) return;
+    LeagueCache.refresh().then(async (db) => {
+        if (!db || games.dataset.complete === 'true') return;
+        // Completar el historial con las partidas guardadas, más antiguas que la última mostrada
+        const rows = games.querySelectorAll('tr[data-date]');
+        const oldest = rows.length ? rows[rows.length - 1].dataset.date : '9999';
+        const fragment = document.createDocumentFragment();
+        (await LeagueCache.gamesBefore(db, oldest)).forEach(game => fragment.appendChild(buildGameRow(game)));
+        games.appendChild(fragment);
+        games.dataset.complete = 'true';
+        const more = document.getElementById('historyMore');
+        if (more) more.remove();
+    }).catch(() => null);
+});
+
+// Inicializar Vercel Analytics y Speed Insights cuando el DOM esté listo
+document.addEventListener('DOMContentLoaded', function() {
+    // Inicializar Analytics
+    window.va = window.va || function () { (window.vaq = window.vaq || []).push(arguments); };
+
+    // Cargar scripts de Vercel
+    const loadScript = (src) => {
+        const script = document.createElement('script');
+        script.defer = true;
+        script.src = src;
+        document.body.appendChild(script);
+        return script;
+    };
+
+    // Cargar Analytics
+    const analyticsScript = loadScript('/_vercel/insights/script.js');
+    analyticsScript.onload = () => {
+        console.log('Vercel Analytics loaded');
+        window.va('event', 'page_view');
+    };
+
+    // Cargar Speed Insights
+    const speedScript = loadScript('/_vercel/speed-insights/script.js');
+    speedScript.onload = () => {
+        console.log('Vercel Speed Insights loaded');
+    };
+});
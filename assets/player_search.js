@@ -0,0 +1,70 @@
+// Autocompletado de jugadores (/api/players/search) para los campos .player-search:
+// el texto visible busca y el campo oculto guarda el valor (data-value: id o name)
+function setPlayerSearch(container, value, displayName) {
+    container.querySelector('input[type="hidden"]').value = value;
+    const input = container.querySelector('.player-search-input');
+    input.value = displayName;
+    input.setCustomValidity('');
+}
+
+function attachPlayerSearch(container) {
+    const input = container.querySelector('.player-search-input');
+    const hidden = container.querySelector('input[type="hidden"]');
+    const results = container.querySelector('.player-search-results');
+    const valueKey = hidden.dataset.value || 'name';
+    let timer = null;
+    let request = 0;
+
+    const close = () => results.replaceChildren();
+
+    function render(players) {
+        close();
+        players.forEach(player => {
+            const item = document.createElement('button');
+            item.type = 'button';
+            item.className = 'list-group-item list-group-item-action';
+            item.textContent = player.display_name;
+            item.title = player.name;
+            item.addEventListener('mousedown', e => e.preventDefault());
+            item.addEventListener('click', () => {
+                setPlayerSearch(container, player[valueKey], player.display_name);
+                close();
+            });
+            results.appendChild(item);
+        });
+    }
+
+    input.addEventListener('input', () => {
+        hidden.value = '';
+        input.setCustomValidity(input.value ? 'Selecciona un jugador de la lista' : '');
+        clearTimeout(timer);
+        if (!input.value.trim()) return close();
+        timer = setTimeout(async () => {
+            // Solo se muestra la respuesta de la última búsqueda
+            const current = ++request;
+            try {
+                const response = await fetch('/api/players/search?q=' + encodeURIComponent(input.value));
+                const data = await response.json();
+                if (current === request && response.ok) render(data.players);
+            } catch (e) {
+                close();
+            }
+        }, 150);
+    });
+
+    input.addEventListener('keydown', e => {
+        const first = results.querySelector('button');
+        if (e.key === 'Enter' && first) {
+            e.preventDefault();
+            first.click();
+        } else if (e.key === 'Escape') {
+            close();
+        }
+    });
+
+    input.addEventListener('blur', close);
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('.player-search').forEach(attachPlayerSearch);
+});
@@ -0,0 +1,94 @@
+import argparse
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+# Cargar variables de entorno (POSTGRES_URL)
+load_dotenv()
+
+DEFAULT_PATHS = '/,/api/standings,/api/ratings,/api/head-to-head'
+
+def start_server(worker_class, port):
+    """Levanta gunicorn con un solo worker de la clase indicada"""
+    command = [
+        sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+        '--worker-class', worker_class, '--workers', '1',
+        '--bind', f'127.0.0.1:{port}', 'wsgi:app',
+    ]
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/api/standings', timeout=5).read()
+            return server
+        except OSError:
+            time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError(f'El servidor ({worker_class}) no respondió')
+
+def run_load(base_url, paths, concurrency, duration):
+    """Peticiones por segundo y latencias con `concurrency` clientes durante `duration` segundos"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+
+    def client(offset):
+        i = offset
+        while time.time() < stop_at:
+            path = paths[i % len(paths)]
+            i += 1
+            started = time.perf_counter()
+            try:
+                urllib.request.urlopen(base_url + path, timeout=30).read()
+            except OSError:
+                with lock:
+                    errors[0] += 1
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for offset in range(concurrency):
+            executor.submit(client, offset)
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] if latencies else float('nan')
+    p95 = latencies[int(len(latencies) * 0.95)] if latencies else float('nan')
+    return len(latencies) / duration, p50, p95, errors[0]
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara peticiones por segundo de un worker sync y uno gevent en las rutas de lectura')
+    parser.add_argument('--workers', default='sync,gevent', help='Clases de worker a comparar')
+    parser.add_argument('--paths', default=DEFAULT_PATHS, help='Rutas a consultar, separadas por coma')
+    parser.add_argument('--concurrency', type=int, default=32, help='Clientes simultáneos')
+    parser.add_argument('--duration', type=float, default=15, help='Segundos por medición')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--url', help='Medir un servidor ya levantado en vez de iniciar gunicorn')
+    args = parser.parse_args()
+
+    paths = [path for path in args.paths.split(',') if path]
+    targets = [(args.url, args.url)] if args.url else [(worker, None) for worker in args.workers.split(',') if worker]
+
+    print(f"{len(paths)} rutas, {args.concurrency} clientes, {args.duration:g}s por medición")
+    print(f"{'worker':<12}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errores':>9}")
+    for name, url in targets:
+        server = None
+        if url is None:
+            server = start_server(name, args.port)
+            url = f'http://127.0.0.1:{args.port}'
+        try:
+            rate, p50, p95, errors = run_load(url.rstrip('/'), paths, args.concurrency, args.duration)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+        print(f"{name:<12}{rate:>10.1f}{p50 * 1000:>10.1f}{p95 * 1000:>10.1f}{errors:>9}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import random
+import sys
+import time
+from collections import Counter
+
+from app.utils.penalties import GAMES_PER_WEEK
+from app.utils.schedule import season_schedule
+
+# Presupuesto para generar la temporada completa, en segundos
+DEFAULT_BUDGET_SECONDS = 5
+
+def check(players, schedule, unavailable, games_per_week):
+    """Rivales repetidos, semanas con un jugador no disponible o sobre el cupo, y mayor desbalance de colores"""
+    pairs = Counter()
+    balance = Counter()
+    violations = 0
+    for week, fixtures in enumerate(schedule):
+        load = Counter()
+        for white, black in fixtures:
+            pairs[frozenset((white, black))] += 1
+            balance[white] += 1
+            balance[black] -= 1
+            load[white] += 1
+            load[black] += 1
+        blocked = unavailable.get(week, set())
+        violations += sum(1 for name, games in load.items() if name in blocked or games > games_per_week)
+    repeats = sum(count - 1 for count in pairs.values())
+    return repeats, violations, max((abs(value) for value in balance.values()), default=0)
+
+def main():
+    parser = argparse.ArgumentParser(description='Mide la generación del calendario de una temporada y falla si supera el presupuesto')
+    parser.add_argument('--players', type=int, default=500, help='Jugadores de la liga')
+    parser.add_argument('--weeks', type=int, default=52, help='Semanas de la temporada')
+    parser.add_argument('--unavailable', type=float, default=0.05, help='Fracción de jugadores no disponibles cada semana')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET_SECONDS, help='Máximo de segundos')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    players = [f'Jugador {i:04d}' for i in range(args.players)]
+    ratings = [rng.randint(1000, 2200) for _ in players]
+    unavailable = {week: set(rng.sample(players, int(args.players * args.unavailable))) for week in range(args.weeks)}
+
+    started = time.perf_counter()
+    method, schedule = season_schedule(players, ratings, args.weeks, unavailable)
+    elapsed = time.perf_counter() - started
+
+    repeats, violations, imbalance = check(players, schedule, unavailable, GAMES_PER_WEEK)
+    games = sum(len(fixtures) for fixtures in schedule)
+    print(f'{method}: {games} partidas en {args.weeks} semanas')
+    print(f'{repeats} rivales repetidos, {violations} violaciones de disponibilidad o cupo, '
+          f'desbalance de colores máximo {imbalance}')
+    ok = elapsed <= args.budget
+    print(f"{'ok ' if ok else 'LENTO'} {elapsed:.2f} s (presupuesto {args.budget:g} s)")
+    sys.exit(0 if ok and not violations else 1)
+
+if __name__ == '__main__':
+    main()
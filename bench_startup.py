@@ -0,0 +1,93 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Presupuesto por defecto del arranque en frío (importar serverless.py), en ms
+DEFAULT_BUDGET_MS = 500
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Se ejecuta en un proceso nuevo: mide importar el punto de entrada, sin
+# cachés de módulos del proceso que mide
+IMPORT_SCRIPT = '''
+import sys, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+import serverless
+print((time.perf_counter() - started) * 1000)
+'''
+
+def measure_import(runs, env):
+    """Mediana de los ms que tarda importar serverless.py en `runs` procesos nuevos"""
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT.format(root=ROOT)], env=env, cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    timings.sort()
+    return timings[len(timings) // 2]
+
+def slowest_imports(env, count):
+    """Módulos que más tardan en importarse (acumulado, según -X importtime)"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import serverless'], env=env, cwd=ROOT,
+                            capture_output=True, text=True)
+    imports = []
+    for line in result.stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            imports.append((int(parts[1]), parts[2].rstrip()))
+    imports.sort(reverse=True)
+    return imports[:count]
+
+def measure_image(path, runs):
+    """Mediana de los ms que tarda leer la imagen de una liga, y la liga leída"""
+    sys.path.insert(0, ROOT)
+    from app.utils import league_image
+    timings = []
+    league = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        league = league_image.read(path)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2], league
+
+def main():
+    parser = argparse.ArgumentParser(description='Mide el arranque en frío del punto de entrada serverless y falla si supera el presupuesto')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS, help='Máximo de ms para importar serverless.py')
+    parser.add_argument('--image-budget-ms', type=float, default=50, help='Máximo de ms para leer la imagen de una liga')
+    parser.add_argument('--runs', type=int, default=5, help='Procesos por medición (se usa la mediana)')
+    parser.add_argument('--images', default=os.path.join(ROOT, 'league_image'), help='Directorio con las imágenes de las ligas')
+    args = parser.parse_args()
+
+    # Sin base de datos: solo se mide el arranque (la conexión inicial va en segundo plano)
+    env = {**os.environ, 'LEAGUE_IMAGE_BUNDLE': args.images,
+           'LEAGUE_IMAGE_DIR': os.path.join(tempfile.gettempdir(), 'league_image_bench')}
+    failures = 0
+
+    import_ms = measure_import(args.runs, env)
+    ok = import_ms <= args.budget_ms
+    failures += not ok
+    print(f"{'ok ' if ok else 'LENTO'} importar serverless.py: {import_ms:.1f} ms (presupuesto {args.budget_ms:g} ms)")
+    if not ok:
+        print('Importaciones más lentas (acumulado):')
+        for micros, module in slowest_imports(env, 10):
+            print(f'  {micros / 1000:8.1f} ms {module}')
+
+    images = sorted(name for name in os.listdir(args.images) if name.endswith('.img')) if os.path.isdir(args.images) else []
+    if not images:
+        print(f'Sin imágenes en {args.images} (python app.py build-image --out {args.images})')
+    for name in images:
+        image_ms, league = measure_image(os.path.join(args.images, name), args.runs)
+        ok = league is not None and image_ms <= args.image_budget_ms
+        failures += not ok
+        detail = (f'{len(league.names)} jugadores, {len(league)} partidas, generación {league.generation}'
+                  if league is not None else 'no se pudo leer')
+        print(f"{'ok ' if ok else 'LENTO'} leer {name}: {image_ms:.2f} ms ({detail})")
+
+    raise SystemExit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import random
+import sys
+import time
+
+from app.utils.swiss import SwissPlayer, pair_round, round_standings
+
+# Presupuesto por ronda pareada, en ms
+DEFAULT_BUDGET_MS = 1000
+
+def simulate(players, rounds, seed):
+    """
+    Juega un torneo simulado (gana el de más rating con probabilidad ELO) y
+    devuelve los ms de cada pareo, los rivales repetidos y las rondas con
+    algún jugador sin alternar colores tres veces seguidas
+    """
+    rng = random.Random(seed)
+    field = [SwissPlayer(f'Jugador {i:04d}', rng.randint(1000, 2200)) for i in range(players)]
+    by_name = {player.name: player for player in field}
+    standings = {player.name: (0.0, 0.0, 0.0) for player in field}
+    history = {}
+    timings, repeats, color_streaks = [], 0, 0
+    for _ in range(rounds):
+        started = time.perf_counter()
+        boards, bye = pair_round(field)
+        timings.append((time.perf_counter() - started) * 1000)
+
+        results = []
+        for white, black in boards:
+            a, b = by_name[white], by_name[black]
+            repeats += black in a.opponents
+            expected = 1 / (1 + 10 ** ((b.rating - a.rating) / 400))
+            roll = rng.random()
+            result = 1.0 if roll < expected - 0.1 else 0.5 if roll < expected + 0.1 else 0.0
+            results.append((white, black, result))
+            a.colors += 'W'
+            b.colors += 'B'
+            a.opponents.add(black)
+            b.opponents.add(white)
+        if bye:
+            by_name[bye].had_bye = True
+            results.append((bye, None, 1.0))
+        color_streaks += any(player.colors[-3:] in ('WWW', 'BBB') for player in field)
+
+        standings = round_standings(standings, history, results)
+        for white, black, result in results:
+            if black is not None:
+                history.setdefault(white, []).append((black, result))
+                history.setdefault(black, []).append((white, 1 - result))
+        for player in field:
+            player.points = standings[player.name][0]
+    return timings, repeats, color_streaks
+
+def main():
+    parser = argparse.ArgumentParser(description='Mide el pareo suizo con un torneo simulado y falla si una ronda supera el presupuesto')
+    parser.add_argument('--players', type=int, default=400, help='Jugadores del torneo')
+    parser.add_argument('--rounds', type=int, default=9, help='Rondas')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS, help='Máximo de ms por ronda')
+    args = parser.parse_args()
+
+    timings, repeats, color_streaks = simulate(args.players, args.rounds, args.seed)
+    for round_number, ms in enumerate(timings, 1):
+        print(f'ronda {round_number}: {ms:.1f} ms')
+    print(f'{repeats} rivales repetidos, {color_streaks} ronda(s) con tres colores iguales seguidos')
+    slowest = max(timings)
+    ok = slowest <= args.budget_ms
+    print(f"{'ok ' if ok else 'LENTO'} ronda más lenta: {slowest:.1f} ms (presupuesto {args.budget_ms:g} ms)")
+    sys.exit(0 if ok and not repeats else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import argparse
+import json
+import math
+import os
+import time
+from dotenv import load_dotenv
+
+from app.utils.calibration import MODELS, build_grid, evaluate_grid
+from app.utils.elo import K_FACTOR
+
+# Cargar variables de entorno
+load_dotenv()
+
+def load_games_from_db():
+    import psycopg2
+
+    conn = psycopg2.connect(os.environ.get('POSTGRES_URL'), sslmode='require')
+    cur = conn.cursor()
+    try:
+        cur.execute('SELECT white, black, result FROM games ORDER BY date')
+        return cur.fetchall()
+    finally:
+        cur.close()
+        conn.close()
+
+def load_games_from_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        league_data = json.load(f)
+    games = sorted(league_data['games'], key=lambda g: g['date'])
+    return [(g['white'], g['black'], float(g['result'])) for g in games]
+
+def parse_list(value, cast=float):
+    return [cast(item) for item in value.split(',') if item]
+
+def parse_initial(value):
+    return [item if item == 'start' else float(item) for item in value.split(',') if item]
+
+def main():
+    parser = argparse.ArgumentParser(description='Evalúa factores K y modelos de rating sobre el historial completo')
+    parser.add_argument('--json', help='Leer partidas desde un archivo (p. ej. league.json) en vez de la base de datos')
+    parser.add_argument('--k', default='10,15,20,25,30,40,50,60,80,100', help='Valores de K separados por coma')
+    parser.add_argument('--initial', default='start', help="Ratings iniciales: 'start' (start.json) y/o valores fijos")
+    parser.add_argument('--white-advantage', default='0,25,50', help='Ventaja de blancas en puntos de rating')
+    parser.add_argument('--models', default=','.join(MODELS), help='Modelos a evaluar')
+    parser.add_argument('--burn-in', type=int, default=0, help='Partidas iniciales que no se puntúan')
+    parser.add_argument('--workers', type=int, default=None, help='Procesos a usar (por defecto, todos los núcleos)')
+    parser.add_argument('--top', type=int, default=15, help='Cantidad de candidatos a mostrar')
+    args = parser.parse_args()
+
+    with open('start.json', 'r', encoding='utf-8') as f:
+        start_ratings = {p['name']: p['rating'] for p in json.load(f)['players']}
+    games = load_games_from_json(args.json) if args.json else load_games_from_db()
+
+    models = [model for model in args.models.split(',') if model]
+    unknown = set(models) - set(MODELS)
+    if unknown:
+        parser.error(f"Modelos desconocidos: {', '.join(sorted(unknown))}")
+
+    grid = build_grid(parse_list(args.k), parse_initial(args.initial),
+                      parse_list(args.white_advantage), models)
+
+    started = time.perf_counter()
+    results = evaluate_grid(games, start_ratings, grid, burn_in=args.burn_in, workers=args.workers)
+    elapsed = time.perf_counter() - started
+
+    print(f"{len(grid)} candidatos evaluados sobre {len(games)} partidas en {elapsed:.2f}s")
+    print(f"Referencia (siempre 50%): log-loss {math.log(2):.4f}, Brier 0.2500")
+    print()
+    print(f"{'modelo':<16}{'K':>6}{'inicial':>9}{'ventaja':>9}{'log-loss':>10}{'Brier':>9}{'acierto':>9}")
+    for row in results[:args.top]:
+        print(f"{row['model']:<16}{row['k']:>6g}{str(row['initial']):>9}{row['white_advantage']:>9g}"
+              f"{row['log_loss']:>10.4f}{row['brier']:>9.4f}{row['accuracy']:>9.1%}")
+
+    current = next((row for row in results if row['model'] == 'elo' and row['k'] == K_FACTOR
+                    and row['initial'] == 'start' and row['white_advantage'] == 0), None)
+    if current:
+        print()
+        print(f"Configuración actual (elo, K={K_FACTOR}): log-loss {current['log_loss']:.4f}, Brier {current['brier']:.4f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,21 @@
+# Configuración de gunicorn fuera de Vercel: gunicorn -c gunicorn.conf.py wsgi:app
+# Los workers de gevent atienden cada conexión en una greenlet, así las
+# conexiones abiertas a /events (casi siempre inactivas) no ocupan un worker
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:3007')
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+worker_class = 'gevent'
+worker_connections = int(os.environ.get('WORKER_CONNECTIONS', '1000'))
+# Con gevent el latido del worker es una greenlet aparte de las peticiones:
+# las conexiones abiertas a /events no lo detienen, y un worker bloqueado
+# (p. ej. por un cálculo largo) se reinicia a los `timeout` segundos
+timeout = int(os.environ.get('WORKER_TIMEOUT', '30'))
+keepalive = 75
+
+
+def post_fork(server, worker):
+    # psycopg2 cede el control a otras greenlets mientras espera a Postgres
+    if server.cfg.worker_class_str == 'gevent':
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
@@ -0,0 +1,29 @@
+# Punto de entrada de Vercel, pensado para el arranque en frío: carga app.py
+# por su ruta (como wsgi.py), lee la imagen binaria de las ligas incluida en
+# el despliegue (python app.py build-image) y abre la primera conexión a
+# Postgres en segundo plano, mientras llega la primera petición
+import importlib.util
+import logging
+import os
+import tempfile
+
+_root = os.path.dirname(os.path.abspath(__file__))
+# La imagen del despliegue es de solo lectura; las imágenes nuevas se
+# guardan en /tmp, que se conserva mientras la instancia siga viva.
+# league_image/ no está en git: se genera antes de `vercel build` con
+# acceso a la base (ver "Deploying" en README.md) y vercel.json la incluye
+# en la función. Sin ella, la primera petición recalcula la liga desde la base
+if 'LEAGUE_IMAGE_BUNDLE' not in os.environ:
+    _bundle = os.path.join(_root, 'league_image')
+    if os.path.isdir(_bundle):
+        os.environ['LEAGUE_IMAGE_BUNDLE'] = _bundle
+    else:
+        logging.getLogger(__name__).warning('Sin imagen de las ligas en %s (python app.py build-image)', _bundle)
+os.environ.setdefault('LEAGUE_IMAGE_DIR', os.path.join(tempfile.gettempdir(), 'league_image'))
+
+_spec = importlib.util.spec_from_file_location('league_app', os.path.join(_root, 'app.py'))
+_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_module)
+_module.warm_start()
+
+app = _module.app
@@ -0,0 +1,46 @@
+// Service worker de la liga: guarda los recursos de CDN y la última página
+// vista, para que las visitas con mala conexión carguen desde el caché.
+// Los datos de la liga se sincronizan aparte (IndexedDB + /api/changes).
+const CACHE = 'waltiliga-v1';
+const CDN_HOSTS = ['cdn.jsdelivr.net', 'code.jquery.com', 'cdnjs.cloudflare.com'];
+
+self.addEventListener('install', () => self.skipWaiting());
+
+self.addEventListener('activate', (event) => {
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(keys.filter(key => key !== CACHE).map(key => caches.delete(key))))
+            .then(() => self.clients.claim())
+    );
+});
+
+self.addEventListener('fetch', (event) => {
+    const request = event.request;
+    if (request.method !== 'GET') return;
+    const url = new URL(request.url);
+
+    // Recursos versionados (de CDN o propios, con el hash en el nombre): primero el caché
+    const ownAsset = url.origin === self.location.origin && url.pathname.startsWith('/static/assets/');
+    if (CDN_HOSTS.includes(url.hostname) || ownAsset) {
+        event.respondWith(
+            caches.open(CACHE).then(cache => cache.match(request).then(cached => cached || fetch(request).then(response => {
+                cache.put(request, response.clone());
+                return response;
+            })))
+        );
+        return;
+    }
+
+    // Páginas: primero la red; sin conexión, la última versión guardada
+    if (request.mode === 'navigate' && url.origin === self.location.origin) {
+        event.respondWith(
+            fetch(request).then(response => {
+                if (response.ok) {
+                    const copy = response.clone();
+                    caches.open(CACHE).then(cache => cache.put(request, copy));
+                }
+                return response;
+            }).catch(() => caches.match(request))
+        );
+    }
+});
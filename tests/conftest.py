@@ -0,0 +1,106 @@
+import importlib.util
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# La aplicación lee la configuración al importarse: las pruebas usan una base
+# SQLite nueva en un archivo temporal, sin servicios externos
+_database = tempfile.NamedTemporaryFile(prefix='league-tests-', suffix='.db', delete=False)
+_database.close()
+os.environ['SQLITE_PATH'] = _database.name
+for name in ('POSTGRES_URL', 'REPLICA_URL', 'SNAPSHOT_DIR', 'LEAGUE_IMAGE_DIR', 'LEAGUE_IMAGE_BUNDLE'):
+    os.environ.pop(name, None)
+
+# Jugadores de la liga de prueba: (nombre, rating inicial)
+PLAYERS = [
+    ('Ana Pérez', 1500),
+    ('Bruno Díaz', 1450),
+    ('Carla Núñez', 1400),
+    ('Diego Soto', 1350),
+    ('Elena Ruiz', 1300),
+    ('Felipe Mora', 1250),
+]
+# Primera partida de la liga de prueba (lunes)
+SEASON_START = datetime(2025, 3, 3, 18)
+
+
+@pytest.fixture(scope='session')
+def league_app():
+    """app.py cargado por su ruta (como wsgi.py) sobre la base de prueba, con el esquema creado"""
+    os.chdir(ROOT)
+    spec = importlib.util.spec_from_file_location('league_app', os.path.join(ROOT, 'app.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    # Los trabajos derivados quedan en el outbox: cada prueba ejecuta los que necesita
+    module.job_queue.start = lambda: None
+    module.schedule_week_closing = lambda league, now=None: None
+    module.init_db()
+    yield module
+    os.unlink(_database.name)
+
+
+@pytest.fixture
+def seeded_league(league_app, request):
+    """
+    Liga nueva con PLAYERS y 60 partidas de resultado aleatorio (semilla
+    fija), una cada 8 horas desde SEASON_START: el id, el slug y las
+    partidas guardadas [(blancas, negras, resultado, fecha)].
+    """
+    slug = 'prueba-' + request.node.name.lower().replace('_', '-')[:40]
+    conn = league_app.get_db()
+    cur = conn.cursor()
+    league_id = league_app.create_league(cur, slug, f'Prueba {request.node.name}')
+    for name, rating in PLAYERS:
+        cur.execute(
+            'INSERT INTO players (league_id, name, initial_rating, generation, search_name) VALUES (%s, %s, %s, %s, %s)',
+            (league_id, name, rating, league_app.bump_generation(cur, league_id), league_app.fold(name))
+        )
+    conn.commit()
+    league = league_app.get_league(league_id, league_app.db_pool)
+    rng = random.Random(7)
+    games = []
+    for i in range(60):
+        white, black = rng.sample([name for name, _ in PLAYERS], 2)
+        games.append((white, black, rng.choice([0, 0.5, 1]), SEASON_START + timedelta(hours=8 * i)))
+        league_app.insert_game(cur, league, *games[-1], None)
+    conn.commit()
+    cur.close()
+    conn.close()
+    league_app.league_directory(refresh=True)
+    return SimpleNamespace(id=league_id, slug=slug, games=games)
+
+
+@pytest.fixture
+def add_games(league_app):
+    """Guarda partidas [(blancas, negras, resultado, fecha)] de una liga como lo hace /add_game"""
+    def add(league_id, games):
+        conn = league_app.get_db()
+        cur = conn.cursor()
+        league = league_app.get_league(league_id, league_app.db_pool)
+        for white, black, result, date in games:
+            league_app.insert_game(cur, league, white, black, result, date, None)
+        conn.commit()
+        cur.close()
+        conn.close()
+    return add
+
+
+def stored_rollups(league_app, league_id):
+    """Resúmenes guardados en player_rollups: (periodo, inicio, jugador) -> valores"""
+    conn = league_app.get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute('SELECT period, period_start, player_name, games, score, rating_start, rating_end, penalties '
+                    'FROM player_rollups WHERE league_id = %s', (league_id,))
+        return {(row['period'], row['period_start'], row['player_name']): tuple(row[3:]) for row in cur.fetchall()}
+    finally:
+        cur.close()
+        conn.close()
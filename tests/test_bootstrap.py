@@ -0,0 +1,55 @@
+from datetime import datetime
+
+import numpy as np
+
+from app.utils.bootstrap import _bootstrap_chunk
+from app.utils.elo import GetProbability
+from app.utils.rating_engines import rated_games, rated_penalties
+
+
+def replay(initial, white, black, score, penalties, picks, k):
+    """ELO de las partidas `picks` (en orden) con cada penalización antes de la primera partida posterior"""
+    ratings = [float(rating) for rating in initial]
+    pending = sorted(zip(penalties[1].tolist(), penalties[0].tolist(), penalties[2].tolist()))
+    for game in picks:
+        while pending and pending[0][0] <= game:
+            _, player, points = pending.pop(0)
+            ratings[player] -= points
+        w, b = white[game], black[game]
+        change = k * (score[game] - GetProbability(ratings[w], ratings[b]))
+        ratings[w], ratings[b] = np.rint(ratings[w] + change), np.rint(ratings[b] - change)
+    for _, player, points in pending:
+        ratings[player] -= points
+    return ratings
+
+
+def penalized_league(league_app, seeded_league):
+    league_app.close_weeks(seeded_league.id, now=datetime(2025, 3, 24))
+    league = league_app.get_league(seeded_league.id, league_app.db_pool)
+    assert len(league.penalty_player)
+    return league
+
+
+def test_rated_penalties_replay_to_league_ratings(league_app, seeded_league):
+    league = penalized_league(league_app, seeded_league)
+    white, black, score, _ = rated_games(league)
+    ratings = replay(league.initial_ratings, white, black, score, rated_penalties(league),
+                     range(len(white)), league.k)
+    assert ratings == list(league.ratings)
+
+
+def test_bootstrap_applies_penalties_in_each_sample(league_app, seeded_league):
+    league = penalized_league(league_app, seeded_league)
+    white, black, score, _ = rated_games(league)
+    penalties = rated_penalties(league)
+    players = np.arange(len(league.names))
+    initial = np.asarray(league.initial_ratings, dtype=np.float64)
+    samples, seed = 20, 3
+
+    result = _bootstrap_chunk((initial, white, black, score, penalties, players, league.k, samples, seed))
+
+    # Las mismas muestras que remuestrea el bloque, repetidas de a una
+    rng = np.random.default_rng(seed)
+    picks = np.sort(rng.integers(0, len(white), size=(samples, len(white))), axis=1)
+    expected = [replay(initial, white, black, score, penalties, row.tolist(), league.k) for row in picks]
+    assert result['ratings'].tolist() == expected
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+from app.utils.rollups import changed_since, period_rollups
+
+from conftest import SEASON_START, stored_rollups
+
+
+def full_rollups(league_app, league_id):
+    """Resúmenes recalculados desde cero con la liga recargada de la base"""
+    league = league_app.load_league_data(league_id, league_app.db_pool)
+    return {(period, start, league.names[player]): tuple(values)
+            for period, start, player, *values in period_rollups(league)}
+
+
+def test_incremental_rollups_match_rebuild(league_app, seeded_league, add_games):
+    league_id = seeded_league.id
+    assert league_app.update_rollups(league_id) > 0
+    assert stored_rollups(league_app, league_id) == full_rollups(league_app, league_id)
+    assert league_app.update_rollups(league_id) is None
+
+    # Partidas al final: solo se recalculan la semana y el mes de la última
+    last = seeded_league.games[-1][3]
+    add_games(league_id, [('Ana Pérez', 'Felipe Mora', 1, last + timedelta(hours=1)),
+                          ('Diego Soto', 'Elena Ruiz', 0.5, last + timedelta(hours=2))])
+    written = league_app.update_rollups(league_id)
+    assert 0 < written < len(full_rollups(league_app, league_id))
+    assert stored_rollups(league_app, league_id) == full_rollups(league_app, league_id)
+
+    # Una partida atrasada cambia los ratings de todo lo que sigue
+    add_games(league_id, [('Bruno Díaz', 'Carla Núñez', 0, SEASON_START + timedelta(days=1, hours=1))])
+    league_app.update_rollups(league_id)
+    assert stored_rollups(league_app, league_id) == full_rollups(league_app, league_id)
+
+    # El cierre de semanas agrega penalizaciones que cuentan en cada semana
+    # cerrada (en la del 24/03 nadie juega)
+    closed = league_app.close_weeks(league_id, now=datetime(2025, 3, 31))
+    assert closed
+    league_app.update_rollups(league_id)
+    stored = stored_rollups(league_app, league_id)
+    assert stored == full_rollups(league_app, league_id)
+    assert any(penalties for *_, penalties in stored.values())
+
+    # Y partidas de la semana siguiente, después del cierre
+    add_games(league_id, [('Carla Núñez', 'Ana Pérez', 1, datetime(2025, 4, 1, 19)),
+                          ('Elena Ruiz', 'Bruno Díaz', 0.5, datetime(2025, 4, 2, 19))])
+    league_app.update_rollups(league_id)
+    incremental = stored_rollups(league_app, league_id)
+    assert incremental == full_rollups(league_app, league_id)
+
+    # Recalcular todo deja exactamente las mismas filas
+    league_app.update_rollups(league_id, rebuild=True)
+    assert stored_rollups(league_app, league_id) == incremental
+
+
+def test_changed_since(league_app, seeded_league, add_games):
+    league_id = seeded_league.id
+    league = league_app.get_league(league_id, league_app.db_pool)
+    generation, penalties = league.generation, len(league.penalty_at)
+    assert changed_since(league, -1, 0) == datetime(1970, 1, 1)
+    assert changed_since(league, generation, penalties) is None
+
+    backdated = SEASON_START + timedelta(days=2)
+    add_games(league_id, [('Ana Pérez', 'Bruno Díaz', 1, seeded_league.games[-1][3] + timedelta(hours=1)),
+                          ('Carla Núñez', 'Diego Soto', 0, backdated)])
+    league = league_app.get_league(league_id, league_app.db_pool)
+    assert changed_since(league, generation, penalties) == backdated
@@ -0,0 +1,280 @@
+import threading
+from datetime import datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from app.utils.jobs import JobQueue, enqueue
+from app.utils.league import League
+from app.utils.penalties import WEEK, week_penalties, week_start
+from app.utils.player_search import PlayerIndex, search_players
+from app.utils.rollups import period_rollups
+
+from conftest import PLAYERS, SEASON_START, stored_rollups
+
+
+def expected_league(games, penalties=()):
+    """La liga calculada en memoria, sin base de datos (cada penalización, al terminar su semana)"""
+    league = League(dict(PLAYERS))
+    for player_id, (name, _) in enumerate(PLAYERS, 1):
+        league.set_player_id(name, player_id)
+    events = [(date, 1, (white, black, result, date)) for white, black, result, date in games]
+    events += [(start + WEEK, 0, (name, start + WEEK, points)) for name, start, points in penalties]
+    for _, is_game, event in sorted(events, key=lambda entry: entry[:2]):
+        if is_game:
+            league.add_game(*event)
+        else:
+            league.add_penalty(*event)
+    return league
+
+
+def test_league_loading(league_app, seeded_league):
+    players = league_app.fetch_players(seeded_league.id, league_app.db_pool)
+    assert sorted((row['name'], row['initial_rating']) for row in players) == sorted(PLAYERS)
+
+    games = league_app.fetch_games(seeded_league.id, league_app.db_pool)
+    assert [(white, black, result, date) for white, black, result, date, _, _ in games] == seeded_league.games
+    assert [generation for *_, generation in games] == sorted(generation for *_, generation in games)
+
+    league = league_app.load_league_data(seeded_league.id, league_app.db_pool)
+    expected = expected_league(seeded_league.games)
+    assert league.names == expected.names
+    assert list(league.ratings) == list(expected.ratings)
+    assert league.closed_through is None
+
+
+def test_catch_up_replaces_cached_league(league_app, seeded_league, add_games, monkeypatch):
+    cached = league_app.get_league(seeded_league.id, league_app.db_pool)
+    generation, ratings = cached.generation, list(cached.ratings)
+    new_games = [(PLAYERS[0][0], PLAYERS[1][0], 1, SEASON_START + timedelta(days=30)),
+                 (PLAYERS[2][0], PLAYERS[3][0], 0.5, SEASON_START + timedelta(days=31))]
+    add_games(seeded_league.id, new_games)
+
+    # Se pone al día sin recalcular el historial, en una copia que reemplaza a la liga en caché
+    def full_reload(*args, **kwargs):
+        raise AssertionError('recalculó el historial')
+    monkeypatch.setattr(league_app, 'load_league_data', full_reload)
+    league = league_app.get_league(seeded_league.id, league_app.db_pool)
+    assert league is not cached
+    assert league_app.league_cache[seeded_league.id] is league
+    assert len(league) == len(seeded_league.games) + 2
+    assert list(league.ratings) == list(expected_league(seeded_league.games + new_games).ratings)
+
+    # La liga anterior, que otras peticiones pueden estar leyendo, no cambió
+    assert cached.generation == generation
+    assert len(cached) == len(seeded_league.games)
+    assert list(cached.ratings) == ratings
+    assert sum(cached.player_stats.games) == 2 * len(seeded_league.games)
+
+
+def test_week_closing_and_penalties(league_app, seeded_league):
+    closed = league_app.close_weeks(seeded_league.id, now=datetime(2025, 3, 24))
+    assert closed[-1] == datetime(2025, 3, 17)
+
+    expected = expected_league(seeded_league.games)
+    expected_penalties = [(expected.names[player], start, points)
+                          for start in closed for player, _, points in week_penalties(expected, start)]
+    assert expected_penalties
+
+    rows, closed_through = league_app.fetch_penalties(seeded_league.id, league_app.db_pool)
+    assert closed_through == datetime(2025, 3, 17)
+    assert sorted(tuple(row) for row in rows) == sorted(expected_penalties)
+
+    # La liga recargada aplica cada penalización al terminar su semana
+    league = league_app.get_league(seeded_league.id, league_app.db_pool)
+    assert list(league.ratings) == list(expected_league(seeded_league.games, expected_penalties).ratings)
+
+
+def test_player_search(league_app, seeded_league):
+    conn = league_app.get_db()
+    cur = conn.cursor()
+    try:
+        ids = {row['name']: row['id'] for row in league_app.fetch_players(seeded_league.id)}
+        index = PlayerIndex([(player_id, name) for name, player_id in ids.items()])
+        # Sin tildes ni mayúsculas; primero quien empieza con la búsqueda, después los apellidos
+        assert search_players(cur, seeded_league.id, 'di', 10) == [(ids['Diego Soto'], 'Diego Soto'),
+                                                                    (ids['Bruno Díaz'], 'Bruno Díaz')]
+        assert search_players(cur, seeded_league.id, 'NUÑ', 10) == [(ids['Carla Núñez'], 'Carla Núñez')]
+        for query in ('a', 'pe', 'mor', 'elena r', 'zz'):
+            assert search_players(cur, seeded_league.id, query, 10) == index.search(query, 10)
+        # % y _ se buscan literalmente
+        assert search_players(cur, seeded_league.id, '%', 10) == []
+        assert search_players(cur, seeded_league.id, '_', 10) == []
+    finally:
+        cur.close()
+        conn.close()
+
+
+def test_outbox(league_app, seeded_league):
+    conn = league_app.get_db()
+    cur = conn.cursor()
+    try:
+        # Cada escritura de la liga encoló sus trabajos derivados una vez por generación
+        cur.execute("SELECT kind, COUNT(*) AS jobs FROM jobs_outbox WHERE idempotency_key LIKE %s GROUP BY kind",
+                    (f'%:{seeded_league.id}:%',))
+        counts = {row['kind']: row['jobs'] for row in cur.fetchall()}
+        assert counts == {kind: 60 for kind in ('warm_league', 'rating_intervals', 'projections', 'rollups')}
+
+        key = f'prueba:{seeded_league.id}'
+        assert enqueue(cur, 'prueba', key + ':ok', {'league': seeded_league.id})
+        assert enqueue(cur, 'prueba', key + ':falla', {'league': seeded_league.id})
+        assert not enqueue(cur, 'prueba', key + ':ok')
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+
+    queue = JobQueue(league_app.get_db)
+    queue.handlers['prueba'] = lambda payload: None
+    jobs = queue._claim(10)
+    assert [(kind, payload) for _, kind, payload, _, _ in jobs] == [('prueba', {'league': seeded_league.id})] * 2
+    assert [attempts for _, _, _, attempts, _ in jobs] == [1, 1]
+    # Reservados: no se vuelven a tomar hasta que venza la reserva
+    assert queue._claim(10) == []
+
+    (ok_id, _, _, attempts, created_at), (failed_id, *_) = jobs
+    queue._finish(ok_id, attempts, created_at, None)
+    queue._finish(failed_id, attempts, created_at, RuntimeError('sin conexión'))
+    assert queue.processed == 1 and queue.retried == 1
+    assert 0 <= queue.last_lag_seconds < 60
+
+    conn = league_app.get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute('SELECT id, done_at, last_error, run_after > created_at AS delayed FROM jobs_outbox '
+                    'WHERE id IN (%s, %s) ORDER BY id', (ok_id, failed_id))
+        ok, failed = cur.fetchall()
+        assert ok['done_at'] is not None and ok['last_error'] is None
+        assert failed['done_at'] is None and failed['last_error'] == 'sin conexión' and failed['delayed']
+        metrics = queue.metrics(cur)
+        assert metrics['pending'] >= 1 and metrics['failed'] == 0
+        assert metrics['lag_seconds'] >= 0
+    finally:
+        cur.close()
+        conn.close()
+    # Los terminados se conservan RETENTION_DAYS
+    queue._prune()
+    conn = league_app.get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute('SELECT COUNT(*) FROM jobs_outbox WHERE id = %s', (ok_id,))
+        assert cur.fetchone()[0] == 1
+    finally:
+        cur.close()
+        conn.close()
+
+
+def test_dispatcher_picks_up_pending_jobs(league_app, seeded_league):
+    # Un trabajo dejado por otro proceso: nadie llama a wake() en este
+    conn = league_app.get_db()
+    cur = conn.cursor()
+    try:
+        assert enqueue(cur, 'pendiente', f'pendiente:{seeded_league.id}', {'league': seeded_league.id})
+        conn.commit()
+        queue = JobQueue(league_app.get_db)
+        assert queue.metrics(cur)['process']['dispatcher_running'] is False
+        assert queue.metrics(cur)['pending'] >= 1
+    finally:
+        cur.close()
+        conn.close()
+
+    done = threading.Event()
+    queue.handlers['pendiente'] = lambda payload: done.set()
+    queue.start()
+    assert queue.running
+    assert done.wait(10)
+
+
+def unavailable_players(league_app, league_id):
+    conn = league_app.get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute('SELECT player_name FROM player_unavailability WHERE league_id = %s', (league_id,))
+        return sorted(row['player_name'] for row in cur.fetchall())
+    finally:
+        cur.close()
+        conn.close()
+
+
+def test_availability_only_for_league_players(league_app, seeded_league):
+    league = f'?league={seeded_league.slug}'
+    week = {'week': '2025-03-10'}
+    admin = league_app.app.test_client()
+    admin.post('/login', data={'username': 'admin', 'password': 'admin'})
+    admin.post('/schedule/availability' + league, data={**week, 'player': 'Nadie'})
+    admin.post('/schedule/availability' + league, data={**week, 'player': PLAYERS[1][0]})
+    assert unavailable_players(league_app, seeded_league.id) == [PLAYERS[1][0]]
+
+    # Un jugador de otra liga con el mismo nombre no marca semanas en esta
+    conn = league_app.get_db()
+    cur = conn.cursor()
+    try:
+        other_league = league_app.create_league(cur, 'otra-liga', 'Otra liga')
+        cur.execute('INSERT INTO players (league_id, name, initial_rating, generation, search_name) VALUES (%s, %s, %s, %s, %s)',
+                    (other_league, PLAYERS[0][0], PLAYERS[0][1], league_app.bump_generation(cur, other_league),
+                     league_app.fold(PLAYERS[0][0])))
+        cur.execute('INSERT INTO users (username, password_hash, league_id, player_name) VALUES (%s, %s, %s, %s)',
+                    ('visitante', generate_password_hash('clave'), other_league, PLAYERS[0][0]))
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+    player = league_app.app.test_client()
+    player.post('/login', data={'username': 'visitante', 'password': 'clave'})
+    player.post('/schedule/availability' + league, data={**week, 'player': PLAYERS[2][0]})
+    assert unavailable_players(league_app, seeded_league.id) == [PLAYERS[1][0]]
+
+
+def test_tournament(league_app, seeded_league):
+    client = league_app.app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin'})
+    league = f'?league={seeded_league.slug}'
+    response = client.post('/tournaments' + league, data={'name': 'Suizo', 'rounds': '2'})
+    assert response.status_code == 302
+    tournament_id = int(response.headers['Location'].rstrip('/').split('/')[-1])
+
+    client.post(f'/tournaments/{tournament_id}/rounds')
+    summary = client.get(f'/api/tournaments/{tournament_id}').get_json()
+    (pairings,) = summary['pairings']
+    assert len(pairings) == 3 and all(board['result'] is None for board in pairings)
+    assert sorted(row['seed'] for row in summary['standings']) == list(range(1, len(PLAYERS) + 1))
+    assert client.post(f'/tournaments/{tournament_id}/rounds').status_code == 302  # falta cerrar la ronda
+
+    for board in pairings:
+        client.post(f'/tournaments/{tournament_id}/results', data={'round': 1, 'board': board['board'], 'result': 1})
+    summary = client.get(f'/api/tournaments/{tournament_id}').get_json()
+    assert summary['closed_rounds'] == 1
+    points = {row['name']: row['points'] for row in summary['standings']}
+    assert points == {name: 1.0 if any(board['white'] == name for board in pairings) else 0.0 for name in points}
+
+    client.post(f'/tournaments/{tournament_id}/rounds')
+    summary = client.get(f'/api/tournaments/{tournament_id}').get_json()
+    assert len(summary['pairings']) == 2
+    # Sin repetir rivales de la primera ronda
+    first = {frozenset((board['white'], board['black'])) for board in pairings}
+    assert not first & {frozenset((board['white'], board['black'])) for board in summary['pairings'][1]}
+
+    # Los resultados también son partidas de la liga
+    games = league_app.fetch_games(seeded_league.id)
+    assert len(games) == len(seeded_league.games) + 3
+
+
+def test_rollups(league_app, seeded_league):
+    assert league_app.update_rollups(seeded_league.id, rebuild=True) > 0
+    league = league_app.get_league(seeded_league.id, league_app.db_pool)
+    expected = {(period, start, league.names[player]): tuple(values)
+                for period, start, player, *values in period_rollups(league)}
+
+    assert stored_rollups(league_app, seeded_league.id) == expected
+
+    client = league_app.app.test_client()
+    first_week = week_start(SEASON_START).strftime('%Y-%m-%d')
+    board = client.get(f'/api/leaderboards/week?league={seeded_league.slug}&start={first_week}&limit=100').get_json()
+    week_rows = sorted(((name, values) for (period, start, name), values in expected.items()
+                        if period == 'week' and start == week_start(SEASON_START)),
+                       key=lambda item: (-(item[1][3] - item[1][2]), item[0]))
+    assert [player['name'] for player in board['players']] == [name for name, _ in week_rows]
+    first_week_games = [game for game in seeded_league.games if game[3] < week_start(SEASON_START) + WEEK]
+    assert sum(player['games'] for player in board['players']) == 2 * len(first_week_games)
+
+    winners = client.get(f'/api/leaderboards/month/winners?league={seeded_league.slug}&periods=104').get_json()
+    assert [winner['start'] for winner in winners['winners']] == ['2025-03-01']
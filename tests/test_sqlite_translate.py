@@ -0,0 +1,164 @@
+import sqlite3
+
+import pytest
+
+from app.database.sqlite import translate
+
+# Consultas de la aplicación tal como están en el código (app.py,
+# app/utils/jobs.py, app/utils/player_search.py), con su traducción a SQLite
+# (espacios normalizados) y si abren una transacción de escritura
+STATEMENTS = {
+    # /add_game: enfrentamientos de los últimos 7 días
+    'recent_matches': ('''
+            SELECT COUNT(*) as recent_matches
+            FROM games 
+            WHERE league_id = %s
+            AND (white = %s AND black = %s OR white = %s AND black = %s)
+            AND date >= NOW() - INTERVAL '7 days'
+        ''', "SELECT COUNT(*) as recent_matches FROM games WHERE league_id = ? "
+             "AND (white = ? AND black = ? OR white = ? AND black = ?) "
+             "AND date >= datetime('now', 'localtime', '-7 days')", False),
+    # JobQueue._claim
+    'claim_jobs': ('''
+                UPDATE jobs_outbox
+                SET run_after = NOW() + %s * INTERVAL '1 second', attempts = attempts + 1
+                WHERE id IN (
+                    SELECT id FROM jobs_outbox
+                    WHERE done_at IS NULL AND failed_at IS NULL
+                      AND run_after <= NOW() AND kind = ANY(%s)
+                    ORDER BY id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, kind, payload, attempts, created_at
+            ''', "UPDATE jobs_outbox SET run_after = datetime('now', 'localtime', '+' || ? || ' seconds'), "
+                 "attempts = attempts + 1 WHERE id IN ( SELECT id FROM jobs_outbox "
+                 "WHERE done_at IS NULL AND failed_at IS NULL AND run_after <= datetime('now', 'localtime') "
+                 "AND kind IN (SELECT value FROM json_each(?)) ORDER BY id LIMIT ? ) "
+                 "RETURNING id, kind, payload, attempts, created_at", True),
+    # JobQueue._finish
+    'finish_job': ('''
+                    UPDATE jobs_outbox SET done_at = NOW(), last_error = NULL
+                    WHERE id = %s
+                    RETURNING EXTRACT(EPOCH FROM done_at - created_at)
+                ''', "UPDATE jobs_outbox SET done_at = datetime('now', 'localtime'), last_error = NULL "
+                     "WHERE id = ? RETURNING ((julianday(done_at) - julianday(created_at)) * 86400.0)", True),
+    'retry_job': ('''
+                    UPDATE jobs_outbox
+                    SET run_after = NOW() + %s * INTERVAL '1 second', last_error = %s
+                    WHERE id = %s
+                ''', "UPDATE jobs_outbox SET run_after = datetime('now', 'localtime', '+' || ? || ' seconds'), "
+                     "last_error = ? WHERE id = ?", True),
+    # JobQueue._prune
+    'prune_jobs': ("DELETE FROM jobs_outbox WHERE done_at < NOW() - %s * INTERVAL '1 day'",
+                   "DELETE FROM jobs_outbox WHERE done_at < datetime('now', 'localtime', '-' || ? || ' days')", True),
+    # JobQueue.metrics
+    'jobs_metrics': ('''
+            SELECT
+                COUNT(*) FILTER (WHERE done_at IS NULL AND failed_at IS NULL) AS pending,
+                COUNT(*) FILTER (WHERE failed_at IS NOT NULL) AS failed,
+                EXTRACT(EPOCH FROM NOW() - MIN(created_at)
+                        FILTER (WHERE done_at IS NULL AND failed_at IS NULL)) AS lag_seconds
+            FROM jobs_outbox
+        ''', "SELECT COUNT(*) FILTER (WHERE done_at IS NULL AND failed_at IS NULL) AS pending, "
+             "COUNT(*) FILTER (WHERE failed_at IS NOT NULL) AS failed, "
+             "((julianday(datetime('now', 'localtime')) - julianday(MIN(created_at) "
+             "FILTER (WHERE done_at IS NULL AND failed_at IS NULL))) * 86400.0) AS lag_seconds "
+             "FROM jobs_outbox", False),
+    # close_weeks y update_rollups: FOR UPDATE toma el candado de escritura
+    'close_weeks_lock': ('SELECT generation FROM league_meta WHERE id = %s FOR UPDATE',
+                         'SELECT generation FROM league_meta WHERE id = ?', True),
+    'rollup_state_lock': ('SELECT generation, penalties FROM rollup_state WHERE league_id = %s FOR UPDATE',
+                          'SELECT generation, penalties FROM rollup_state WHERE league_id = ?', True),
+    # search_players: los patrones escapan % y _ con barra invertida
+    'search_players': ('''
+        SELECT id, name FROM players
+        WHERE league_id = %s AND (search_name LIKE %s OR search_name LIKE %s)
+        ORDER BY search_name LIKE %s DESC, search_name
+        LIMIT %s
+    ''', "SELECT id, name FROM players WHERE league_id = ? "
+         "AND (search_name LIKE ? ESCAPE '\\' OR search_name LIKE ? ESCAPE '\\') "
+         "ORDER BY search_name LIKE ? ESCAPE '\\' DESC, search_name LIMIT ?", False),
+}
+
+
+def normalized(statements):
+    return ' '.join(' '.join(statements).split())
+
+
+@pytest.mark.parametrize('name', sorted(STATEMENTS))
+def test_translate_app_statements(name):
+    sql, expected, writes = STATEMENTS[name]
+    statements, translated_writes = translate(sql)
+    assert len(statements) == 1
+    assert normalized(statements) == expected
+    assert translated_writes == writes
+    assert statements[0].count('?') == sql.count('%s')
+
+
+@pytest.mark.parametrize('name', sorted(STATEMENTS))
+def test_translated_statements_prepare(league_app, name):
+    """Cada traducción es SQL válido para SQLite sobre el esquema de la aplicación"""
+    sql, _, _ = STATEMENTS[name]
+    (statement,), _ = translate(sql)
+    raw = sqlite3.connect(league_app.SQLITE_PATH)
+    try:
+        raw.execute('EXPLAIN ' + statement, [None] * statement.count('?'))
+    finally:
+        raw.close()
+
+
+def test_greatest_and_least():
+    assert translate('UPDATE t SET a = GREATEST(a, %s), b = LEAST(b, %s) WHERE id = %s') == (
+        ('UPDATE t SET a = MAX(a, ?), b = MIN(b, ?) WHERE id = ?',), True)
+
+
+def test_interval_arithmetic_runs():
+    """Las fechas de NOW() ± INTERVAL se comparan bien con las guardadas (isoformat con espacio)"""
+    raw = sqlite3.connect(':memory:')
+    try:
+        (past,), _ = translate("SELECT NOW() - INTERVAL '7 days' < NOW()")
+        (ahead,), _ = translate("SELECT NOW() + %s * INTERVAL '1 second' > NOW()")
+        (elapsed,), _ = translate("SELECT EXTRACT(EPOCH FROM NOW() - (NOW() - INTERVAL '2 days'))")
+        assert raw.execute(past).fetchone()[0] == 1
+        assert raw.execute(ahead, (30,)).fetchone()[0] == 1
+        assert raw.execute(elapsed).fetchone()[0] == pytest.approx(2 * 86400, abs=1)
+    finally:
+        raw.close()
+
+
+def test_any_binds_a_list():
+    """= ANY(%s) recibe la lista como JSON (ver el adaptador de list)"""
+    raw = sqlite3.connect(':memory:')
+    try:
+        (statement,), _ = translate("SELECT COUNT(*) FROM (SELECT 'a' AS kind UNION SELECT 'b' UNION SELECT 'c') "
+                                    "WHERE kind = ANY(%s)")
+        assert raw.execute(statement, (['a', 'c'],)).fetchone()[0] == 2
+    finally:
+        raw.close()
+
+
+def test_like_escape():
+    raw = sqlite3.connect(':memory:')
+    try:
+        (statement,), _ = translate('SELECT %s LIKE %s')
+        assert raw.execute(statement, ('50% off', '50\\%%')).fetchone()[0] == 1
+        assert raw.execute(statement, ('500 off', '50\\%%')).fetchone()[0] == 0
+    finally:
+        raw.close()
+
+
+def test_schema_rewrites():
+    statements, writes = translate('''
+        CREATE TABLE IF NOT EXISTS t (id BIGSERIAL PRIMARY KEY, at TIMESTAMP NOT NULL DEFAULT NOW())
+            PARTITION BY LIST (id);
+        CREATE TABLE IF NOT EXISTS t_1 PARTITION OF t FOR VALUES IN (1);
+        DROP TABLE IF EXISTS a, b CASCADE
+    ''')
+    assert writes
+    assert [' '.join(statement.split()) for statement in statements] == [
+        "CREATE TABLE IF NOT EXISTS t (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "at TIMESTAMP NOT NULL DEFAULT (datetime('now', 'localtime')))",
+        'DROP TABLE IF EXISTS a',
+        'DROP TABLE IF EXISTS b',
+    ]
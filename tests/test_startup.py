@@ -0,0 +1,72 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import bench_startup
+from app.utils import league_image
+
+# Los presupuestos de tiempo dependen de la máquina: solo se comprueban con
+# STARTUP_BUDGET=1 (o con python bench_startup.py)
+budget = pytest.mark.skipif(not os.environ.get('STARTUP_BUDGET'),
+                            reason='presupuesto de arranque: STARTUP_BUDGET=1')
+IMAGE_BUDGET_MS = 50
+
+# Se ejecuta en un proceso nuevo, como el arranque en frío de serverless.py
+WARM_START_SCRIPT = '''
+import json, sys
+sys.path.insert(0, {root!r})
+import serverless
+print(json.dumps({{league_id: league.generation for league_id, league in serverless._module.league_cache.items()}}))
+'''
+
+
+def startup_env(bundle, images):
+    """Entorno de un arranque en frío en Postgres, con las imágenes de `bundle`"""
+    env = {name: value for name, value in os.environ.items() if name != 'SQLITE_PATH'}
+    env['LEAGUE_IMAGE_BUNDLE'] = str(bundle)
+    env['LEAGUE_IMAGE_DIR'] = str(images)
+    return env
+
+
+@pytest.fixture
+def bundle(league_app, seeded_league, tmp_path):
+    """Directorio de imágenes del despliegue con la liga de prueba; devuelve (directorio, liga)"""
+    directory = tmp_path / 'league_image'
+    directory.mkdir()
+    league = league_app.get_league(seeded_league.id, league_app.db_pool)
+    league_image.write(str(directory / f'league-{seeded_league.id}.img'), league)
+    return directory, league
+
+
+def test_league_image_round_trip(bundle):
+    directory, league = bundle
+    image = league_image.read(str(directory / f'league-{league.league_id}.img'))
+    assert image is not None
+    assert image.generation == league.generation
+    assert image.names == league.names
+    assert list(image.ratings) == list(league.ratings)
+
+
+def test_serverless_loads_bundled_image(bundle, tmp_path):
+    directory, league = bundle
+    output = subprocess.run([sys.executable, '-c', WARM_START_SCRIPT.format(root=bench_startup.ROOT)],
+                            env=startup_env(directory, tmp_path / 'images'), cwd=bench_startup.ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    assert json.loads(output.strip().splitlines()[-1]) == {str(league.league_id): league.generation}
+
+
+@budget
+def test_league_image_read_within_budget(bundle):
+    directory, league = bundle
+    read_ms, _ = bench_startup.measure_image(str(directory / f'league-{league.league_id}.img'), 5)
+    assert read_ms <= IMAGE_BUDGET_MS
+
+
+@budget
+def test_serverless_import_within_budget(bundle, tmp_path):
+    directory, _ = bundle
+    import_ms = bench_startup.measure_import(3, startup_env(directory, tmp_path / 'images'))
+    assert import_ms <= bench_startup.DEFAULT_BUDGET_MS
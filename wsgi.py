@@ -0,0 +1,11 @@
+# Punto de entrada para gunicorn (gunicorn -c gunicorn.conf.py wsgi:app).
+# app.py tiene el mismo nombre que el paquete app/, así que se carga por su ruta
+import importlib.util
+import os
+
+_spec = importlib.util.spec_from_file_location(
+    'league_app', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py'))
+_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_module)
+
+app = _module.app